@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify, redirect, url_for, session
+from flask import Flask, request, jsonify, redirect, url_for, session, Response, stream_with_context
 from flask_cors import CORS, cross_origin
 import json
 import os
@@ -10,6 +10,7 @@ import traceback
 import secrets
 import logging
 import uuid
+import time
 from functools import wraps
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
@@ -43,9 +44,32 @@ except ImportError:
 # Import bonding curve classes
 try:
     from bonding_curve import BondingCurve, BondingCurveState
+    from curve_registry import curve_registry, curve_column_values, CURVE_COLUMNS
 except ImportError:
     BondingCurve = None
     BondingCurveState = None
+    curve_registry = None
+
+# Load environment variables from .env file (before modules that read config at import)
+load_dotenv()
+
+# Pooled SQLite connections (WAL mode, shared prepared-statement cache)
+from db import get_db, pool_stats, release_thread_connections
+from migrations import migrate
+
+# Pooled, concurrent Aptos view-function client
+from aptos_view import get_view_client
+from balance_cache import balance_cache, balance_key, BalanceCheckTimeout, BALANCE_CHECK_TIMEOUT
+from blob_cache import blob_cache, fetch_with_cli, fetch_over_http, BlobFetchError
+from shelby_jobs import upload_jobs
+from shelby_status import shelby_status, ShelbyStatusUnavailable
+from upload_ingest import SpoolingRequest, UploadTooLarge, spool_stream
+from hedged_fetch import hedged_fetcher
+from http_pool import http_stats
+from scrape_cache import scrape_cache, SCRAPE_RESOLVE_MAX_AGE
+from prediction_resolver import prediction_resolver, MetricUnavailable
+from leaderboard import leaderboard
+from token_candles import load_candles, CANDLE_MAX_POINTS
 
 # Import web scraper
 try:
@@ -53,10 +77,9 @@ try:
 except ImportError:
     WebScraper = None
 
-# Load environment variables from .env file
-load_dotenv()
-
 app = Flask(__name__)
+# Upload endpoints opt in to parsing file parts straight into the Shelby spool
+app.request_class = SpoolingRequest
 app.secret_key = os.getenv('FLASK_SECRET_KEY', 'your-secret-key-change-in-production')
 
 # Error handling decorator
@@ -114,6 +137,11 @@ def add_security_headers(response):
         response.headers['Strict-Transport-Security'] = 'max-age=31536000; includeSubDomains'
     return response
 
+@app.teardown_appcontext
+def release_db_connections(exception=None):
+    """Return pooled connections a handler left open (early returns, errors)"""
+    release_thread_connections()
+
 # Aptos configuration
 APTOS_NODE_URL = os.getenv('APTOS_NODE_URL', 'https://fullnode.testnet.aptoslabs.com')
 APTOS_FAUCET_URL = os.getenv('APTOS_FAUCET_URL', 'https://faucet.testnet.aptoslabs.com')
@@ -134,7 +162,7 @@ def load_youtube_session():
     """Load YouTube session from database"""
     global youtube_sessions
     try:
-        conn = sqlite3.connect('creatorvault.db')
+        conn = get_db()
         cursor = conn.cursor()
         cursor.execute('SELECT session_key, credentials, channel_id, channel_title, created_at FROM youtube_sessions ORDER BY created_at DESC LIMIT 1')
         row = cursor.fetchone()
@@ -157,7 +185,7 @@ def save_youtube_session(session_key, credentials_data, channel_id, channel_titl
     """Save YouTube session to database"""
     global youtube_sessions
     try:
-        conn = sqlite3.connect('creatorvault.db')
+        conn = get_db()
         cursor = conn.cursor()
         
         # Clear old sessions
@@ -244,461 +272,32 @@ def get_aptos_account():
 
 # Initialize database
 def init_db():
-    conn = sqlite3.connect('creatorvault.db')
-    cursor = conn.cursor()
-    
-    # Create tokens table - Updated for Aptos (asa_id is now metadata_address as TEXT)
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS tokens (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            token_id TEXT UNIQUE,  -- Aptos FA metadata address or token identifier
-            creator TEXT NOT NULL,
-            token_name TEXT NOT NULL,
-            token_symbol TEXT NOT NULL,
-            total_supply INTEGER NOT NULL,
-            current_price REAL NOT NULL,
-            market_cap REAL NOT NULL,
-            volume_24h REAL DEFAULT 0,
-            holders INTEGER DEFAULT 1,
-            price_change_24h REAL DEFAULT 0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            youtube_channel_title TEXT,
-            youtube_subscribers INTEGER,
-            video_id TEXT,
-            video_title TEXT,
-            platform TEXT,
-            content_url TEXT,
-            content_id TEXT,
-            content_description TEXT,
-            content_thumbnail TEXT,
-            bonding_curve_config TEXT,
-            bonding_curve_state TEXT,
-            transaction_id TEXT,
-            metadata_address TEXT  -- Aptos FA metadata object address
-        )
-    ''')
-    
-    # Migrate existing INTEGER asa_id to TEXT if needed
-    try:
-        cursor.execute('ALTER TABLE tokens ADD COLUMN metadata_address TEXT')
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-    
-    # Add token_id column if it doesn't exist (for Aptos content_id-based tokens)
-    try:
-        cursor.execute('ALTER TABLE tokens ADD COLUMN token_id TEXT')
-        logger.info("Added token_id column to tokens table")
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-    
-    # Add premium content columns for Shelby Protocol integration
-    try:
-        cursor.execute('ALTER TABLE tokens ADD COLUMN premium_content_url TEXT')
-        logger.info("Added premium_content_url column to tokens table")
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-    
-    try:
-        cursor.execute('ALTER TABLE tokens ADD COLUMN premium_content_blob_id TEXT')
-        logger.info("Added premium_content_blob_id column to tokens table")
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-    
-    try:
-        cursor.execute('ALTER TABLE tokens ADD COLUMN premium_content_type TEXT')
-        logger.info("Added premium_content_type column to tokens table")
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-    
-    try:
-        cursor.execute('ALTER TABLE tokens ADD COLUMN premium_content_account_address TEXT')
-        logger.info("Added premium_content_account_address column to tokens table")
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-    
-    try:
-        cursor.execute('ALTER TABLE tokens ADD COLUMN premium_content_explorer_url TEXT')
-        logger.info("Added premium_content_explorer_url column to tokens table")
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-    
-    # Create unique index on token_id if it doesn't exist
-    try:
-        cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_tokens_token_id ON tokens(token_id)')
-        logger.info("Created unique index on token_id")
-    except sqlite3.OperationalError as e:
-        logger.warning(f"Could not create unique index on token_id: {e}")
-    
-    # Create posts table for social media feed
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS posts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            creator_address TEXT NOT NULL,
-            token_id TEXT NOT NULL,
-            content_type TEXT NOT NULL,
-            shelby_blob_id TEXT,
-            shelby_blob_url TEXT,
-            title TEXT,
-            description TEXT,
-            is_premium BOOLEAN DEFAULT 0,
-            minimum_balance REAL DEFAULT 1,
-            likes_count INTEGER DEFAULT 0,
-            comments_count INTEGER DEFAULT 0,
-            shares_count INTEGER DEFAULT 0,
-            views_count INTEGER DEFAULT 0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (token_id) REFERENCES tokens(token_id)
-        )
-    ''')
-    
-    # Create engagement table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS engagement (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            post_id INTEGER NOT NULL,
-            user_address TEXT NOT NULL,
-            engagement_type TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (post_id) REFERENCES posts(id),
-            UNIQUE(post_id, user_address, engagement_type)
-        )
-    ''')
-    
-    # Create comments table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS comments (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            post_id INTEGER NOT NULL,
-            user_address TEXT NOT NULL,
-            comment_text TEXT NOT NULL,
-            shelby_blob_id TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (post_id) REFERENCES posts(id)
-        )
-    ''')
-    
-    conn.commit()
-    
-    # Handle migration from old asa_id column to token_id
-    try:
-        # Check if asa_id column exists
-        cursor.execute("PRAGMA table_info(tokens)")
-        columns = cursor.fetchall()
-        has_asa_id = any(col[1] == 'asa_id' for col in columns)
-        
-        if has_asa_id:
-            logger.info("Database has asa_id column. Using token_id for new tokens.")
-    except Exception as e:
-        logger.warning(f"Could not check asa_id column: {e}")
-    
-    # Create trades table - Updated for Aptos (asa_id is now TEXT)
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS trades (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            asa_id TEXT NOT NULL,  -- Changed to TEXT for Aptos metadata address
-            trader_address TEXT NOT NULL,
-            trade_type TEXT NOT NULL,
-            amount REAL NOT NULL,
-            price REAL NOT NULL,
-            transaction_id TEXT NOT NULL,
-            creator_fee REAL DEFAULT 0,
-            platform_fee REAL DEFAULT 0,
-            total_value REAL DEFAULT 0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            referral_code TEXT,
-            referral_earnings REAL DEFAULT 0,
-            FOREIGN KEY (asa_id) REFERENCES tokens (asa_id)
-        )
-    ''')
-    
-    # Add fee columns if they don't exist (for existing databases)
-    try:
-        cursor.execute('ALTER TABLE trades ADD COLUMN creator_fee REAL DEFAULT 0')
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-    try:
-        cursor.execute('ALTER TABLE trades ADD COLUMN platform_fee REAL DEFAULT 0')
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-    try:
-        cursor.execute('ALTER TABLE trades ADD COLUMN total_value REAL DEFAULT 0')
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-    try:
-        cursor.execute('ALTER TABLE trades ADD COLUMN referral_code TEXT')
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-    try:
-        cursor.execute('ALTER TABLE trades ADD COLUMN referral_earnings REAL DEFAULT 0')
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-    
-    # Create referrals table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS referrals (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            referrer_address TEXT NOT NULL,
-            referred_address TEXT NOT NULL UNIQUE,
-            referral_code TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            total_earnings REAL DEFAULT 0,
-            total_trades_count INTEGER DEFAULT 0,
-            total_volume REAL DEFAULT 0
-        )
-    ''')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_referrals_referrer ON referrals (referrer_address)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_referrals_referred ON referrals (referred_address)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_referrals_code ON referrals (referral_code)')
-    
-    # Create referral_earnings table for detailed tracking
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS referral_earnings (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            referrer_address TEXT NOT NULL,
-            referred_address TEXT NOT NULL,
-            trade_id INTEGER NOT NULL,
-            earnings REAL NOT NULL,
-            trade_value REAL NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (trade_id) REFERENCES trades (id)
-        )
-    ''')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_referral_earnings_referrer ON referral_earnings (referrer_address)')
-    
-    # Add bonding curve columns if they don't exist
-    try:
-        cursor.execute('ALTER TABLE tokens ADD COLUMN bonding_curve_config TEXT')
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-    try:
-        cursor.execute('ALTER TABLE tokens ADD COLUMN bonding_curve_state TEXT')
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-    try:
-        cursor.execute('ALTER TABLE tokens ADD COLUMN liquidity_pool_config TEXT')
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-    try:
-        cursor.execute('ALTER TABLE tokens ADD COLUMN is_amm_migrated INTEGER DEFAULT 0')
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-    try:
-        cursor.execute('ALTER TABLE tokens ADD COLUMN migration_threshold REAL DEFAULT 0')
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-    try:
-        cursor.execute('ALTER TABLE tokens ADD COLUMN platform TEXT')
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-    try:
-        cursor.execute('ALTER TABLE tokens ADD COLUMN content_url TEXT')
-    except sqlite3.OperationalError:
-        pass  # Column already exists
+    """Apply pending schema migrations, then run the startup-only backfills"""
+    conn = get_db()
     try:
-        cursor.execute('ALTER TABLE tokens ADD COLUMN content_id TEXT')
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-    try:
-        cursor.execute('ALTER TABLE tokens ADD COLUMN content_description TEXT')
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-    try:
-        cursor.execute('ALTER TABLE tokens ADD COLUMN content_thumbnail TEXT')
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-    
-    # Create holders table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS holders (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            asa_id TEXT NOT NULL,  -- Changed to TEXT for Aptos metadata address
-            holder_address TEXT NOT NULL,
-            balance REAL NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (asa_id) REFERENCES tokens (asa_id)
-        )
-    ''')
-    
-    # Create YouTube sessions table for persistent auth
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS youtube_sessions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            session_key TEXT UNIQUE NOT NULL,
-            credentials TEXT NOT NULL,
-            channel_id TEXT NOT NULL,
-            channel_title TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Create YouTube channel cache table to avoid quota issues
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS youtube_channel_cache (
-            channel_id TEXT PRIMARY KEY,
-            channel_title TEXT,
-            channel_data TEXT NOT NULL,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Create YouTube videos cache table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS youtube_videos_cache (
-            channel_id TEXT PRIMARY KEY,
-            channel_title TEXT,
-            videos_data TEXT NOT NULL,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Create YouTube video info cache table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS youtube_video_info_cache (
-            video_id TEXT PRIMARY KEY,
-            video_data TEXT NOT NULL,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Create predictions table for prediction markets
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS predictions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            prediction_id TEXT UNIQUE NOT NULL,
-            creator_address TEXT NOT NULL,
-            content_url TEXT NOT NULL,
-            platform TEXT NOT NULL,
-            metric_type TEXT NOT NULL,
-            target_value REAL NOT NULL,
-            timeframe_hours INTEGER NOT NULL,
-            end_time TIMESTAMP NOT NULL,
-            yes_pool REAL DEFAULT 0,
-            no_pool REAL DEFAULT 0,
-            status TEXT DEFAULT 'active',
-            outcome TEXT,
-            initial_value REAL,
-            final_value REAL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Create prediction_trades table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS prediction_trades (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            prediction_id TEXT NOT NULL,
-            trader_address TEXT NOT NULL,
-            side TEXT NOT NULL,
-            amount REAL NOT NULL,
-            odds REAL NOT NULL,
-            potential_payout REAL NOT NULL,
-            transaction_id TEXT,
-            status TEXT DEFAULT 'pending',
-            payout_amount REAL DEFAULT 0,
-            claimed INTEGER DEFAULT 0,
-            claim_txid TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (prediction_id) REFERENCES predictions (prediction_id)
-        )
-    ''')
-    
-    # Migrate prediction_trades table - add claimed columns if they don't exist
-    try:
-        cursor.execute('PRAGMA table_info(prediction_trades)')
-        columns = [col[1] for col in cursor.fetchall()]
-        
-        if 'claimed' not in columns:
-            cursor.execute('ALTER TABLE prediction_trades ADD COLUMN claimed INTEGER DEFAULT 0')
-        if 'claim_txid' not in columns:
-            cursor.execute('ALTER TABLE prediction_trades ADD COLUMN claim_txid TEXT')
-        
-        conn.commit()
-    except Exception as e:
-        logger.warning(f"Migration warning: {e}")
-
-    # Create copy trading profiles table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS copy_profiles (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            leader_address TEXT NOT NULL,
-            follower_address TEXT NOT NULL,
-            allocation_percent REAL NOT NULL,
-            max_single_trade_algo REAL NOT NULL,
-            copy_type TEXT DEFAULT 'proportional',
-            risk_level TEXT DEFAULT 'balanced',
-            status TEXT DEFAULT 'active',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_copy_profiles_leader ON copy_profiles (leader_address)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_copy_profiles_follower ON copy_profiles (follower_address)')
-    
-    # Migrate copy_profiles table - add risk_level column if it doesn't exist
-    try:
-        cursor.execute('PRAGMA table_info(copy_profiles)')
-        columns = [col[1] for col in cursor.fetchall()]
-        if 'risk_level' not in columns:
-            cursor.execute('ALTER TABLE copy_profiles ADD COLUMN risk_level TEXT DEFAULT "balanced"')
-            conn.commit()
-    except Exception as e:
-        logger.warning(f"Migration warning for copy_profiles: {e}")
-
-    # Create bot strategies table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS bot_strategies (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            owner_address TEXT NOT NULL,
-            label TEXT NOT NULL,
-            asa_id TEXT,  -- Changed to TEXT for Aptos metadata address
-            token_symbol TEXT,
-            metric_type TEXT NOT NULL,
-            condition TEXT NOT NULL,
-            action TEXT NOT NULL,
-            status TEXT DEFAULT 'active',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_bot_strategies_owner ON bot_strategies (owner_address)')
-    
-    # Strategy executions table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS strategy_executions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            strategy_id INTEGER NOT NULL,
-            trader_address TEXT NOT NULL,
-            asa_id TEXT NOT NULL,  -- Changed to TEXT for Aptos metadata address
-            trade_type TEXT NOT NULL,
-            amount REAL NOT NULL,
-            price REAL NOT NULL,
-            total_value REAL NOT NULL,
-            pnl REAL DEFAULT 0,
-            executed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (strategy_id) REFERENCES bot_strategies(id)
-        )
-    ''')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_strategy_executions_strategy ON strategy_executions (strategy_id)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_strategy_executions_trader ON strategy_executions (trader_address)')
-
-    conn.close()
+        version = migrate(conn)
+        logger.info(f"💾 Database schema at version {version}")
+    finally:
+        conn.close()
     
     # Load YouTube session from database if exists
     load_youtube_session()
     
     # Initialize bonding curves for existing tokens that don't have them
     try:
-        conn = sqlite3.connect('creatorvault.db')
+        conn = get_db()
         cursor = conn.cursor()
         
         cursor.execute('''
-            SELECT asa_id, total_supply, current_price 
+            SELECT id, total_supply, current_price 
             FROM tokens 
-            WHERE bonding_curve_config IS NULL OR bonding_curve_config = ''
+            WHERE curve_k IS NULL
         ''')
         
         tokens_to_update = cursor.fetchall()
         
         if tokens_to_update and BondingCurve is not None:
-            for asa_id, total_supply, current_price in tokens_to_update:
+            for row_id, total_supply, current_price in tokens_to_update:
                 initial_price = current_price if current_price > 0 else 0.001
                 bonding_curve = BondingCurve(
                     initial_price=initial_price,
@@ -708,14 +307,9 @@ def init_db():
                     token_supply=0,
                     algo_reserve=0
                 )
-                bonding_curve_config_json = json.dumps(bonding_curve.to_dict())
-                bonding_curve_state_json = json.dumps(bonding_curve_state.to_dict())
-                
-                cursor.execute('''
-                    UPDATE tokens 
-                    SET bonding_curve_config = ?, bonding_curve_state = ?
-                    WHERE asa_id = ?
-                ''', (bonding_curve_config_json, bonding_curve_state_json, asa_id))
+                assignments = ', '.join(f'{column} = ?' for column in CURVE_COLUMNS)
+                cursor.execute(f'UPDATE tokens SET {assignments} WHERE id = ?',
+                               curve_column_values(bonding_curve, bonding_curve_state) + (row_id,))
             
             conn.commit()
             if tokens_to_update:
@@ -810,6 +404,16 @@ def health_check():
         ]
     })
 
+@app.route('/api/db/pool-stats', methods=['GET'])
+def db_pool_stats():
+    """Connection pool statistics (checkouts, reuse, wait and hold times)"""
+    return jsonify({"success": True, "pool": pool_stats()})
+
+@app.route('/api/http/stats', methods=['GET'])
+def outbound_http_stats():
+    """Outbound HTTP statistics per host for this worker (retries, throttling, circuit breakers)"""
+    return jsonify({"success": True, "hosts": http_stats()})
+
 @app.route('/auth/youtube', methods=['GET'])
 @cross_origin(supports_credentials=True)
 def youtube_auth():
@@ -974,7 +578,7 @@ def youtube_callback():
         }
         
         # Save channel data to cache
-        conn = sqlite3.connect('creatorvault.db')
+        conn = get_db()
         cursor = conn.cursor()
         cursor.execute('''
             INSERT OR REPLACE INTO youtube_channel_cache 
@@ -1112,7 +716,7 @@ def get_youtube_channel():
         channel_title = session_data.get('channel_title')
         
         # First, try to get cached channel data from database
-        conn = sqlite3.connect('creatorvault.db')
+        conn = get_db()
         cursor = conn.cursor()
         
         # Check if we have cached channel data
@@ -1182,7 +786,7 @@ def get_youtube_channel():
                 }
                 
                 # Save to cache
-                conn = sqlite3.connect('creatorvault.db')
+                conn = get_db()
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT OR REPLACE INTO youtube_channel_cache 
@@ -1325,14 +929,12 @@ def create_creator_token():
                 token_supply=0,  # Start with 0 tokens in circulation
                 algo_reserve=0   # Start with 0 APTOS in reserve
             )
-            bonding_curve_config_json = json.dumps(bonding_curve.to_dict())
-            bonding_curve_state_json = json.dumps(bonding_curve_state.to_dict())
+            curve_values = curve_column_values(bonding_curve, bonding_curve_state)
         else:
-            bonding_curve_config_json = None
-            bonding_curve_state_json = None
+            curve_values = (None,) * 8
         
         # Store in database
-        conn = sqlite3.connect('creatorvault.db')
+        conn = get_db()
         cursor = conn.cursor()
         
         # Get content_id (token_id) - this is the unique identifier for the token
@@ -1345,11 +947,13 @@ def create_creator_token():
         cursor.execute('''
             INSERT INTO tokens (token_id, metadata_address, creator, token_name, token_symbol, total_supply, 
                               current_price, market_cap, youtube_channel_title, youtube_subscribers,
-                              bonding_curve_config, bonding_curve_state, platform, content_url,
+                              curve_initial_price, curve_initial_supply, curve_steepness,
+                              curve_virtual_token_reserve, curve_virtual_algo_reserve, curve_k,
+                              curve_token_supply, curve_algo_reserve, platform, content_url,
                               content_id, content_description, content_thumbnail,
                               premium_content_url, premium_content_blob_id, premium_content_type,
                               premium_content_account_address, premium_content_explorer_url)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         ''', (
             content_id,  # token_id (unique identifier - content_id)
             asset_id,    # metadata_address (Aptos FA metadata object address)
@@ -1361,8 +965,7 @@ def create_creator_token():
             market_cap,
             data.get('youtube_channel_title', channel_title),
             data.get('youtube_subscribers', subscribers),
-            bonding_curve_config_json,
-            bonding_curve_state_json,
+            *curve_values,
             data.get('platform', 'youtube'),
             data.get('content_url', ''),
             content_id,  # content_id (same as token_id)
@@ -1393,7 +996,7 @@ def create_creator_token():
                     "title": channel_title,
                     "subscribers": subscribers
                 },
-                "bonding_curve_initialized": bonding_curve_config_json is not None
+                "bonding_curve_initialized": curve_values[5] is not None
             }
         })
         
@@ -1490,7 +1093,7 @@ def create_video_token():
         market_cap = 0.0  # Market cap starts at $0
         
         # Store in database
-        conn = sqlite3.connect('creatorvault.db')
+        conn = get_db()
         cursor = conn.cursor()
         
         # Use token_id (content_id or video_id) as the unique identifier
@@ -1625,7 +1228,7 @@ def trade_token():
             txid = asset_txid
         
         # Store trade in database
-        conn = sqlite3.connect('creatorvault.db')
+        conn = get_db()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -1787,7 +1390,7 @@ def get_token_balance(asa_id):
 def get_tokens():
     """Get all created tokens"""
     try:
-        conn = sqlite3.connect('creatorvault.db')
+        conn = get_db()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -1845,6 +1448,8 @@ def get_tokens():
             "error": str(e)
         }), 500
 
+TRADE_TIMEFRAME_SECONDS = {'1h': 3600, '24h': 86400, '7d': 7 * 86400, '30d': 30 * 86400}
+
 @app.route('/api/trades/<token_identifier>', methods=['GET'])
 @handle_errors
 def get_trades(token_identifier):
@@ -1853,7 +1458,7 @@ def get_trades(token_identifier):
         timeframe = request.args.get('timeframe', '24h')
         limit = int(request.args.get('limit', 100))
         
-        conn = sqlite3.connect('creatorvault.db')
+        conn = get_db()
         cursor = conn.cursor()
         
         # Try to parse as integer (legacy asa_id) or use as string (Aptos token_id)
@@ -1867,27 +1472,19 @@ def get_trades(token_identifier):
             token_query = 'token_id = ?'
             query_param = token_identifier
         
-        # Calculate time filter
-        if timeframe == '1h':
-            time_filter = "datetime('now', '-1 hour')"
-        elif timeframe == '24h':
-            time_filter = "datetime('now', '-24 hours')"
-        elif timeframe == '7d':
-            time_filter = "datetime('now', '-7 days')"
-        elif timeframe == '30d':
-            time_filter = "datetime('now', '-30 days')"
-        else:
-            time_filter = "datetime('now', '-1 year')"
+        # Time filter on the epoch-ms column, so the statement text (and its
+        # cached prepared statement) is the same for every timeframe
+        since_ms = int((time.time() - TRADE_TIMEFRAME_SECONDS.get(timeframe, 365 * 86400)) * 1000)
         
         # Check if token_id column exists, otherwise fallback to asa_id
         try:
             cursor.execute(f'''
                 SELECT trade_type, amount, price, created_at, transaction_id, trader_address
                 FROM trades
-                WHERE {token_query} AND created_at >= {time_filter}
-                ORDER BY created_at DESC
+                WHERE {token_query} AND created_at_ms >= ?
+                ORDER BY created_at_ms DESC
                 LIMIT ?
-            ''', (query_param, limit))
+            ''', (query_param, since_ms, limit))
         except sqlite3.OperationalError:
             # Fallback: if token_id column doesn't exist, try asa_id
             if token_query == 'token_id = ?':
@@ -1896,13 +1493,13 @@ def get_trades(token_identifier):
                 token_row = cursor.fetchone()
                 if token_row:
                     asa_id_from_token = token_row[0]
-                    cursor.execute(f'''
+                    cursor.execute('''
                         SELECT trade_type, amount, price, created_at, transaction_id, trader_address
                         FROM trades
-                        WHERE asa_id = ? AND created_at >= {time_filter}
-                        ORDER BY created_at DESC
+                        WHERE asa_id = ? AND created_at_ms >= ?
+                        ORDER BY created_at_ms DESC
                         LIMIT ?
-                    ''', (asa_id_from_token, limit))
+                    ''', (asa_id_from_token, since_ms, limit))
                 else:
                     # No token found, return empty
                     trades = []
@@ -1937,74 +1534,58 @@ def get_trades(token_identifier):
         logger.error(f"Error fetching trades: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
 
+@app.route('/api/trades/<token_identifier>/candles', methods=['GET'])
+@handle_errors
+def get_trade_candles(token_identifier):
+    """
+    OHLCV candles for a token's price chart, as parallel arrays (t/o/h/l/c/v/qv/n).
+    ?timeframe=1h|24h|7d|30d (default 24h, anything else a year) or ?from=&to= (epoch seconds),
+    ?resolution=1m|5m|1h|1d (minimum; wider ranges are downsampled), ?max_points= (<= CANDLE_MAX_POINTS)
+    """
+    end = float(request.args.get('to', time.time()))
+    start = float(request.args.get('from', end - TRADE_TIMEFRAME_SECONDS.get(request.args.get('timeframe', '24h'), 365 * 86400)))
+    max_points = int(request.args.get('max_points', CANDLE_MAX_POINTS))
+
+    conn = get_db()
+    try:
+        # Trades are recorded under the identifier itself or, for Aptos tokens, the token row's asa_id
+        asa_ids = [token_identifier]
+        row = conn.execute('SELECT asa_id FROM tokens WHERE token_id = ?', (token_identifier,)).fetchone()
+        if row and row[0] and str(row[0]) != token_identifier:
+            asa_ids.append(str(row[0]))
+        candles = load_candles(conn, asa_ids, start, end, request.args.get('resolution'), max_points)
+    finally:
+        conn.close()
+
+    return jsonify({"success": True, "from": start, "to": end, **candles})
+
 @app.route('/api/copy-trading/leaderboard', methods=['GET'])
 @handle_errors
 def copy_trading_leaderboard():
     """
     Aggregate real trading stats per trader_address from trades table.
     Returns top traders by realized volume with basic performance metrics.
+    Served from the leaderboard snapshot; an unchanged leaderboard is a 304.
     """
-    conn = sqlite3.connect('creatorvault.db')
-    cursor = conn.cursor()
-
     timeframe = request.args.get('timeframe', '30d')
     limit = int(request.args.get('limit', 20))
 
-    # Time filter
-    if timeframe == '7d':
-        time_filter = "datetime('now', '-7 days')"
-    elif timeframe == '90d':
-        time_filter = "datetime('now', '-90 days')"
-    elif timeframe == 'all':
-        time_filter = "datetime('1970-01-01')"
-    else:
-        time_filter = "datetime('now', '-30 days')"
-
-    cursor.execute(f'''
-        SELECT 
-            trader_address,
-            COUNT(*) as trade_count,
-            SUM(CASE WHEN trade_type = 'buy' THEN total_value ELSE 0 END) as buy_volume,
-            SUM(CASE WHEN trade_type = 'sell' THEN total_value ELSE 0 END) as sell_volume,
-            COUNT(DISTINCT asa_id) as distinct_tokens,
-            MIN(created_at) as first_trade_at,
-            MAX(created_at) as last_trade_at
-        FROM trades
-        WHERE created_at >= {time_filter}
-        GROUP BY trader_address
-        HAVING trade_count > 0
-        ORDER BY sell_volume DESC
-        LIMIT ?
-    ''', (limit,))
-
-    rows = cursor.fetchall()
-    conn.close()
-
-    traders = []
-    for row in rows:
-        trader_address, trade_count, buy_volume, sell_volume, distinct_tokens, first_trade_at, last_trade_at = row
-        buy_volume = buy_volume or 0
-        sell_volume = sell_volume or 0
-        net_pnl = sell_volume - buy_volume
-        roi_pct = (net_pnl / buy_volume * 100) if buy_volume > 0 else 0
-
-        traders.append({
-            "trader_address": trader_address,
-            "trade_count": trade_count,
-            "buy_volume": buy_volume,
-            "sell_volume": sell_volume,
-            "net_pnl": net_pnl,
-            "roi_pct": roi_pct,
-            "distinct_tokens": distinct_tokens,
-            "first_trade_at": first_trade_at,
-            "last_trade_at": last_trade_at
-        })
+    traders, etag = leaderboard.get(timeframe, limit)
 
-    return jsonify({
+    response = jsonify({
         "success": True,
         "traders": traders,
         "count": len(traders)
     })
+    response.set_etag(etag)
+    # Polled constantly: let clients revalidate every time, cheaply
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+@app.route('/api/copy-trading/leaderboard/stats', methods=['GET'])
+def copy_trading_leaderboard_stats():
+    """Leaderboard snapshot statistics for this worker"""
+    return jsonify({"success": True, "stats": leaderboard.stats()})
 
 @app.route('/api/copy-trading/trader/<address>/pnl', methods=['GET'])
 @handle_errors
@@ -2012,8 +1593,11 @@ def copy_trading_trader_pnl(address):
     """
     Real P&L over time for a trader based on trades table.
     P&L per day = sells_value - buys_value for that day.
+    ?resolution=hour returns hourly points instead.
+    Reads the trader_pnl_daily / trader_pnl_hourly buckets (primary key range seeks).
     """
     timeframe = request.args.get('timeframe', '30d')
+    hourly = request.args.get('resolution', 'day') == 'hour'
 
     if timeframe == '7d':
         time_filter = "datetime('now', '-7 days')"
@@ -2024,27 +1608,31 @@ def copy_trading_trader_pnl(address):
     else:
         time_filter = "datetime('now', '-30 days')"
 
-    conn = sqlite3.connect('creatorvault.db')
+    if hourly:
+        table, bucket, seconds, label, format_ = 'trader_pnl_hourly', 'epoch_hour', 3600, 'hour', '%Y-%m-%d %H:00:00'
+    else:
+        table, bucket, seconds, label, format_ = 'trader_pnl_daily', 'epoch_day', 86400, 'day', '%Y-%m-%d'
+
+    conn = get_db()
     cursor = conn.cursor()
 
     cursor.execute(f'''
         SELECT 
-            DATE(created_at) as day,
-            SUM(CASE WHEN trade_type = 'sell' THEN total_value ELSE 0 END) -
-            SUM(CASE WHEN trade_type = 'buy' THEN total_value ELSE 0 END) as pnl
-        FROM trades
-        WHERE trader_address = ? AND created_at >= {time_filter}
-        GROUP BY DATE(created_at)
-        ORDER BY DATE(created_at)
+            strftime('{format_}', {bucket} * {seconds}, 'unixepoch') as {label},
+            sell_value - buy_value as pnl
+        FROM {table}
+        WHERE trader_address = ? AND {bucket} >= CAST(strftime('%s', {time_filter}) AS INTEGER) / {seconds}
+        ORDER BY {bucket}
     ''', (address,))
 
     rows = cursor.fetchall()
     conn.close()
 
-    points = [{"day": day, "pnl": pnl or 0} for (day, pnl) in rows]
+    points = [{label: bucket_start, "pnl": pnl or 0} for (bucket_start, pnl) in rows]
 
     return jsonify({
         "success": True,
+        "resolution": label,
         "points": points
     })
 
@@ -2055,80 +1643,51 @@ def copy_trading_trader_analytics(address):
     Comprehensive trader analytics similar to GMGN.AI
     Calculates win rate, P&L distribution, token distribution, etc.
     """
-    conn = sqlite3.connect('creatorvault.db')
+    conn = get_db()
     cursor = conn.cursor()
 
-    # Get all trades for this trader
+    # Per-token totals from the trader_positions rollup (one row per token,
+    # kept current by a trigger on trades) instead of the full trade history
     cursor.execute('''
-        SELECT 
-            t.trade_type,
-            t.amount,
-            t.price,
-            t.total_value,
-            t.created_at,
-            t.transaction_id,
-            t.asa_id,
+        SELECT
+            p.asa_id,
+            p.trade_count,
+            p.buy_amount,
+            p.buy_value,
+            p.sell_value,
+            p.first_trade_at,
+            p.last_trade_at,
             tk.token_name,
             tk.token_symbol,
             tk.current_price,
-            tk.market_cap
-        FROM trades t
-        LEFT JOIN tokens tk ON t.asa_id = tk.asa_id
-        WHERE t.trader_address = ?
-        ORDER BY t.created_at DESC
+            tk.market_cap,
+            (julianday(p.last_trade_at) - julianday(p.first_trade_at)) * 1440 as hold_minutes
+        FROM trader_positions p
+        LEFT JOIN tokens tk ON p.asa_id = tk.asa_id
+        WHERE p.trader_address = ?
     ''', (address,))
 
-    all_trades = cursor.fetchall()
-    
-    # Calculate 7D metrics
-    from datetime import datetime, timedelta
-    seven_days_ago = datetime.now() - timedelta(days=7)
-    
-    trades_7d = []
-    for t in all_trades:
-        try:
-            # Handle different datetime formats
-            trade_time_str = t[4]
-            if 'T' in trade_time_str:
-                # ISO format: 2025-11-27T14:08:30 or 2025-11-27T14:08:30.123456
-                trade_time_str = trade_time_str.split('.')[0]  # Remove microseconds
-                if '+' not in trade_time_str and 'Z' not in trade_time_str:
-                    trade_time_str += '+00:00'
-                elif 'Z' in trade_time_str:
-                    trade_time_str = trade_time_str.replace('Z', '+00:00')
-                trade_time = datetime.fromisoformat(trade_time_str)
-            else:
-                # SQLite format: 2025-11-27 14:08:30
-                trade_time = datetime.strptime(trade_time_str, '%Y-%m-%d %H:%M:%S')
-            
-            if trade_time >= seven_days_ago:
-                trades_7d.append(t)
-        except Exception as e:
-            logger.warning(f"Could not parse trade time {t[4]}: {e}")
-            # Include it anyway if we can't parse
-            trades_7d.append(t)
+    positions = {row[0]: row for row in cursor.fetchall()}
     
-    # Calculate realized P&L per token
-    token_pnl = {}
-    token_buys = {}
-    token_sells = {}
+    # 7D metrics, aggregated in SQL over the (trader_address, created_at_ms) index
+    cursor.execute('''
+        SELECT
+            COUNT(*),
+            COUNT(DISTINCT asa_id),
+            COALESCE(SUM(total_value), 0),
+            COALESCE(SUM(CASE WHEN trade_type = 'buy' THEN total_value ELSE 0 END), 0),
+            COALESCE(SUM(CASE WHEN trade_type = 'sell' THEN total_value ELSE 0 END), 0),
+            COALESCE(SUM(trade_type = 'sell'), 0)
+        FROM trades
+        WHERE trader_address = ? AND created_at_ms >= ?
+    ''', (address, int((time.time() - 7 * 86400) * 1000)))
+
+    trade_count_7d, tokens_traded_7d, value_7d, buys_7d, sells_7d, sell_count_7d = cursor.fetchone()
     
-    for trade in all_trades:
-        asa_id = trade[6]
-        trade_type = trade[0]
-        total_value = trade[3] or 0
-        
-        if asa_id not in token_pnl:
-            token_pnl[asa_id] = 0
-            token_buys[asa_id] = 0
-            token_sells[asa_id] = 0
-        
-        if trade_type == 'buy':
-            token_buys[asa_id] += total_value
-            token_pnl[asa_id] -= total_value
-        else:  # sell
-            token_sells[asa_id] += total_value
-            token_pnl[asa_id] += total_value
+    # Realized P&L per token
+    token_buys = {asa_id: row[3] for asa_id, row in positions.items()}
+    token_sells = {asa_id: row[4] for asa_id, row in positions.items()}
+    token_pnl = {asa_id: token_sells[asa_id] - token_buys[asa_id] for asa_id in positions}
     
     # Calculate win rate (tokens with positive P&L)
     winning_tokens = sum(1 for pnl in token_pnl.values() if pnl > 0)
@@ -2136,9 +1695,6 @@ def copy_trading_trader_analytics(address):
     win_rate = (winning_tokens / total_tokens_traded * 100) if total_tokens_traded > 0 else 0
     
     # 7D metrics
-    buys_7d = sum(t[3] or 0 for t in trades_7d if t[0] == 'buy')
-    sells_7d = sum(t[3] or 0 for t in trades_7d if t[0] == 'sell')
-    sell_count_7d = len([t for t in trades_7d if t[0] == 'sell'])
     realized_pnl_7d = sells_7d - buys_7d
     pnl_pct_7d = (realized_pnl_7d / buys_7d * 100) if buys_7d > 0 else 0
     
@@ -2148,20 +1704,9 @@ def copy_trading_trader_analytics(address):
     total_pnl = total_sells - total_buys
     total_pnl_pct = (total_pnl / total_buys * 100) if total_buys > 0 else 0
     
-    # Calculate average duration (simplified - time between first buy and last sell per token)
-    token_durations = []
-    for asa_id in token_pnl.keys():
-        token_trades = [t for t in all_trades if t[6] == asa_id]
-        if len(token_trades) >= 2:
-            first_trade = min(token_trades, key=lambda x: x[4])
-            last_trade = max(token_trades, key=lambda x: x[4])
-            try:
-                first_time = datetime.fromisoformat(first_trade[4].replace('Z', '+00:00').split('.')[0])
-                last_time = datetime.fromisoformat(last_trade[4].replace('Z', '+00:00').split('.')[0])
-                duration = (last_time - first_time).total_seconds() / 60  # minutes
-                token_durations.append(duration)
-            except:
-                pass
+    # Average duration (simplified - minutes between first and last trade per token, from SQL)
+    token_durations = [position[11] for position in positions.values()
+                       if position[1] >= 2 and position[11] is not None]
     
     avg_duration_min = sum(token_durations) / len(token_durations) if token_durations else 0
     
@@ -2227,11 +1772,11 @@ def copy_trading_trader_analytics(address):
                 
                 total_value = balance * current_price
                 
-                # Calculate average buy price for this token
-                token_buy_trades = [t for t in all_trades if t[6] == asa_id and t[0] == 'buy']
-                if token_buy_trades and len(token_buy_trades) > 0:
-                    total_buy_value = sum(t[3] or 0 for t in token_buy_trades)
-                    total_buy_amount = sum(t[1] for t in token_buy_trades)
+                # Average buy price for this token, from the rollup
+                position = positions.get(asa_id)
+                if position:
+                    total_buy_amount = position[2]
+                    total_buy_value = position[3]
                     if total_buy_amount > 0 and current_price > 0:
                         avg_buy_price = total_buy_value / total_buy_amount
                         # Only calculate if we have valid prices
@@ -2260,18 +1805,17 @@ def copy_trading_trader_analytics(address):
         # Fallback to trade-based calculation
         for asa_id, pnl in token_pnl.items():
             if token_buys.get(asa_id, 0) > token_sells.get(asa_id, 0):
-                token_info = next((t for t in all_trades if t[6] == asa_id), None)
-                if token_info:
-                    holdings.append({
-                        "asa_id": asa_id,
-                        "token_name": token_info[7] or f"Token {asa_id}",
-                        "token_symbol": token_info[8] or f"ASA{asa_id}",
-                        "current_price": token_info[9] or 0,
-                        "market_cap": token_info[10] or 0,
-                        "amount": (token_buys.get(asa_id, 0) - token_sells.get(asa_id, 0)) / (token_info[9] or 1),
-                        "total_value": token_buys.get(asa_id, 0) - token_sells.get(asa_id, 0),
-                        "unrealized_pnl": 0
-                    })
+                token_info = positions[asa_id]
+                holdings.append({
+                    "asa_id": asa_id,
+                    "token_name": token_info[7] or f"Token {asa_id}",
+                    "token_symbol": token_info[8] or f"ASA{asa_id}",
+                    "current_price": token_info[9] or 0,
+                    "market_cap": token_info[10] or 0,
+                    "amount": (token_buys.get(asa_id, 0) - token_sells.get(asa_id, 0)) / (token_info[9] or 1),
+                    "total_value": token_buys.get(asa_id, 0) - token_sells.get(asa_id, 0),
+                    "unrealized_pnl": 0
+                })
     
     conn.close()
     
@@ -2284,14 +1828,14 @@ def copy_trading_trader_analytics(address):
             "total_pnl": total_pnl,
             "total_pnl_pct": total_pnl_pct,
             "unrealized_profits": unrealized_total,
-            "trades_7d": len(trades_7d),
-            "tokens_traded_7d": len(set(t[6] for t in trades_7d)),
+            "trades_7d": trade_count_7d,
+            "tokens_traded_7d": tokens_traded_7d,
             "avg_duration_min": avg_duration_min,
             "total_cost_7d": buys_7d,
-            "avg_cost": buys_7d / len(trades_7d) if trades_7d and len(trades_7d) > 0 else 0,
+            "avg_cost": buys_7d / trade_count_7d if trade_count_7d > 0 else 0,
             "avg_sold": sells_7d / sell_count_7d if sell_count_7d > 0 else 0,
             "avg_realized_profits": realized_pnl_7d / sell_count_7d if sell_count_7d > 0 else 0,
-            "fees_7d": sum(t[3] or 0 for t in trades_7d) * 0.02,  # 2% platform fee estimate
+            "fees_7d": value_7d * 0.02,  # 2% platform fee estimate
             "volume_7d": buys_7d + sells_7d,
             "total_tokens_traded": total_tokens_traded,
             "pnl_distribution": pnl_distribution,
@@ -2308,7 +1852,7 @@ def copy_trading_trader_trades(address):
     """
     limit = int(request.args.get('limit', 100))
 
-    conn = sqlite3.connect('creatorvault.db')
+    conn = get_db()
     cursor = conn.cursor()
 
     cursor.execute('''
@@ -2325,7 +1869,7 @@ def copy_trading_trader_trades(address):
         FROM trades t
         LEFT JOIN tokens tk ON t.asa_id = tk.asa_id
         WHERE t.trader_address = ?
-        ORDER BY t.created_at DESC
+        ORDER BY t.created_at_ms DESC
         LIMIT ?
     ''', (address, limit))
 
@@ -2359,7 +1903,7 @@ def get_portfolio(address):
     Aggregate real holdings per token for a wallet based on trades.
     This is a simple on-chain-like portfolio view using our trades ledger.
     """
-    conn = sqlite3.connect('creatorvault.db')
+    conn = get_db()
     cursor = conn.cursor()
 
     # Sum net token amounts per ASA (buys - sells)
@@ -2410,7 +1954,7 @@ def copy_trading_profiles():
     POST: create/update profile
     GET: list profiles for follower or leader
     """
-    conn = sqlite3.connect('creatorvault.db')
+    conn = get_db()
     cursor = conn.cursor()
 
     if request.method == 'POST':
@@ -2478,7 +2022,7 @@ def bot_strategies():
     Store and list engagement-based bot strategies.
     Execution is not automatic; these are configs only.
     """
-    conn = sqlite3.connect('creatorvault.db')
+    conn = get_db()
     cursor = conn.cursor()
 
     if request.method == 'POST':
@@ -2540,7 +2084,7 @@ def bot_strategies():
 @handle_errors
 def get_strategy_executions(strategy_id):
     """Get all trades executed by a strategy"""
-    conn = sqlite3.connect('creatorvault.db')
+    conn = get_db()
     cursor = conn.cursor()
     
     cursor.execute('''
@@ -2559,7 +2103,7 @@ def get_strategy_executions(strategy_id):
         FROM strategy_executions se
         LEFT JOIN tokens t ON se.asa_id = t.asa_id
         WHERE se.strategy_id = ?
-        ORDER BY se.executed_at DESC
+        ORDER BY se.executed_at_ms DESC
         LIMIT 100
     ''', (strategy_id,))
     
@@ -2607,7 +2151,7 @@ def execute_strategy(strategy_id):
     if not all([trader_address, asa_id, trade_type, amount, price, total_value]):
         return jsonify({"success": False, "error": "Missing required fields"}), 400
     
-    conn = sqlite3.connect('creatorvault.db')
+    conn = get_db()
     cursor = conn.cursor()
     
     # Record the execution
@@ -2638,7 +2182,7 @@ def generate_referral_code():
     import secrets
     import string
     
-    conn = sqlite3.connect('creatorvault.db')
+    conn = get_db()
     cursor = conn.cursor()
     
     # Check if user already has a code
@@ -2685,7 +2229,7 @@ def register_referral():
     if not referral_code or not referred_address:
         return jsonify({"success": False, "error": "referral_code and referred_address are required"}), 400
     
-    conn = sqlite3.connect('creatorvault.db')
+    conn = get_db()
     cursor = conn.cursor()
     
     # Check if already referred
@@ -2728,7 +2272,7 @@ def register_referral():
 @handle_errors
 def get_referral_earnings(address):
     """Get referral earnings for a referrer"""
-    conn = sqlite3.connect('creatorvault.db')
+    conn = get_db()
     cursor = conn.cursor()
     
     # Get total earnings from referral_earnings table (more accurate)
@@ -2766,7 +2310,7 @@ def get_referral_earnings(address):
         LEFT JOIN trades t ON re.trade_id = t.id
         LEFT JOIN tokens ON t.asa_id = tokens.asa_id
         WHERE re.referrer_address = ?
-        ORDER BY re.created_at DESC
+        ORDER BY re.created_at_ms DESC
         LIMIT 100
     ''', (address,))
     
@@ -2848,7 +2392,7 @@ def get_token_details(token_identifier):
     Supports both asa_id (int) for legacy Algorand tokens and token_id (string) for Aptos tokens
     """
     try:
-        conn = sqlite3.connect('creatorvault.db')
+        conn = get_db()
         cursor = conn.cursor()
         
         # Try to find token - check token_id, metadata_address, and asa_id
@@ -2881,19 +2425,14 @@ def get_token_details(token_identifier):
         columns = [description[0] for description in cursor.description]
         token_dict = dict(zip(columns, row))
         
-        # Parse bonding curve if available
+        # Bonding curve from the resident registry
         bonding_curve_config = None
         bonding_curve_state = None
-        if token_dict.get('bonding_curve_config'):
-            try:
-                bonding_curve_config = json.loads(token_dict['bonding_curve_config'])
-            except:
-                pass
-        if token_dict.get('bonding_curve_state'):
-            try:
-                bonding_curve_state = json.loads(token_dict['bonding_curve_state'])
-            except:
-                pass
+        entry = curve_registry.get(token_identifier) if curve_registry is not None else None
+        if entry is not None and entry.curve is not None:
+            bonding_curve_config = entry.curve.to_dict()
+            bonding_curve_state = entry.state.to_dict()
+            token_dict['current_price'] = entry.current_price
         
         # Get recent trades count - support both asa_id and token_id
         # For Aptos tokens, trades table uses asa_id (TEXT) which should match token_id
@@ -2926,7 +2465,7 @@ def get_token_details(token_identifier):
 def get_user_tokens(address):
     """Get all tokens created by a specific wallet address"""
     try:
-        conn = sqlite3.connect('creatorvault.db')
+        conn = get_db()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -2976,7 +2515,7 @@ def get_user_tokens(address):
 def get_creator_earnings(address):
     """Get total earnings for a creator from trading fees"""
     try:
-        conn = sqlite3.connect('creatorvault.db')
+        conn = get_db()
         cursor = conn.cursor()
 
         # Get all tokens created by this address
@@ -3027,55 +2566,60 @@ def bonding_curve_buy():
         if not asa_id or not token_amount or not trader_address:
             return jsonify({"success": False, "error": "Missing required fields"}), 400
         
-        conn = sqlite3.connect('creatorvault.db')
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT bonding_curve_config, bonding_curve_state, current_price FROM tokens WHERE asa_id = ?', (asa_id,))
-        row = cursor.fetchone()
-        
-        if not row:
+        entry = curve_registry.get(asa_id)
+        if entry is None:
             return jsonify({"success": False, "error": "Token not found"}), 404
         
-        bonding_curve_config_json, bonding_curve_state_json, current_price = row
-        
-        if not bonding_curve_config_json or not bonding_curve_state_json:
-            return jsonify({"success": False, "error": "Bonding curve not initialized"}), 400
-        
-        curve = BondingCurve.from_dict(json.loads(bonding_curve_config_json))
-        state = BondingCurveState.from_dict(json.loads(bonding_curve_state_json))
-        
-        result = curve.calculate_buy_price(state.token_supply, state.algo_reserve, token_amount)
-        new_state = BondingCurveState(token_supply=result['new_supply'], algo_reserve=result['new_algo_reserve'])
-        
-        # Calculate trading fees (5% creator fee, 2% platform fee)
-        CREATOR_FEE_RATE = 0.05  # 5%
-        PLATFORM_FEE_RATE = 0.02  # 2%
-        REFERRAL_FEE_RATE = 0.0001  # 0.01%
-        total_value = result['algo_cost']
-        creator_fee = total_value * CREATOR_FEE_RATE
-        platform_fee = total_value * PLATFORM_FEE_RATE
-        
-        # Check for referral and calculate referral earnings
-        referral_earnings = 0
-        referral_code = None
-        cursor.execute('SELECT referrer_address, referral_code FROM referrals WHERE referred_address = ?', (trader_address,))
-        referral_row = cursor.fetchone()
-        if referral_row:
-            referrer_address, referral_code = referral_row
-            referral_earnings = total_value * REFERRAL_FEE_RATE
-            # Update referral stats
-            cursor.execute('''
-                UPDATE referrals 
-                SET total_earnings = total_earnings + ?,
-                    total_trades_count = total_trades_count + 1,
-                    total_volume = total_volume + ?
-                WHERE referred_address = ?
-            ''', (referral_earnings, total_value, trader_address))
-        
-        # Get creator address from token
-        cursor.execute('SELECT creator FROM tokens WHERE asa_id = ?', (asa_id,))
-        creator_row = cursor.fetchone()
-        creator_address = creator_row[0] if creator_row else None
+        # Price, record and apply in one transaction under the database write
+        # lock, so trades on any worker never price off the same curve state
+        with curve_registry.trade(entry) as conn:
+            cursor = conn.cursor()
+            curve, state = entry.pricing_curve()
+            if entry.curve is None:
+                # Same default curve the estimates price a token without one against
+                curve_registry.apply_curve(conn, entry, curve, state)
+            current_price = entry.current_price
+            result = curve.calculate_buy_price(state.token_supply, state.algo_reserve, token_amount)
+            
+            # Calculate trading fees (5% creator fee, 2% platform fee)
+            CREATOR_FEE_RATE = 0.05  # 5%
+            PLATFORM_FEE_RATE = 0.02  # 2%
+            REFERRAL_FEE_RATE = 0.0001  # 0.01%
+            total_value = result['algo_cost']
+            creator_fee = total_value * CREATOR_FEE_RATE
+            platform_fee = total_value * PLATFORM_FEE_RATE
+            
+            # Check for referral and calculate referral earnings
+            referral_earnings = 0
+            referral_code = None
+            cursor.execute('SELECT referrer_address, referral_code FROM referrals WHERE referred_address = ?', (trader_address,))
+            referral_row = cursor.fetchone()
+            if referral_row:
+                referrer_address, referral_code = referral_row
+                referral_earnings = total_value * REFERRAL_FEE_RATE
+                # Update referral stats
+                cursor.execute('''
+                    UPDATE referrals 
+                    SET total_earnings = total_earnings + ?,
+                        total_trades_count = total_trades_count + 1,
+                        total_volume = total_volume + ?
+                    WHERE referred_address = ?
+                ''', (referral_earnings, total_value, trader_address))
+            
+            cursor.execute('INSERT INTO trades (asa_id, trader_address, trade_type, amount, price, transaction_id, creator_fee, platform_fee, total_value, referral_code, referral_earnings) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                          (entry.trade_asa_id, trader_address, 'buy', token_amount, result['new_price'], data.get('transaction_id', ''), creator_fee, platform_fee, total_value, referral_code, referral_earnings))
+            
+            # Record referral earnings if applicable
+            if referral_row and referral_earnings > 0:
+                trade_id = cursor.lastrowid
+                cursor.execute('''
+                    INSERT INTO referral_earnings (referrer_address, referred_address, trade_id, earnings, trade_value)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (referrer_address, trader_address, trade_id, referral_earnings, total_value))
+            
+            curve_registry.apply_state(conn, entry, result['new_supply'], result['new_algo_reserve'], result['new_price'])
+        
+        creator_address = entry.creator
         
         # Transfer tokens from creator to buyer
         # NOTE: This only works if the token creator is the backend wallet
@@ -3099,35 +2643,19 @@ def bonding_curve_buy():
                         sp=sp,
                         receiver=trader_address,
                         amt=token_amount_int,
-                        index=int(asa_id)
+                        index=int(entry.asa_id)
                     )
                     
                     # Sign and send
                     signed_asset = asset_txn.sign(creator_private_key)
                     token_transfer_txid = algod_client.send_transaction(signed_asset)
-                    logger.info(f"✅ Token transfer sent: {token_transfer_txid} (ASA {asa_id}, {token_amount_int} tokens to {trader_address})")
+                    logger.info(f"✅ Token transfer sent: {token_transfer_txid} (ASA {entry.asa_id}, {token_amount_int} tokens to {trader_address})")
                 else:
                     logger.warning(f"⚠️ Token creator ({creator_address}) doesn't match backend wallet ({creator_wallet_address}). Creator must manually transfer tokens or use smart contract.")
             except Exception as e:
                 logger.error(f"Error transferring tokens: {e}")
                 # Continue even if transfer fails - user already paid APTOS
         
-        cursor.execute('UPDATE tokens SET bonding_curve_state = ?, current_price = ?, market_cap = ? WHERE asa_id = ?',
-                      (json.dumps(new_state.to_dict()), result['new_price'], result['new_supply'] * result['new_price'], asa_id))
-        cursor.execute('INSERT INTO trades (asa_id, trader_address, trade_type, amount, price, transaction_id, creator_fee, platform_fee, total_value, referral_code, referral_earnings) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
-                      (asa_id, trader_address, 'buy', token_amount, result['new_price'], data.get('transaction_id', ''), creator_fee, platform_fee, total_value, referral_code, referral_earnings))
-        
-        # Record referral earnings if applicable
-        if referral_row and referral_earnings > 0:
-            trade_id = cursor.lastrowid
-            cursor.execute('''
-                INSERT INTO referral_earnings (referrer_address, referred_address, trade_id, earnings, trade_value)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (referrer_address, trader_address, trade_id, referral_earnings, total_value))
-        
-        conn.commit()
-        conn.close()
-        
         return jsonify({
             "success": True,
             "algo_cost": result['algo_cost'],
@@ -3156,65 +2684,53 @@ def bonding_curve_sell():
         if not asa_id or not token_amount or not trader_address:
             return jsonify({"success": False, "error": "Missing required fields"}), 400
         
-        conn = sqlite3.connect('creatorvault.db')
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT bonding_curve_config, bonding_curve_state, current_price FROM tokens WHERE asa_id = ?', (asa_id,))
-        row = cursor.fetchone()
-        
-        if not row:
+        entry = curve_registry.get(asa_id)
+        if entry is None:
             return jsonify({"success": False, "error": "Token not found"}), 404
         
-        bonding_curve_config_json, bonding_curve_state_json, current_price = row
-        
-        if not bonding_curve_config_json or not bonding_curve_state_json:
-            return jsonify({"success": False, "error": "Bonding curve not initialized"}), 400
-        
-        curve = BondingCurve.from_dict(json.loads(bonding_curve_config_json))
-        state = BondingCurveState.from_dict(json.loads(bonding_curve_state_json))
-        
-        result = curve.calculate_sell_price(state.token_supply, state.algo_reserve, token_amount)
-        new_state = BondingCurveState(token_supply=result['new_supply'], algo_reserve=result['new_algo_reserve'])
-        
-        # Calculate trading fees (5% creator fee, 2% platform fee)
-        CREATOR_FEE_RATE = 0.05  # 5%
-        PLATFORM_FEE_RATE = 0.02  # 2%
-        total_value = result['algo_received']
-        creator_fee = total_value * CREATOR_FEE_RATE
-        platform_fee = total_value * PLATFORM_FEE_RATE
-        
-        # Check for referral and calculate referral earnings
-        referral_earnings = 0
-        referral_code = None
-        cursor.execute('SELECT referrer_address, referral_code FROM referrals WHERE referred_address = ?', (trader_address,))
-        referral_row = cursor.fetchone()
-        if referral_row:
-            referrer_address, referral_code = referral_row
-            REFERRAL_FEE_RATE = 0.0001  # 0.01%
-            referral_earnings = total_value * REFERRAL_FEE_RATE
-            cursor.execute('''
-                UPDATE referrals 
-                SET total_earnings = total_earnings + ?,
-                    total_trades_count = total_trades_count + 1,
-                    total_volume = total_volume + ?
-                WHERE referred_address = ?
-            ''', (referral_earnings, total_value, trader_address))
-        
-        cursor.execute('UPDATE tokens SET bonding_curve_state = ?, current_price = ?, market_cap = ? WHERE asa_id = ?',
-                      (json.dumps(new_state.to_dict()), result['new_price'], result['new_supply'] * result['new_price'], asa_id))
-        cursor.execute('INSERT INTO trades (asa_id, trader_address, trade_type, amount, price, transaction_id, creator_fee, platform_fee, total_value, referral_code, referral_earnings) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
-                      (asa_id, trader_address, 'sell', token_amount, result['new_price'], data.get('transaction_id', ''), creator_fee, platform_fee, total_value, referral_code, referral_earnings))
-        
-        # Record referral earnings if applicable
-        if referral_row and referral_earnings > 0:
-            trade_id = cursor.lastrowid
-            cursor.execute('''
-                INSERT INTO referral_earnings (referrer_address, referred_address, trade_id, earnings, trade_value)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (referrer_address, trader_address, trade_id, referral_earnings, total_value))
-        
-        conn.commit()
-        conn.close()
+        with curve_registry.trade(entry) as conn:
+            cursor = conn.cursor()
+            if entry.curve is None:
+                return jsonify({"success": False, "error": "Bonding curve not initialized"}), 400
+            current_price = entry.current_price
+            result = entry.curve.calculate_sell_price(entry.state.token_supply, entry.state.algo_reserve, token_amount)
+            
+            # Calculate trading fees (5% creator fee, 2% platform fee)
+            CREATOR_FEE_RATE = 0.05  # 5%
+            PLATFORM_FEE_RATE = 0.02  # 2%
+            total_value = result['algo_received']
+            creator_fee = total_value * CREATOR_FEE_RATE
+            platform_fee = total_value * PLATFORM_FEE_RATE
+            
+            # Check for referral and calculate referral earnings
+            referral_earnings = 0
+            referral_code = None
+            cursor.execute('SELECT referrer_address, referral_code FROM referrals WHERE referred_address = ?', (trader_address,))
+            referral_row = cursor.fetchone()
+            if referral_row:
+                referrer_address, referral_code = referral_row
+                REFERRAL_FEE_RATE = 0.0001  # 0.01%
+                referral_earnings = total_value * REFERRAL_FEE_RATE
+                cursor.execute('''
+                    UPDATE referrals 
+                    SET total_earnings = total_earnings + ?,
+                        total_trades_count = total_trades_count + 1,
+                        total_volume = total_volume + ?
+                    WHERE referred_address = ?
+                ''', (referral_earnings, total_value, trader_address))
+            
+            cursor.execute('INSERT INTO trades (asa_id, trader_address, trade_type, amount, price, transaction_id, creator_fee, platform_fee, total_value, referral_code, referral_earnings) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                          (entry.trade_asa_id, trader_address, 'sell', token_amount, result['new_price'], data.get('transaction_id', ''), creator_fee, platform_fee, total_value, referral_code, referral_earnings))
+            
+            # Record referral earnings if applicable
+            if referral_row and referral_earnings > 0:
+                trade_id = cursor.lastrowid
+                cursor.execute('''
+                    INSERT INTO referral_earnings (referrer_address, referred_address, trade_id, earnings, trade_value)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (referrer_address, trader_address, trade_id, referral_earnings, total_value))
+            
+            curve_registry.apply_state(conn, entry, result['new_supply'], result['new_algo_reserve'], result['new_price'])
         
         return jsonify({
             "success": True,
@@ -3231,110 +2747,75 @@ def fetch_aptos_contract_state(creator_address, token_id):
     """
     Fetch current supply and APT reserve from Aptos contract
     Returns (current_supply, apt_reserve) or (None, None) if fetch fails
+    
+    Supply and reserve are queried on both module addresses concurrently;
+    the current module wins when the token exists under both.
     """
-    APTOS_NODE_URL = 'https://fullnode.testnet.aptoslabs.com/v1'
-    MODULE_ADDRESS = '0x033349213be67033ffd596fa85b69ab5c3ff82a508bb446002c8419d549d12c6'
-    OLD_MODULE_ADDRESS = '0xfbc34c56aab6dcbe5aa1c9c47807e8fc80f0e674341b11a5b4b6a742764cd0e2'
+    try:
+        state = get_view_client().token_state(creator_address, token_id)
+    except Exception as e:
+        logger.error(f"❌ Error fetching contract state: {e}")
+        return None, None
     
-    # Convert token_id string to hex bytes
-    token_id_bytes = token_id.encode('utf-8')
-    token_id_hex = '0x' + ''.join([f'{b:02x}' for b in token_id_bytes])
+    if state is None:
+        logger.warning(f"⚠️ Contract state not found for token {str(token_id)[:50]} in either contract")
+        return None, None
+    
+    current_supply, apt_reserve, module_address = state
+    logger.info(f"✅ Fetched contract state from {module_address[:10]}...: supply={current_supply}, reserve={apt_reserve} APT")
+    return current_supply, apt_reserve
+
+def curve_estimate(entry, trade_type: str, mode: str, token_amount: float, apt_amount: float):
+    """Estimate priced on the resident curve that /buy and /sell trade against
     
+    Budget mode uses the exact k-derived inverses, so buying the returned
+    token_amount costs apt_amount (selling it returns apt_amount).
+    """
+    curve, state = entry.pricing_curve()
+    supply, reserve = state.token_supply, state.algo_reserve
+    spot_price = curve.get_current_price(supply, reserve)
     try:
-        # Try new contract first
-        response = requests.post(
-            f'{APTOS_NODE_URL}/view',
-            json={
-                'function': f'{MODULE_ADDRESS}::creator_token::get_current_supply',
-                'type_arguments': [],
-                'arguments': [creator_address, token_id_hex]
-            },
-            headers={'Content-Type': 'application/json'},
-            timeout=5
-        )
-        
-        if response.ok:
-            data = response.json()
-            current_supply = int(data[0] or '0', 10)
-            
-            # Fetch APT reserve
-            reserve_response = requests.post(
-                f'{APTOS_NODE_URL}/view',
-                json={
-                    'function': f'{MODULE_ADDRESS}::creator_token::get_apt_reserve',
-                    'type_arguments': [],
-                    'arguments': [creator_address, token_id_hex]
-                },
-                headers={'Content-Type': 'application/json'},
-                timeout=5
-            )
-            
-            if reserve_response.ok:
-                reserve_data = reserve_response.json()
-                # Convert octas to APT (1 APT = 100000000 octas)
-                apt_reserve_octas = int(reserve_data[0] or '0', 10)
-                apt_reserve = apt_reserve_octas / 100000000
-                
-                logger.info(f"✅ Fetched contract state: supply={current_supply}, reserve={apt_reserve} APT")
-                return current_supply, apt_reserve
+        if trade_type == 'buy':
+            if mode == 'budget':
+                quote = curve.calculate_tokens_for_budget(supply, reserve, apt_amount)
             else:
-                # If reserve fetch fails, try old contract
-                logger.warning(f"⚠️ Failed to fetch reserve from new contract, trying old contract...")
-        elif response.status_code == 400:
-            error_text = response.text
-            if 'Failed to borrow global resource' in error_text:
-                logger.warning(f"⚠️ Token not found in new contract, trying old contract...")
+                quote = dict(curve.calculate_buy_price(supply, reserve, token_amount), token_amount=token_amount)
+            algo_key = 'algo_cost'
+        else:
+            if mode == 'budget':
+                quote = curve.calculate_tokens_for_proceeds(supply, reserve, apt_amount)
             else:
-                raise Exception(f"Failed to fetch supply: {response.status_code}")
-    except Exception as e:
-        logger.warning(f"⚠️ Error fetching from new contract: {e}, trying old contract...")
+                quote = dict(curve.calculate_sell_price(supply, reserve, token_amount), token_amount=token_amount)
+            algo_key = 'algo_received'
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     
-    # Try old contract as fallback
-    try:
-        response = requests.post(
-            f'{APTOS_NODE_URL}/view',
-            json={
-                'function': f'{OLD_MODULE_ADDRESS}::creator_token::get_current_supply',
-                'type_arguments': [],
-                'arguments': [creator_address, token_id_hex]
-            },
-            headers={'Content-Type': 'application/json'},
-            timeout=5
-        )
-        
-        if response.ok:
-            data = response.json()
-            current_supply = int(data[0] or '0', 10)
-            
-            # Fetch APT reserve from old contract
-            reserve_response = requests.post(
-                f'{APTOS_NODE_URL}/view',
-                json={
-                    'function': f'{OLD_MODULE_ADDRESS}::creator_token::get_apt_reserve',
-                    'type_arguments': [],
-                    'arguments': [creator_address, token_id_hex]
-                },
-                headers={'Content-Type': 'application/json'},
-                timeout=5
-            )
-            
-            if reserve_response.ok:
-                reserve_data = reserve_response.json()
-                apt_reserve_octas = int(reserve_data[0] or '0', 10)
-                apt_reserve = apt_reserve_octas / 100000000
-                
-                logger.info(f"✅ Fetched contract state from old contract: supply={current_supply}, reserve={apt_reserve} APT")
-                return current_supply, apt_reserve
-    except Exception as e:
-        logger.error(f"❌ Error fetching from old contract: {e}")
-    
-    return None, None
+    return jsonify({
+        "success": True,
+        "token_amount": quote['token_amount'],
+        algo_key: quote[algo_key],
+        "new_price": quote['new_price'],
+        "basis": "curve",
+        "price_impact": abs(quote['new_price'] - spot_price) / spot_price * 100 if spot_price > 0 else 0
+    })
 
 @app.route('/api/bonding-curve/estimate', methods=['POST'])
 @handle_errors
 def bonding_curve_estimate():
     """Estimate trade without executing
     Supports both asa_id (int) for legacy Algorand tokens and token_id (string) for Aptos tokens
+    
+    mode='tokens' (default) prices token_amount; mode='budget' returns the
+    token_amount that apt_amount buys (or that must be sold to receive it).
+    
+    basis='curve' (the default in budget mode) prices the resident curve
+    that /buy, /sell and /api/bonding-curve/estimate-ladder use, so a budget
+    estimate's token_amount can be passed straight to /buy. basis='linear'
+    (the default in tokens mode) prices on-chain (or database) state with
+    the contract's reserve / supply model instead; its "basis" in the
+    response says where that state came from: 'contract' (on-chain view),
+    'database' (tokens row) or 'trades' / 'fallback' (reconstructed when
+    neither had a supply).
     """
     if BondingCurve is None:
         return jsonify({"success": False, "error": "Bonding curve not available"}), 500
@@ -3344,85 +2825,44 @@ def bonding_curve_estimate():
         token_identifier = data.get('asa_id') or data.get('token_id')  # Support both
         token_amount = float(data.get('token_amount', 0))
         trade_type = data.get('trade_type', 'buy')
+        mode = data.get('mode', 'tokens')
+        apt_amount = float(data.get('apt_amount', 0))
         
         if not token_identifier:
             return jsonify({"success": False, "error": "Missing asa_id or token_id"}), 400
-        
-        conn = sqlite3.connect('creatorvault.db')
+        if mode not in ('tokens', 'budget'):
+            return jsonify({"success": False, "error": "mode must be 'tokens' or 'budget'"}), 400
+        if mode == 'budget' and apt_amount <= 0:
+            return jsonify({"success": False, "error": "apt_amount must be greater than 0"}), 400
+        price_basis = data.get('basis', 'curve' if mode == 'budget' else 'linear')
+        if price_basis not in ('curve', 'linear'):
+            return jsonify({"success": False, "error": "basis must be 'curve' or 'linear'"}), 400
+        
+        conn = get_db()
         cursor = conn.cursor()
         
-        # Try to find token - check token_id (content_id), metadata_address, and asa_id
-        # This handles all possible identifier formats
-        row = None
-        
-        # First, try as token_id (content_id string) - this is the primary identifier for Aptos tokens
-        cursor.execute('SELECT bonding_curve_config, bonding_curve_state, current_price, total_supply FROM tokens WHERE token_id = ?', (str(token_identifier),))
-        row = cursor.fetchone()
-        
-        # If not found, try as metadata_address (for Aptos tokens, this might be a numeric string)
-        if not row:
-            cursor.execute('SELECT bonding_curve_config, bonding_curve_state, current_price, total_supply FROM tokens WHERE metadata_address = ?', (str(token_identifier),))
-            row = cursor.fetchone()
+        # Resident curve registry resolves token_id (content_id), metadata_address and asa_id
+        entry = curve_registry.get(token_identifier)
         
-        # If still not found, try as asa_id (integer) for legacy tokens
-        if not row:
-            try:
-                asa_id_int = int(token_identifier)
-                cursor.execute('SELECT bonding_curve_config, bonding_curve_state, current_price, total_supply FROM tokens WHERE asa_id = ?', (asa_id_int,))
-                row = cursor.fetchone()
-            except ValueError:
-                # Not a valid integer, all queries failed, so token doesn't exist
-                pass
-        
-        if not row:
+        if entry is None:
             conn.close()
             logger.warning(f"Token not found: token_identifier={token_identifier} (tried as token_id, metadata_address, and asa_id)")
             return jsonify({"success": False, "error": "Token not found"}), 404
         
-        bonding_curve_config_json, bonding_curve_state_json, current_price, total_supply = row
+        if price_basis == 'curve':
+            conn.close()
+            return curve_estimate(entry, trade_type, mode, token_amount, apt_amount)
         
-        # Initialize bonding curve if missing or empty
-        if (not bonding_curve_config_json or not bonding_curve_state_json or 
-            (isinstance(bonding_curve_config_json, str) and bonding_curve_config_json.strip() == '') or
-            (isinstance(bonding_curve_state_json, str) and bonding_curve_state_json.strip() == '')):
-            logger.warning(f"Bonding curve not initialized for token {token_identifier}, initializing now...")
-            # Start with $0 price (bonding curve will set price as tokens are bought)
-            initial_price = 0.0
-            bonding_curve = BondingCurve(
-                initial_price=initial_price,
-                initial_supply=int(total_supply) if total_supply else 1000000
-            )
-            bonding_curve_state = BondingCurveState(
-                token_supply=0,
-                algo_reserve=0
-            )
-            bonding_curve_config_json = json.dumps(bonding_curve.to_dict())
-            bonding_curve_state_json = json.dumps(bonding_curve_state.to_dict())
-            
-            # Update database - support both asa_id and token_id
-            try:
-                asa_id_int = int(token_identifier)
-                cursor.execute('''
-                    UPDATE tokens 
-                    SET bonding_curve_config = ?, bonding_curve_state = ?
-                    WHERE asa_id = ?
-                ''', (bonding_curve_config_json, bonding_curve_state_json, asa_id_int))
-            except ValueError:
-                cursor.execute('''
-                    UPDATE tokens 
-                    SET bonding_curve_config = ?, bonding_curve_state = ?
-                    WHERE token_id = ?
-                ''', (bonding_curve_config_json, bonding_curve_state_json, token_identifier))
-            conn.commit()
-            logger.info(f"✅ Initialized bonding curve for token {token_identifier}")
+        current_price = entry.current_price
         
-        curve = BondingCurve.from_dict(json.loads(bonding_curve_config_json))
-        state = BondingCurveState.from_dict(json.loads(bonding_curve_state_json))
+        # A token without a curve starts from the default (empty) state; the first trade stores it
+        _, state = entry.pricing_curve()
         
         # Get current supply and reserve from contract if available
         # For Aptos tokens, try to fetch from contract, otherwise use database state
         current_supply = state.token_supply
         current_reserve = state.algo_reserve
+        basis = 'database'
         
         # For Aptos tokens (token_id is string), try to fetch actual supply from contract
         # This ensures we have the latest state even if database isn't synced
@@ -3444,18 +2884,10 @@ def bonding_curve_estimate():
         
         if is_aptos_token:
             # Aptos token - fetch actual supply and reserve from contract
-            # Try multiple ways to find the token: token_id, metadata_address, or content_id
             creator_address = None
             content_id = None
             
-            # First try: token_id (content_id)
-            cursor.execute('SELECT creator, content_id FROM tokens WHERE token_id = ?', (token_identifier,))
-            creator_row = cursor.fetchone()
-            
-            # Second try: metadata_address
-            if not creator_row:
-                cursor.execute('SELECT creator, content_id FROM tokens WHERE metadata_address = ?', (token_identifier,))
-                creator_row = cursor.fetchone()
+            creator_row = (entry.creator, entry.content_id)
             
             if creator_row and creator_row[0]:
                 creator_address = creator_row[0]
@@ -3469,6 +2901,7 @@ def bonding_curve_estimate():
                     # Use contract state (most accurate)
                     current_supply = contract_supply
                     current_reserve = contract_reserve
+                    basis = 'contract'
                     logger.info(f"✅ Using contract state: supply={current_supply}, reserve={current_reserve} APT for token {token_identifier}")
                 else:
                     # Fallback: try to estimate from trades if contract fetch failed
@@ -3493,6 +2926,7 @@ def bonding_curve_estimate():
                             estimated_reserve = buy_value - sell_value
                             if estimated_reserve > 0:
                                 current_reserve = estimated_reserve
+                            basis = 'trades'
                             logger.info(f"📊 Estimated supply from trades: {current_supply}, reserve: {current_reserve} for token {token_identifier}")
             else:
                 logger.warning(f"⚠️ Creator address not found for token {token_identifier}, using database state")
@@ -3503,6 +2937,14 @@ def bonding_curve_estimate():
             # Subsequent buys: price = reserve / supply
             base_price_per_token = 0.00001  # 0.00001 APT per token (contract base price)
             
+            if mode == 'budget':
+                # Linear basis: exact inverse of the pricing below, on the same state
+                unit_price = current_reserve / current_supply if current_supply > 0 else base_price_per_token
+                if unit_price <= 0:
+                    conn.close()
+                    return jsonify({"success": False, "error": "Token has no price to size a budget against"}), 400
+                token_amount = apt_amount / unit_price
+            
             if current_supply == 0:
                 # First buy: use base price
                 algo_cost = token_amount * base_price_per_token
@@ -3523,8 +2965,10 @@ def bonding_curve_estimate():
             conn.close()
             return jsonify({
                 "success": True,
+                "token_amount": token_amount,
                 "algo_cost": algo_cost,
                 "new_price": new_price,
+                "basis": basis,
                 "price_impact": ((new_price - (current_price if current_price > 0 else base_price_per_token)) / (current_price if current_price > 0 else base_price_per_token)) * 100 if (current_price > 0 or new_price > 0) else 0
             })
         else:
@@ -3539,8 +2983,7 @@ def bonding_curve_estimate():
                 except ValueError:
                     is_aptos = True
                     # Try to get creator and content_id for Aptos tokens
-                    cursor.execute('SELECT creator, content_id FROM tokens WHERE token_id = ? OR metadata_address = ?', (token_identifier, token_identifier))
-                    creator_row = cursor.fetchone()
+                    creator_row = (entry.creator, entry.content_id)
                     if creator_row and creator_row[0]:
                         creator_address = creator_row[0]
                         content_id = creator_row[1] or token_identifier
@@ -3551,6 +2994,7 @@ def bonding_curve_estimate():
                         if contract_supply is not None and contract_reserve is not None and contract_supply > 0:
                             current_supply = contract_supply
                             current_reserve = contract_reserve
+                            basis = 'contract'
                             logger.info(f"✅ Sell estimate: Using contract state - supply={current_supply}, reserve={contract_reserve} APT")
                         else:
                             logger.warning(f"⚠️ Sell estimate: Contract fetch returned None or 0 supply. supply={contract_supply}, reserve={contract_reserve}")
@@ -3598,6 +3042,7 @@ def bonding_curve_estimate():
                     estimated_reserve = buy_value - sell_value
                     if estimated_reserve > 0:
                         current_reserve = estimated_reserve
+                    basis = 'trades'
                     logger.info(f"✅ Re-estimated: Supply={current_supply}, Reserve={current_reserve}")
             
             # Final check: if still no supply, try one more time with retry logic
@@ -3610,8 +3055,7 @@ def bonding_curve_estimate():
                 except ValueError:
                     is_aptos = True
                     # Try to get creator and content_id
-                    cursor.execute('SELECT creator, content_id FROM tokens WHERE token_id = ? OR metadata_address = ?', (token_identifier, token_identifier))
-                    creator_row = cursor.fetchone()
+                    creator_row = (entry.creator, entry.content_id)
                     if creator_row and creator_row[0]:
                         creator_address = creator_row[0]
                         content_id = creator_row[1] or token_identifier
@@ -3622,6 +3066,7 @@ def bonding_curve_estimate():
                             if contract_supply is not None and contract_reserve is not None and contract_supply > 0:
                                 current_supply = contract_supply
                                 current_reserve = contract_reserve
+                                basis = 'contract'
                                 logger.info(f"✅ Last-chance contract fetch succeeded (attempt {retry+1}): supply={current_supply}, reserve={contract_reserve}")
                                 break
                             elif retry < 2:
@@ -3641,6 +3086,7 @@ def bonding_curve_estimate():
                                 # Use a conservative estimate: assume at least some tokens exist
                                 current_supply = max(token_amount, 100)  # At least the amount being sold
                                 current_reserve = current_supply * base_price_per_token
+                            basis = 'fallback'
                             logger.info(f"✅ Using fallback estimation: supply={current_supply}, reserve={current_reserve}")
                         elif current_supply <= 0:
                             logger.warning(f"⚠️ Sell estimate failed: Supply={current_supply}, Reserve={current_reserve}, Trades={trade_count}, Contract fetch failed after retries")
@@ -3666,6 +3112,12 @@ def bonding_curve_estimate():
                     }), 400
             
             current_price_apt = current_reserve / current_supply
+            if mode == 'budget':
+                # Linear basis: exact inverse of the pricing below, on the same state
+                if current_price_apt <= 0 or apt_amount > current_reserve:
+                    conn.close()
+                    return jsonify({"success": False, "error": "apt_amount exceeds the token's APT reserve"}), 400
+                token_amount = apt_amount / current_price_apt
             algo_received = token_amount * current_price_apt
             new_supply = current_supply - token_amount
             new_reserve = current_reserve - algo_received
@@ -3674,8 +3126,10 @@ def bonding_curve_estimate():
             conn.close()
             return jsonify({
                 "success": True,
+                "token_amount": token_amount,
                 "algo_received": algo_received,
                 "new_price": new_price,
+                "basis": basis,
                 "price_impact": ((current_price_apt - new_price) / current_price_apt) * 100 if current_price_apt > 0 else 0
             })
     except Exception as e:
@@ -3691,6 +3145,73 @@ def bonding_curve_estimate():
         except:
             pass
 
+# Upper bound on sizes per side for /api/bonding-curve/estimate-ladder
+ESTIMATE_LADDER_MAX_SIZES = int(os.getenv('ESTIMATE_LADDER_MAX_SIZES', '1000'))
+
+@app.route('/api/bonding-curve/estimate-ladder', methods=['POST'])
+@handle_errors
+def bonding_curve_estimate_ladder():
+    """Quote many trade sizes for one token in a single request
+    
+    Body: {"token_id" | "asa_id", "buy_amounts": [...], "sell_amounts": [...]}
+    Returns parallel arrays per side (token_amount, algo_cost/algo_received,
+    new_price, price_impact) priced from the resident curve state - the same
+    curve and state /api/bonding-curve/buy and /sell trade against. Sizes the
+    curve cannot fill come back as null.
+    
+    These match /api/bonding-curve/estimate with basis='curve'; its
+    basis='linear' prices on-chain state with the contract's reserve / supply
+    model instead, so those can differ. "basis": "curve" marks these quotes.
+    """
+    if BondingCurve is None:
+        return jsonify({"success": False, "error": "Bonding curve not available"}), 500
+    
+    data = request.get_json() or {}
+    token_identifier = data.get('asa_id') or data.get('token_id')
+    if not token_identifier:
+        return jsonify({"success": False, "error": "Missing asa_id or token_id"}), 400
+    
+    sides = {}
+    for side in ('buy', 'sell'):
+        amounts = data.get(f'{side}_amounts')
+        if amounts is None:
+            continue
+        if not isinstance(amounts, list):
+            return jsonify({"success": False, "error": f"{side}_amounts must be a list"}), 400
+        if len(amounts) > ESTIMATE_LADDER_MAX_SIZES:
+            return jsonify({"success": False, "error": f"At most {ESTIMATE_LADDER_MAX_SIZES} {side}_amounts per request"}), 400
+        try:
+            sides[side] = [float(amount) for amount in amounts]
+        except (TypeError, ValueError):
+            return jsonify({"success": False, "error": f"{side}_amounts must be numbers"}), 400
+    
+    if not sides:
+        return jsonify({"success": False, "error": "Provide buy_amounts and/or sell_amounts"}), 400
+    
+    entry = curve_registry.get(token_identifier)
+    if entry is None:
+        return jsonify({"success": False, "error": "Token not found"}), 404
+    
+    # Same default curve as /api/bonding-curve/estimate for a token without one (not stored)
+    curve, state = entry.pricing_curve()
+    current_supply = state.token_supply
+    current_reserve = state.algo_reserve
+    
+    response = {
+        "success": True,
+        "token_id": entry.key,
+        "token_supply": current_supply,
+        "algo_reserve": current_reserve,
+        "current_price": curve.get_current_price(current_supply, current_reserve),
+        "basis": "curve",
+    }
+    for side, amounts in sides.items():
+        ladder = curve.quote_ladder(current_supply, current_reserve, amounts, side=side)
+        ladder.pop('spot_price')
+        response[side] = ladder
+    
+    return jsonify(response)
+
 @app.route('/api/sync-contract-trade', methods=['POST'])
 @handle_errors
 def sync_contract_trade():
@@ -3711,37 +3232,28 @@ def sync_contract_trade():
         if not token_identifier or not trade_type or not transaction_id or not trader_address:
             return jsonify({"success": False, "error": "Missing required fields"}), 400
         
-        conn = sqlite3.connect('creatorvault.db')
-        cursor = conn.cursor()
-        
         # Find token by token_id or asa_id
-        try:
-            asa_id_int = int(token_identifier)
-            cursor.execute('SELECT asa_id, token_id, bonding_curve_config, bonding_curve_state, current_price, total_supply FROM tokens WHERE asa_id = ?', (asa_id_int,))
-        except ValueError:
-            cursor.execute('SELECT asa_id, token_id, bonding_curve_config, bonding_curve_state, current_price, total_supply FROM tokens WHERE token_id = ?', (token_identifier,))
-        
-        row = cursor.fetchone()
-        if not row:
-            conn.close()
+        entry = curve_registry.get(token_identifier)
+        if entry is None:
             return jsonify({"success": False, "error": "Token not found"}), 404
         
-        asa_id, token_id_db, bonding_curve_config_json, bonding_curve_state_json, current_price, total_supply = row
+        token_id_db = entry.token_id
         
-        # Use contract state if provided, otherwise estimate from trade
-        if current_supply is not None and apt_reserve is not None:
-            # Update bonding curve state with contract values
-            new_state = BondingCurveState(
-                token_supply=int(current_supply),
-                algo_reserve=float(apt_reserve)
-            )
-            new_price = float(apt_reserve) / int(current_supply) if int(current_supply) > 0 else 0.00001
-        else:
-            # Estimate from existing state + trade
-            if bonding_curve_config_json and bonding_curve_state_json:
-                curve = BondingCurve.from_dict(json.loads(bonding_curve_config_json))
-                state = BondingCurveState.from_dict(json.loads(bonding_curve_state_json))
-                
+        # Price state, trade row and balance cache in one transaction under the
+        # database write lock, serialised with bonding_curve_buy/sell on every worker
+        with curve_registry.trade(entry) as conn:
+            cursor = conn.cursor()
+            # Use contract state if provided, otherwise estimate from trade
+            if current_supply is not None and apt_reserve is not None:
+                # Update bonding curve state with contract values
+                new_state = BondingCurveState(
+                    token_supply=int(current_supply),
+                    algo_reserve=float(apt_reserve)
+                )
+                new_price = float(apt_reserve) / int(current_supply) if int(current_supply) > 0 else 0.00001
+            elif entry.state is not None:
+                # Estimate from existing state + trade
+                state = entry.state
                 if trade_type == 'buy':
                     # Buy: supply increases, reserve increases
                     new_state = BondingCurveState(
@@ -3762,73 +3274,45 @@ def sync_contract_trade():
                     algo_reserve=apt_amount if trade_type == 'buy' else 0
                 )
                 new_price = 0.00001
-        
-        # Update token state
-        try:
-            asa_id_int = int(token_identifier)
+            
+            curve_registry.apply_state(conn, entry, new_state.token_supply, new_state.algo_reserve, new_price)
+            
+            # Record trade in database (legacy asa_id, or the token_id for Aptos tokens)
             cursor.execute('''
-                UPDATE tokens 
-                SET bonding_curve_state = ?, current_price = ?, market_cap = ?
-                WHERE asa_id = ?
-            ''', (json.dumps(new_state.to_dict()), new_price, new_state.token_supply * new_price, asa_id_int))
-        except ValueError:
+                INSERT INTO trades (asa_id, trader_address, trade_type, amount, price, transaction_id, total_value)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (entry.trade_asa_id, trader_address, trade_type, token_amount, new_price, transaction_id, apt_amount))
+            
+            # Update or insert user balance cache (instant update after trade)
+            # For buy: balance increases, for sell: balance decreases
+            # Get current cached balance
             cursor.execute('''
-                UPDATE tokens 
-                SET bonding_curve_state = ?, current_price = ?, market_cap = ?
-                WHERE token_id = ?
-            ''', (json.dumps(new_state.to_dict()), new_price, new_state.token_supply * new_price, token_identifier))
-        
-        # Record trade in database
-        # Use asa_id from database, or token_identifier as string for Aptos tokens
-        trade_asa_id = asa_id if asa_id else token_identifier
-        
-        cursor.execute('''
-            INSERT INTO trades (asa_id, trader_address, trade_type, amount, price, transaction_id, total_value)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (str(trade_asa_id), trader_address, trade_type, token_amount, new_price, transaction_id, apt_amount))
-        
-        # Create user_balances table if it doesn't exist (cache for instant access)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS user_balances (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_address TEXT NOT NULL,
-                token_id TEXT NOT NULL,
-                creator_address TEXT NOT NULL,
-                balance REAL NOT NULL DEFAULT 0,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(user_address, token_id, creator_address)
-            )
-        ''')
-        
-        # Update or insert user balance cache (instant update after trade)
-        # For buy: balance increases, for sell: balance decreases
-        # Get current cached balance
-        cursor.execute('''
-            SELECT balance FROM user_balances 
-            WHERE user_address = ? AND token_id = ? AND creator_address = ?
-        ''', (trader_address, str(token_identifier), token_id_db or ''))
-        
-        cached_balance_row = cursor.fetchone()
-        current_cached_balance = cached_balance_row[0] if cached_balance_row else 0
-        
-        # Calculate new balance based on trade type
-        if trade_type == 'buy':
-            new_balance = current_cached_balance + token_amount
-        else:  # sell
-            new_balance = max(0, current_cached_balance - token_amount)
-        
-        # Update or insert cached balance
-        cursor.execute('''
-            INSERT INTO user_balances (user_address, token_id, creator_address, balance, updated_at)
-            VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
-            ON CONFLICT(user_address, token_id, creator_address) 
-            DO UPDATE SET balance = ?, updated_at = CURRENT_TIMESTAMP
-        ''', (trader_address, str(token_identifier), token_id_db or '', new_balance, new_balance))
+                SELECT balance FROM user_balances 
+                WHERE user_address = ? AND token_id = ? AND creator_address = ?
+            ''', (trader_address, str(token_identifier), token_id_db or ''))
+            
+            cached_balance_row = cursor.fetchone()
+            current_cached_balance = cached_balance_row[0] if cached_balance_row else 0
+            
+            # Calculate new balance based on trade type
+            if trade_type == 'buy':
+                new_balance = current_cached_balance + token_amount
+            else:  # sell
+                new_balance = max(0, current_cached_balance - token_amount)
+            
+            # Update or insert cached balance
+            cursor.execute('''
+                INSERT INTO user_balances (user_address, token_id, creator_address, balance, updated_at)
+                VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(user_address, token_id, creator_address) 
+                DO UPDATE SET balance = ?, updated_at = CURRENT_TIMESTAMP
+            ''', (trader_address, str(token_identifier), token_id_db or '', new_balance, new_balance))
         
         logger.info(f"💾 Cached user balance: {trader_address[:10]}... = {new_balance} tokens (trade: {trade_type} {token_amount})")
         
-        conn.commit()
-        conn.close()
+        # The trade is confirmed on-chain: adjust cached balances for premium gating in place
+        balance_cache.apply_trade(trader_address, entry.creator, (token_identifier, entry.token_id, entry.content_id),
+                                  trade_type, token_amount)
         
         logger.info(f"✅ Synced contract trade: {trade_type} {token_amount} tokens, tx={transaction_id}")
         
@@ -3863,26 +3347,9 @@ def get_user_balance_cache():
         if not all([user_address, token_id, creator_address]):
             return jsonify({"success": False, "error": "Missing required parameters"}), 400
         
-        conn = sqlite3.connect('creatorvault.db')
+        conn = get_db()
         cursor = conn.cursor()
         
-        # Ensure user_balances table exists
-        try:
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS user_balances (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_address TEXT NOT NULL,
-                    token_id TEXT NOT NULL,
-                    creator_address TEXT NOT NULL,
-                    balance REAL NOT NULL DEFAULT 0,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(user_address, token_id, creator_address)
-                )
-            ''')
-            conn.commit()
-        except sqlite3.Error as table_error:
-            logger.warning(f"Table creation warning (may already exist): {table_error}")
-        
         # Get cached balance
         cursor.execute('''
             SELECT balance, updated_at FROM user_balances 
@@ -4014,6 +3481,16 @@ def generate_photon_jwt():
         logger.error(traceback.format_exc())
         return jsonify({"success": False, "error": str(e)}), 500
 
+@app.route('/api/scrape/strategy-stats', methods=['GET'])
+def scrape_strategy_stats():
+    """Per-platform scrape strategy stats for this worker (success rate, latency, wins)"""
+    return jsonify({"success": True, "strategies": hedged_fetcher.stats()})
+
+@app.route('/api/scrape/cache-stats', methods=['GET'])
+def scrape_cache_stats():
+    """Scrape cache statistics for this worker (hits, stale hits, revalidations, 304s)"""
+    return jsonify({"success": True, "scrapeCache": scrape_cache.stats()})
+
 @app.route('/api/scrape-content', methods=['POST', 'OPTIONS'])
 @cross_origin(supports_credentials=True)
 @handle_errors
@@ -4043,21 +3520,15 @@ def scrape_content():
             else:
                 return jsonify({"success": False, "error": "Unsupported platform. Use Instagram, Twitter/X, or LinkedIn."}), 400
         
-        scraper = WebScraper()
-        result = None
-        
-        if platform == 'instagram':
-            result = scraper.scrape_instagram_reel(url)
-        elif platform == 'twitter' or platform == 'x':
-            result = scraper.scrape_twitter_tweet(url)
-        elif platform == 'linkedin':
-            result = scraper.scrape_linkedin_post(url)
-        elif platform == 'youtube':
+        if platform == 'youtube':
             # YouTube uses API, not scraping
             return jsonify({"success": False, "error": "YouTube content requires API authentication. Please use YouTube API."}), 400
-        else:
+        elif platform not in ('instagram', 'twitter', 'x', 'linkedin'):
             return jsonify({"success": False, "error": f"Unsupported platform: {platform}. Supported: instagram, twitter/x, linkedin"}), 400
         
+        # URLs seen recently answer from the cache, refreshed in the background once stale
+        result = scrape_cache.get(url, platform)
+        
         if result:
             return jsonify({
                 "success": True,
@@ -4074,6 +3545,64 @@ def scrape_content():
         logger.error(f"Error scraping content: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
 
+SCRAPE_BULK_MAX = int(os.getenv('SCRAPE_BULK_MAX', '500'))
+
+@app.route('/api/scrape/bulk', methods=['POST'])
+@cross_origin(supports_credentials=True)
+def scrape_content_bulk():
+    """
+    Scrape many Instagram / Twitter/X / LinkedIn URLs in one request
+    
+    Body: {"urls": [url | {"url", "platform"?}, ...], "maxAge"?: seconds,
+    "allowStale"?: bool (default true)}
+    Streams NDJSON: one line per distinct (normalized) URL as soon as it
+    finishes - {"url", "platform", "inputs", "success", "content" | "error"} -
+    then a summary line {"done": true, ...}.
+    """
+    data = request.get_json(silent=True) or {}
+    urls = data.get('urls')
+    if not isinstance(urls, list) or not urls:
+        return jsonify({"success": False, "error": "urls must be a non-empty list"}), 400
+    if len(urls) > SCRAPE_BULK_MAX:
+        return jsonify({"success": False, "error": f"At most {SCRAPE_BULK_MAX} URLs per request"}), 400
+    
+    items = []
+    for entry in urls:
+        if isinstance(entry, dict):
+            url, platform = entry.get('url'), entry.get('platform')
+        else:
+            url, platform = entry, None
+        if not isinstance(url, str) or not url.strip():
+            return jsonify({"success": False, "error": "Each URL must be a non-empty string"}), 400
+        items.append((url.strip(), platform.lower() if isinstance(platform, str) and platform else None))
+    
+    max_age = data.get('maxAge')
+    if max_age is not None and (isinstance(max_age, bool) or not isinstance(max_age, (int, float)) or max_age < 0):
+        return jsonify({"success": False, "error": "maxAge must be a non-negative number"}), 400
+    allow_stale = data.get('allowStale', True)
+    if not isinstance(allow_stale, bool):
+        return jsonify({"success": False, "error": "allowStale must be true or false"}), 400
+    
+    def generate():
+        started = time.monotonic()
+        succeeded = failed = 0
+        for outcome in scrape_cache.get_many(items, max_age=max_age, allow_stale=allow_stale):
+            outcome['success'] = 'content' in outcome
+            if outcome['success']:
+                succeeded += 1
+            else:
+                failed += 1
+            yield json.dumps(outcome) + '\n'
+        elapsed_ms = round((time.monotonic() - started) * 1000)
+        logger.info(f"📦 Bulk scrape: {succeeded} ok, {failed} failed in {elapsed_ms}ms")
+        yield json.dumps({"done": True, "succeeded": succeeded, "failed": failed, "elapsedMs": elapsed_ms}) + '\n'
+    
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    # Don't let proxies buffer the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
 @app.route('/api/verify-ownership', methods=['POST', 'OPTIONS'])
 @cross_origin(supports_credentials=True)
 def verify_ownership():
@@ -4181,7 +3710,7 @@ def get_youtube_videos():
             return jsonify({"success": False, "error": "No channel ID found"}), 404
         
         # First, try to get cached videos
-        conn = sqlite3.connect('creatorvault.db')
+        conn = get_db()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -4206,7 +3735,7 @@ def get_youtube_videos():
                 logger.info(f"✅ Returning cached YouTube videos for {channel_title} (cached {int(time_diff.total_seconds()/60)} minutes ago)")
                 
                 # Get channel info from cache or channel cache
-                conn2 = sqlite3.connect('creatorvault.db')
+                conn2 = get_db()
                 cursor2 = conn2.cursor()
                 cursor2.execute('''
                     SELECT channel_data FROM youtube_channel_cache 
@@ -4259,7 +3788,7 @@ def get_youtube_videos():
             
             if not channels_response.get('items'):
                 # Fall back to cached channel data
-                conn = sqlite3.connect('creatorvault.db')
+                conn = get_db()
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT channel_data FROM youtube_channel_cache 
@@ -4282,8 +3811,7 @@ def get_youtube_videos():
                 channel = channels_response['items'][0]
             
             # Get tokenized videos from database
-            init_db()
-            conn = sqlite3.connect('creatorvault.db')
+            conn = get_db()
             cursor = conn.cursor()
             
             tokenized_videos = {}
@@ -4339,7 +3867,7 @@ def get_youtube_videos():
                 videos.append(video_data)
             
             # Cache the videos
-            conn = sqlite3.connect('creatorvault.db')
+            conn = get_db()
             cursor = conn.cursor()
             cursor.execute('''
                 INSERT OR REPLACE INTO youtube_videos_cache 
@@ -4369,7 +3897,7 @@ def get_youtube_videos():
                 
                 if cache_row:
                     cached_data = json.loads(cached_videos_json)
-                    conn = sqlite3.connect('creatorvault.db')
+                    conn = get_db()
                     cursor = conn.cursor()
                     cursor.execute('''
                         SELECT channel_data FROM youtube_channel_cache 
@@ -4449,7 +3977,7 @@ def get_youtube_video_info():
         connected_channel_id = session_data.get('channel_id')
         
         # First, try to get cached video info
-        conn = sqlite3.connect('creatorvault.db')
+        conn = get_db()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -4476,7 +4004,7 @@ def get_youtube_video_info():
                 is_owned = (video_channel_id == connected_channel_id) if connected_channel_id else False
                 
                 # Check if already tokenized
-                conn2 = sqlite3.connect('creatorvault.db')
+                conn2 = get_db()
                 cursor2 = conn2.cursor()
                 # Try token_id first, fallback to asa_id for old schema
                 try:
@@ -4527,7 +4055,7 @@ def get_youtube_video_info():
                     video_channel_id = cached_video.get('channelId')
                     is_owned = (video_channel_id == connected_channel_id) if connected_channel_id else False
                     
-                    conn2 = sqlite3.connect('creatorvault.db')
+                    conn2 = get_db()
                     cursor2 = conn2.cursor()
                     cursor2.execute('SELECT token_id, token_name, token_symbol FROM tokens WHERE (content_id = ? OR content_url LIKE ?) AND platform = ?', 
                                   (video_id, f'%{video_id}%', 'youtube'))
@@ -4567,7 +4095,7 @@ def get_youtube_video_info():
                 logger.warning(f"⚠️ User tried to tokenize video from another channel. Video channel: {video_channel_id}, Connected channel: {connected_channel_id}")
             
             # Check if already tokenized
-            conn = sqlite3.connect('creatorvault.db')
+            conn = get_db()
             cursor = conn.cursor()
             # Try token_id first, fallback to asa_id for old schema
             try:
@@ -4634,7 +4162,7 @@ def get_youtube_video_info():
                     is_owned = (video_channel_id == connected_channel_id) if connected_channel_id else False
                     
                     # Check if already tokenized
-                    conn = sqlite3.connect('creatorvault.db')
+                    conn = get_db()
                     cursor = conn.cursor()
                     # Try token_id first, fallback to asa_id for old schema
                     try:
@@ -4706,11 +4234,11 @@ def create_prediction():
         # Calculate end time
         from datetime import datetime, timedelta
         end_time = datetime.now() + timedelta(hours=timeframe_hours)
+        end_time_ms = int(end_time.timestamp() * 1000)
         
         # Get initial metric value
         initial_value = 0
         try:
-            scraper = WebScraper()
             if platform == 'youtube':
                 # Use YouTube API
                 video_id = content_url.split('v=')[-1].split('&')[0]
@@ -4738,13 +4266,8 @@ def create_prediction():
                             initial_value = int(stats.get('commentCount', 0))
             else:
                 # Use platform-specific scraping methods
-                scraped = None
-                if platform == 'instagram':
-                    scraped = scraper.scrape_instagram_reel(content_url)
-                elif platform == 'twitter' or platform == 'x':
-                    scraped = scraper.scrape_twitter_tweet(content_url)
-                elif platform == 'linkedin':
-                    scraped = scraper.scrape_linkedin_post(content_url)
+                # A cached result within the platform TTL is recent enough for the starting value
+                scraped = scrape_cache.get(content_url, platform, allow_stale=False)
                 
                 if scraped and scraped.get('engagement'):
                     engagement = scraped['engagement']
@@ -4763,17 +4286,18 @@ def create_prediction():
             logger.warning(f"Could not fetch initial value: {e}")
         
         # Save to database
-        conn = sqlite3.connect('creatorvault.db')
+        conn = get_db()
         cursor = conn.cursor()
         cursor.execute('''
             INSERT INTO predictions 
             (prediction_id, creator_address, content_url, platform, metric_type, 
-             target_value, timeframe_hours, end_time, initial_value, status)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'active')
+             target_value, timeframe_hours, end_time, end_time_ms, initial_value, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'active')
         ''', (prediction_id, creator_address, content_url, platform, metric_type,
-              target_value, timeframe_hours, end_time.isoformat(), initial_value))
+              target_value, timeframe_hours, end_time.isoformat(), end_time_ms, initial_value))
         conn.commit()
         conn.close()
+        prediction_resolver.schedule(prediction_id, end_time_ms)
         
         logger.info(f"✅ Prediction created: {prediction_id} by {creator_address}")
         
@@ -4806,10 +4330,7 @@ def get_predictions():
     try:
         status_filter = request.args.get('status', 'active')  # active, resolved, all
         
-        # Initialize database if it doesn't exist
-        init_db()
-        
-        conn = sqlite3.connect('creatorvault.db')
+        conn = get_db()
         cursor = conn.cursor()
         
         predictions = []
@@ -4873,7 +4394,7 @@ def get_predictions():
 def get_prediction(prediction_id):
     """Get prediction details with real-time odds"""
     try:
-        conn = sqlite3.connect('creatorvault.db')
+        conn = get_db()
         cursor = conn.cursor()
         cursor.execute('''
             SELECT prediction_id, creator_address, content_url, platform, metric_type,
@@ -4891,7 +4412,6 @@ def get_prediction(prediction_id):
         current_value = row[12]  # initial_value
         all_metrics = None  # Will contain all engagement metrics for display
         try:
-            scraper = WebScraper()
             if row[3] == 'youtube':  # platform
                 video_id = row[2].split('v=')[-1].split('&')[0]  # content_url
                 if youtube_sessions:
@@ -4928,14 +4448,8 @@ def get_prediction(prediction_id):
                 # Use platform-specific scraping methods
                 content_url = row[2]
                 platform = row[3]
-                scraped = None
-                
-                if platform == 'instagram':
-                    scraped = scraper.scrape_instagram_reel(content_url)
-                elif platform == 'twitter' or platform == 'x':
-                    scraped = scraper.scrape_twitter_tweet(content_url)
-                elif platform == 'linkedin':
-                    scraped = scraper.scrape_linkedin_post(content_url)
+                # Display only: a stale entry is fine, it is refreshed in the background
+                scraped = scrape_cache.get(content_url, platform)
                 
                 if scraped and scraped.get('engagement'):
                     engagement = scraped['engagement']
@@ -5044,10 +4558,10 @@ def trade_prediction(prediction_id):
             return jsonify({"success": False, "error": "Amount must be greater than 0"}), 400
         
         # Get prediction
-        conn = sqlite3.connect('creatorvault.db')
+        conn = get_db()
         cursor = conn.cursor()
         cursor.execute('''
-            SELECT yes_pool, no_pool, status, end_time
+            SELECT yes_pool, no_pool, status, end_time_ms
             FROM predictions
             WHERE prediction_id = ?
         ''', (prediction_id,))
@@ -5056,14 +4570,13 @@ def trade_prediction(prediction_id):
         if not row:
             return jsonify({"success": False, "error": "Prediction not found"}), 404
         
-        yes_pool, no_pool, status, end_time = row
+        yes_pool, no_pool, status, end_time_ms = row
         
         if status != 'active':
             return jsonify({"success": False, "error": "Prediction is not active"}), 400
         
         # Check if expired
-        from datetime import datetime
-        if datetime.fromisoformat(end_time) < datetime.now():
+        if end_time_ms < time.time() * 1000:
             return jsonify({"success": False, "error": "Prediction has expired"}), 400
         
         # Calculate odds
@@ -5119,12 +4632,62 @@ def trade_prediction(prediction_id):
         logger.error(f"Error trading prediction: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
 
+def fetch_final_metric(content_url, platform, metric_type):
+    """Current value of a market's metric, for resolution. Raises if it can't be fetched."""
+    if platform == 'youtube':
+        video_id = content_url.split('v=')[-1].split('&')[0]
+        if not youtube_sessions:
+            raise MetricUnavailable("no YouTube session to read statistics with")
+        session_key = list(youtube_sessions.keys())[0]
+        session_data = youtube_sessions[session_key]
+        credentials_data = session_data['credentials']
+        credentials = Credentials(
+            token=credentials_data['token'],
+            refresh_token=credentials_data['refresh_token'],
+            token_uri=credentials_data['token_uri'],
+            client_id=credentials_data['client_id'],
+            client_secret=credentials_data['client_secret'],
+            scopes=credentials_data['scopes']
+        )
+        youtube = build('youtube', 'v3', credentials=credentials)
+        video_response = youtube.videos().list(part='statistics', id=video_id).execute()
+        if not video_response.get('items'):
+            raise MetricUnavailable(f"YouTube returned no video for {video_id}")
+        stats = video_response['items'][0]['statistics']
+        if metric_type == 'views':
+            return int(stats.get('viewCount', 0))
+        elif metric_type == 'likes':
+            return int(stats.get('likeCount', 0))
+        elif metric_type == 'comments':
+            return int(stats.get('commentCount', 0))
+        return 0
+
+    # Use platform-specific scraping methods
+    # Resolution needs current numbers: never settle on a stale entry
+    scraped = scrape_cache.get(content_url, platform, max_age=SCRAPE_RESOLVE_MAX_AGE, allow_stale=False,
+                               stale_fallback=False)
+    if not scraped or not scraped.get('engagement'):
+        # The scrapers return None when no source answered. That is not a value of 0:
+        # raise so the market is retried instead of settled NO
+        raise MetricUnavailable(f"could not scrape engagement for {content_url}")
+    engagement = scraped['engagement']
+    # Get the specific metric or fallback to likes
+    if metric_type == 'likes':
+        return engagement.get('likes', 0) or engagement.get('reactions', 0) or 0
+    elif metric_type == 'comments':
+        return engagement.get('comments', 0) or engagement.get('replies', 0) or 0
+    elif metric_type == 'views':
+        return engagement.get('views', 0) or 0
+    elif metric_type == 'shares' or metric_type == 'reposts':
+        return engagement.get('shares', 0) or engagement.get('reposts', 0) or engagement.get('retweets', 0) or 0
+    return engagement.get(metric_type, 0) or engagement.get('likes', 0) or 0
+
 @app.route('/api/predictions/<prediction_id>/resolve', methods=['POST'])
 @cross_origin(supports_credentials=True)
 def resolve_prediction(prediction_id):
     """Resolve a prediction and payout winners"""
     try:
-        conn = sqlite3.connect('creatorvault.db')
+        conn = get_db()
         cursor = conn.cursor()
         cursor.execute('''
             SELECT content_url, platform, metric_type, target_value, yes_pool, no_pool, status
@@ -5142,56 +4705,8 @@ def resolve_prediction(prediction_id):
             return jsonify({"success": False, "error": "Prediction already resolved"}), 400
         
         # Get final metric value
-        final_value = 0
         try:
-            scraper = WebScraper()
-            if platform == 'youtube':
-                video_id = content_url.split('v=')[-1].split('&')[0]
-                if youtube_sessions:
-                    session_key = list(youtube_sessions.keys())[0]
-                    session_data = youtube_sessions[session_key]
-                    credentials_data = session_data['credentials']
-                    credentials = Credentials(
-                        token=credentials_data['token'],
-                        refresh_token=credentials_data['refresh_token'],
-                        token_uri=credentials_data['token_uri'],
-                        client_id=credentials_data['client_id'],
-                        client_secret=credentials_data['client_secret'],
-                        scopes=credentials_data['scopes']
-                    )
-                    youtube = build('youtube', 'v3', credentials=credentials)
-                    video_response = youtube.videos().list(part='statistics', id=video_id).execute()
-                    if video_response.get('items'):
-                        stats = video_response['items'][0]['statistics']
-                        if metric_type == 'views':
-                            final_value = int(stats.get('viewCount', 0))
-                        elif metric_type == 'likes':
-                            final_value = int(stats.get('likeCount', 0))
-                        elif metric_type == 'comments':
-                            final_value = int(stats.get('commentCount', 0))
-            else:
-                # Use platform-specific scraping methods
-                scraped = None
-                if platform == 'instagram':
-                    scraped = scraper.scrape_instagram_reel(content_url)
-                elif platform == 'twitter' or platform == 'x':
-                    scraped = scraper.scrape_twitter_tweet(content_url)
-                elif platform == 'linkedin':
-                    scraped = scraper.scrape_linkedin_post(content_url)
-                
-                if scraped and scraped.get('engagement'):
-                    engagement = scraped['engagement']
-                    # Get the specific metric or fallback to likes
-                    if metric_type == 'likes':
-                        final_value = engagement.get('likes', 0) or engagement.get('reactions', 0) or 0
-                    elif metric_type == 'comments':
-                        final_value = engagement.get('comments', 0) or engagement.get('replies', 0) or 0
-                    elif metric_type == 'views':
-                        final_value = engagement.get('views', 0) or 0
-                    elif metric_type == 'shares' or metric_type == 'reposts':
-                        final_value = engagement.get('shares', 0) or engagement.get('reposts', 0) or engagement.get('retweets', 0) or 0
-                    else:
-                        final_value = engagement.get(metric_type, 0) or engagement.get('likes', 0) or 0
+            final_value = fetch_final_metric(content_url, platform, metric_type)
         except Exception as e:
             logger.error(f"Error fetching final value: {e}")
             return jsonify({"success": False, "error": f"Could not fetch final metric: {e}"}), 500
@@ -5200,12 +4715,18 @@ def resolve_prediction(prediction_id):
         outcome = 'YES' if final_value >= target_value else 'NO'
         total_pool = yes_pool + no_pool
         
-        # Update prediction
+        # Update prediction - only if still open, so a market the background
+        # resolver settled meanwhile isn't paid out twice
         cursor.execute('''
             UPDATE predictions
-            SET status = 'resolved', outcome = ?, final_value = ?
-            WHERE prediction_id = ?
+            SET status = 'resolved', outcome = ?, final_value = ?,
+                resolver_claimed_by = NULL, resolver_lease_expires_at = NULL
+            WHERE prediction_id = ? AND status IN ('active', 'resolving')
         ''', (outcome, final_value, prediction_id))
+        if cursor.rowcount == 0:
+            conn.rollback()
+            conn.close()
+            return jsonify({"success": False, "error": "Prediction already resolved"}), 400
         
         # Get winning trades and calculate payouts
         cursor.execute('''
@@ -5305,121 +4826,9 @@ def resolve_prediction(prediction_id):
 @app.route('/api/predictions/auto-resolve', methods=['POST'])
 @cross_origin(supports_credentials=True)
 def auto_resolve_expired():
-    """Auto-resolve all expired predictions"""
+    """Auto-resolve all expired predictions now (the background resolver also does this at each deadline)"""
     try:
-        conn = sqlite3.connect('creatorvault.db')
-        cursor = conn.cursor()
-        
-        # Find expired active predictions
-        cursor.execute('''
-            SELECT prediction_id
-            FROM predictions
-            WHERE status = 'active' AND end_time < ?
-        ''', (datetime.now().isoformat(),))
-        
-        expired = cursor.fetchall()
-        resolved_count = 0
-        
-        for (prediction_id,) in expired:
-            try:
-                # Get prediction data
-                cursor.execute('''
-                    SELECT content_url, platform, metric_type, target_value, yes_pool, no_pool
-                    FROM predictions
-                    WHERE prediction_id = ?
-                ''', (prediction_id,))
-                
-                row = cursor.fetchone()
-                if row:
-                    content_url, platform, metric_type, target_value, yes_pool, no_pool = row
-                    
-                    # Get final value (same logic as resolve_prediction)
-                    final_value = 0
-                    try:
-                        scraper = WebScraper()
-                        if platform == 'youtube':
-                            video_id = content_url.split('v=')[-1].split('&')[0]
-                            if youtube_sessions:
-                                session_key = list(youtube_sessions.keys())[0]
-                                session_data = youtube_sessions[session_key]
-                                credentials_data = session_data['credentials']
-                                credentials = Credentials(
-                                    token=credentials_data['token'],
-                                    refresh_token=credentials_data['refresh_token'],
-                                    token_uri=credentials_data['token_uri'],
-                                    client_id=credentials_data['client_id'],
-                                    client_secret=credentials_data['client_secret'],
-                                    scopes=credentials_data['scopes']
-                                )
-                                youtube = build('youtube', 'v3', credentials=credentials)
-                                video_response = youtube.videos().list(part='statistics', id=video_id).execute()
-                                if video_response.get('items'):
-                                    stats = video_response['items'][0]['statistics']
-                                    if metric_type == 'views':
-                                        final_value = int(stats.get('viewCount', 0))
-                                    elif metric_type == 'likes':
-                                        final_value = int(stats.get('likeCount', 0))
-                                    elif metric_type == 'comments':
-                                        final_value = int(stats.get('commentCount', 0))
-                        else:
-                            # Use platform-specific scraping methods
-                            scraped = None
-                            if platform == 'instagram':
-                                scraped = scraper.scrape_instagram_reel(content_url)
-                            elif platform == 'twitter':
-                                scraped = scraper.scrape_twitter_tweet(content_url)
-                            elif platform == 'linkedin':
-                                scraped = scraper.scrape_linkedin_post(content_url)
-                            
-                            if scraped and scraped.get('engagement'):
-                                engagement = scraped['engagement']
-                                # Get the specific metric or fallback to likes
-                                if metric_type == 'likes':
-                                    final_value = engagement.get('likes', 0) or engagement.get('reactions', 0) or 0
-                                elif metric_type == 'comments':
-                                    final_value = engagement.get('comments', 0) or engagement.get('replies', 0) or 0
-                                elif metric_type == 'views':
-                                    final_value = engagement.get('views', 0) or 0
-                                elif metric_type == 'shares' or metric_type == 'reposts':
-                                    final_value = engagement.get('shares', 0) or engagement.get('reposts', 0) or engagement.get('retweets', 0) or 0
-                                else:
-                                    final_value = engagement.get(metric_type, 0) or engagement.get('likes', 0) or 0
-                    except Exception as e:
-                        logger.error(f"Error fetching final value for {prediction_id}: {e}")
-                        continue
-                    
-                    outcome = 'YES' if final_value >= target_value else 'NO'
-                    total_pool = yes_pool + no_pool
-                    
-                    # Update prediction
-                    cursor.execute('''
-                        UPDATE predictions
-                        SET status = 'resolved', outcome = ?, final_value = ?
-                        WHERE prediction_id = ?
-                    ''', (outcome, final_value, prediction_id))
-                    
-                    # Update trades
-                    cursor.execute('''
-                        UPDATE prediction_trades
-                        SET status = CASE 
-                            WHEN side = ? THEN 'won'
-                            ELSE 'lost'
-                        END,
-                        payout_amount = CASE
-                            WHEN side = ? THEN potential_payout
-                            ELSE 0
-                        END
-                        WHERE prediction_id = ? AND status = 'pending'
-                    ''', (outcome, outcome, prediction_id))
-                    
-                    resolved_count += 1
-                    logger.info(f"✅ Auto-resolved prediction {prediction_id}: {outcome} (final: {final_value})")
-            except Exception as e:
-                logger.error(f"Error auto-resolving {prediction_id}: {e}")
-        
-        conn.commit()
-        conn.close()
-        
+        resolved_count = prediction_resolver.resolve_due()
         return jsonify({
             "success": True,
             "resolved_count": resolved_count
@@ -5429,12 +4838,16 @@ def auto_resolve_expired():
         logger.error(f"Error auto-resolving predictions: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
 
+@app.route('/api/predictions/resolver-stats', methods=['GET'])
+def prediction_resolver_stats():
+    return jsonify({"success": True, "stats": prediction_resolver.stats()})
+
 @app.route('/api/predictions/winnings/<address>', methods=['GET'])
 @cross_origin(supports_credentials=True)
 def get_user_winnings(address):
     """Get user's pending winnings from predictions"""
     try:
-        conn = sqlite3.connect('creatorvault.db')
+        conn = get_db()
         cursor = conn.cursor()
         
         # Get all won trades (both claimed and unclaimed) so users can see automatic payouts
@@ -5489,7 +4902,7 @@ def claim_winnings(trade_id):
         if not winner_address:
             return jsonify({"success": False, "error": "Winner address required"}), 400
         
-        conn = sqlite3.connect('creatorvault.db')
+        conn = get_db()
         cursor = conn.cursor()
         
         # Get trade details
@@ -5565,258 +4978,154 @@ def claim_winnings(trade_id):
         logger.error(f"Error claiming winnings: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
 
+def upload_job_response(job_id: str, deduplicated: bool, blob_name: str):
+    """202 for a new (or joined, still running) upload job; 200 with the result if identical bytes are already on Shelby"""
+    job = upload_jobs.status(job_id) if deduplicated else None
+    if job is not None and job['status'] == 'succeeded':
+        return jsonify({"success": True, "deduplicated": True, **job}), 200
+    return jsonify({
+        "success": True,
+        "jobId": job_id,
+        "status": job['status'] if job else "queued",
+        "blobName": job['blobName'] if job else blob_name,
+        "deduplicated": deduplicated,
+        "statusUrl": f"/api/shelby/upload/{job_id}"
+    }), 202
+
 @app.route('/api/shelby/upload', methods=['POST'])
 @cross_origin(supports_credentials=True)
 def shelby_upload():
-    """Upload premium content to Shelby via CLI"""
+    """Queue premium content for upload to Shelby; poll /api/shelby/upload/<job_id> for the result"""
     try:
-        if 'file' not in request.files:
+        # Parse the file part directly into the spool, hashing as it streams in
+        request.spool_uploads = True
+        request.spool_dir = upload_jobs.spool_dir
+        try:
+            files = request.files
+        except UploadTooLarge as e:
+            return jsonify({"success": False, "error": str(e)}), 413
+        
+        if 'file' not in files:
             return jsonify({"success": False, "error": "No file provided"}), 400
         
-        file = request.files['file']
+        file = files['file']
         blob_name = request.form.get('blobName', f'premium_content_{uuid.uuid4()}')
         expiration = request.form.get('expiration')
         
         if file.filename == '':
             return jsonify({"success": False, "error": "No file selected"}), 400
         
-        # Save file temporarily
-        import tempfile
-        import subprocess
-        import shutil
+        job_id, deduplicated = upload_jobs.submit(file, blob_name, expiration)
+        return upload_job_response(job_id, deduplicated, blob_name)
+                
+    except Exception as e:
+        logger.error(f"Error uploading to Shelby: {e}")
+        traceback.print_exc()
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/shelby/upload/stream', methods=['PUT'])
+@cross_origin(supports_credentials=True)
+def shelby_upload_stream():
+    """
+    Queue a raw-body upload (no multipart): the body is the file itself
+    Query params: blobName, expiration, filename (used for the extension)
+    """
+    try:
+        blob_name = request.args.get('blobName', f'premium_content_{uuid.uuid4()}')
+        expiration = request.args.get('expiration')
+        filename = request.args.get('filename') or request.headers.get('X-Filename')
         
-        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1]) as tmp_file:
-            file.save(tmp_file.name)
-            tmp_path = tmp_file.name
+        if request.content_length == 0:
+            return jsonify({"success": False, "error": "No file provided"}), 400
         
         try:
-            # Use Shelby CLI to upload and parse real output
-            # Calculate expiration
-            expiration_str = expiration if expiration else "in 365 days"
-            
-            # Use shelby CLI with proper output parsing
-            cmd = ['shelby', 'upload', tmp_path, blob_name, '-e', expiration_str, '--assume-yes']
-            
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=120
-            )
-            
-            if result.returncode != 0:
-                logger.error(f"Shelby CLI upload failed: {result.stderr}")
-                # Check if it's a configuration error
-                if "No configuration file found" in result.stderr or "shelby init" in result.stderr:
-                    return jsonify({
-                        "success": False,
-                        "error": "Shelby CLI not configured. Please run 'shelby init' to set up Shelby Protocol."
-                    }), 500
-                
-                return jsonify({
-                    "success": False,
-                    "error": f"Shelby upload failed: {result.stderr[:200]}"
-                }), 500
-            
-            # Parse CLI output to extract transaction hash and account address
-            # Shelby CLI outputs transaction hash in explorer link format
-            output = result.stdout + result.stderr  # Check both
-            transaction_hash = None
-            account_address = None
-            
-            # Try to extract transaction hash from Aptos Explorer link
-            import re
-            # Pattern 1: Transaction hash from Aptos Explorer link (most reliable)
-            # Format: https://explorer.aptoslabs.com/txn/0x<64-char-hex>?network=shelbynet
-            match = re.search(r'explorer\.aptoslabs\.com/txn/(0x[a-f0-9]{64})', output)
-            if match:
-                transaction_hash = match.group(1)
-                logger.info(f"Extracted transaction hash from explorer link: {transaction_hash}")
-            else:
-                # Pattern 2: Any 64-character hex string (transaction hash)
-                match = re.search(r'(0x[a-f0-9]{64})', output)
-                if match:
-                    transaction_hash = match.group(1)
-                    logger.info(f"Extracted transaction hash: {transaction_hash}")
-            
-            # Extract account address from Shelby Explorer link
-            # Format: https://explorer.shelby.xyz/shelbynet/account/0x<address>
-            match = re.search(r'explorer\.shelby\.xyz/shelbynet/account/(0x[a-f0-9]{64})', output)
-            if match:
-                account_address = match.group(1)
-                logger.info(f"✅ Extracted account address from explorer link: {account_address}")
-            else:
-                # Use shelby account list command to get default account
-                try:
-                    logger.info("📋 Running 'shelby account list' to get account address...")
-                    account_result = subprocess.run(
-                        ['shelby', 'account', 'list'],
-                        capture_output=True,
-                        text=True,
-                        timeout=10
-                    )
-                    logger.info(f"Account list output:\n{account_result.stdout}")
-                    
-                    # Parse account address from list output
-                    # Format: │ default │ 0x<address> │ ...
-                    match = re.search(r'default.*?│\s*(0x[a-f0-9]{64})', account_result.stdout)
-                    if match:
-                        account_address = match.group(1)
-                        logger.info(f"✅ Extracted account address from account list: {account_address}")
-                    else:
-                        # Try alternative format
-                        match = re.search(r'(0x[a-f0-9]{64})', account_result.stdout)
-                        if match:
-                            account_address = match.group(1)
-                            logger.info(f"✅ Extracted account address (alternative format): {account_address}")
-                except Exception as e:
-                    logger.warning(f"⚠️ Could not get account from 'shelby account list': {e}")
-                    pass
-            
-            # Use blob_name as the blob identifier (this is what Shelby uses)
-            # The blob_name is what appears in the explorer URL
-            blob_id = blob_name  # Use the actual blob name, not transaction hash
-            
-            # Try to get blob info using shelby blob command if available
-            blob_info = None
-            if account_address and blob_name:
-                try:
-                    logger.info(f"📦 Running 'shelby blob' command to get blob info for {blob_name}...")
-                    blob_result = subprocess.run(
-                        ['shelby', 'blob', 'info', blob_name],
-                        capture_output=True,
-                        text=True,
-                        timeout=10
-                    )
-                    if blob_result.returncode == 0:
-                        logger.info(f"✅ Blob info retrieved:\n{blob_result.stdout}")
-                        blob_info = blob_result.stdout
-                except Exception as e:
-                    logger.warning(f"⚠️ Could not get blob info: {e}")
-            
-            # Construct blob URL
-            blob_url = f"https://api.shelbynet.shelby.xyz/shelby/v1/blobs/{account_address}/{blob_name}" if account_address else f"shelby://{blob_name}"
-            
-            # Generate proper explorer URL - ALWAYS show explorer link
-            # Format: https://explorer.shelbynet.shelby.xyz/account/{account}/blobs?name={blob_name}
-            if account_address:
-                explorer_url = f"https://explorer.shelbynet.shelby.xyz/account/{account_address}/blobs?name={blob_name}"
-            else:
-                # Try to get account address one more time
-                try:
-                    account_result = subprocess.run(
-                        ['shelby', 'account', 'list'],
-                        capture_output=True,
-                        text=True,
-                        timeout=5
-                    )
-                    match = re.search(r'(0x[a-f0-9]{64})', account_result.stdout)
-                    if match:
-                        account_address = match.group(1)
-                        explorer_url = f"https://explorer.shelbynet.shelby.xyz/account/{account_address}/blobs?name={blob_name}"
-                    else:
-                        explorer_url = f"https://explorer.shelbynet.shelby.xyz/blob/{blob_name}"  # Fallback
-                except:
-                    explorer_url = f"https://explorer.shelbynet.shelby.xyz/blob/{blob_name}"  # Fallback
-            
-            # Generate Aptos transaction explorer URL
-            aptos_explorer_url = None
-            if transaction_hash:
-                aptos_explorer_url = f"https://explorer.aptoslabs.com/txn/{transaction_hash}?network=shelbynet"
-            
-            logger.info(f"✅ Upload complete! Blob: {blob_name}, Account: {account_address}, Explorer: {explorer_url}")
-            
-            # Calculate expiration date for response
-            from datetime import datetime, timedelta
-            expiration_date = datetime.now() + timedelta(days=365)
-            if expiration:
-                try:
-                    expiration_date = datetime.fromisoformat(expiration.replace('Z', '+00:00'))
-                except:
-                    pass
-            
-            return jsonify({
-                "success": True,
-                "blobUrl": blob_url,
-                "blobId": blob_id,  # This is the blob name
-                "blobName": blob_name,  # Explicit blob name
-                "accountAddress": account_address,
-                "transactionHash": transaction_hash,
-                "expirationDate": expiration_date.isoformat(),
-                "explorerUrl": explorer_url,
-                "aptosExplorerUrl": aptos_explorer_url,
-                "rawOutput": output[:200]  # Include for debugging
-            })
-        finally:
-            # Clean up temp file
-            if os.path.exists(tmp_path):
-                os.unlink(tmp_path)
-                
+            spooled = spool_stream(request.stream, upload_jobs.spool_dir)
+        except UploadTooLarge as e:
+            return jsonify({"success": False, "error": str(e)}), 413
+        if spooled.size == 0:
+            spooled.discard()
+            return jsonify({"success": False, "error": "No file provided"}), 400
+        
+        job_id, deduplicated = upload_jobs.submit_spooled(spooled, filename, blob_name, expiration)
+        return upload_job_response(job_id, deduplicated, blob_name)
+    
     except Exception as e:
         logger.error(f"Error uploading to Shelby: {e}")
         traceback.print_exc()
         return jsonify({"success": False, "error": str(e)}), 500
 
+@app.route('/api/shelby/upload/<job_id>', methods=['GET'])
+@cross_origin(supports_credentials=True)
+def shelby_upload_status(job_id):
+    """Status and progress of a queued Shelby upload (result fields once it succeeded)"""
+    job = upload_jobs.status(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": "Upload job not found"}), 404
+    return jsonify({"success": True, **job})
+
+@app.route('/api/shelby/upload-stats', methods=['GET'])
+def shelby_upload_stats():
+    """Upload queue statistics (jobs by status, this worker's counters)"""
+    return jsonify({"success": True, "uploads": upload_jobs.stats()})
+
+def send_blob(blob, as_attachment: bool = False, download_name: str = None):
+    """
+    send_file() for a CachedBlob: conditional, so Range/If-None-Match work
+    Temporary (uncached) blobs are deleted once the response is closed
+    """
+    from flask import send_file
+    response = send_file(
+        blob.path,
+        mimetype=blob.content_type,
+        as_attachment=as_attachment,
+        download_name=download_name,
+        conditional=True,
+        etag=blob.sha256
+    )
+    if response.status_code != 304:
+        blob_cache.record_served(response.content_length)
+    if blob.temporary:
+        response.call_on_close(blob.cleanup)
+    return response
+
 @app.route('/api/shelby/download', methods=['GET'])
 @cross_origin(supports_credentials=True)
 def shelby_download():
-    """Download premium content from Shelby"""
+    """Download premium content from Shelby (served from the local blob cache, Range supported)"""
     try:
         blob_url = request.args.get('blobUrl')
         if not blob_url:
             return jsonify({"success": False, "error": "blobUrl parameter required"}), 400
         
-        # Use Shelby CLI to download
-        import subprocess
-        import tempfile
-        
-        with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
-            tmp_path = tmp_file.name
-        
         try:
-            cmd = f"shelby download {blob_url} {tmp_path}"
-            result = subprocess.run(
-                cmd,
-                shell=True,
-                capture_output=True,
-                text=True,
-                timeout=60
-            )
-            
-            if result.returncode != 0:
-                return jsonify({"success": False, "error": "Failed to download from Shelby"}), 500
-            
-            # Read file and return as blob
-            from flask import send_file
-            return send_file(tmp_path, as_attachment=True)
-        finally:
-            # Clean up will happen after send_file
-            pass
+            blob = blob_cache.get(blob_url, fetch_with_cli)
+        except BlobFetchError as e:
+            logger.error(f"Error downloading from Shelby: {e}")
+            return jsonify({"success": False, "error": "Failed to download from Shelby"}), 500
+        
+        download_name = os.path.basename(blob_url.split('?', 1)[0].rstrip('/')) or 'blob'
+        return send_blob(blob, as_attachment=True, download_name=download_name)
             
     except Exception as e:
         logger.error(f"Error downloading from Shelby: {e}")
         traceback.print_exc()
         return jsonify({"success": False, "error": str(e)}), 500
 
+@app.route('/api/shelby/cache-stats', methods=['GET'])
+def shelby_cache_stats():
+    """Blob cache statistics for this worker (hit rate, bytes fetched/served/evicted)"""
+    return jsonify({"success": True, "blobCache": blob_cache.stats()})
+
 @app.route('/api/shelby/account-balance', methods=['GET'])
 @cross_origin(supports_credentials=True)
 @handle_errors
 def shelby_account_balance():
-    """Get Shelby account balance (APT and ShelbyUSD)"""
+    """Get Shelby account balance (APT and ShelbyUSD), served from the background-refreshed status cache"""
     try:
-        import subprocess
-        import re
-        
-        # Get account balance using Shelby CLI
-        result = subprocess.run(
-            ['shelby', 'account', 'balance'],
-            capture_output=True,
-            text=True,
-            timeout=10
-        )
-        
-        if result.returncode != 0:
-            logger.warning(f"Shelby account balance check failed: {result.stderr}")
+        try:
+            balance, age = shelby_status.get('balance')
+        except ShelbyStatusUnavailable as e:
+            logger.warning(f"Shelby account balance unavailable: {e}")
             return jsonify({
                 "success": False,
                 "error": "Could not fetch Shelby account balance. Make sure Shelby CLI is configured.",
@@ -5825,95 +5134,13 @@ def shelby_account_balance():
                 "account_address": None
             }), 200  # Return 200 but with error flag
         
-        output = result.stdout
-        logger.info(f"Shelby balance command output:\n{output}")
-        
-        # Parse APT balance - look for pattern like "29.989454 APT" in the table
-        apt_balance = 0
-        # The table format is: │ APT     │ ... │ 29.989454 APT    │
-        # We need to match the number in the Balance column (3rd column)
-        apt_match = re.search(r'│\s+APT\s+│[^│]+│\s+([\d.]+)\s+APT', output, re.IGNORECASE | re.MULTILINE)
-        if apt_match:
-            try:
-                apt_balance = float(apt_match.group(1))
-                logger.info(f"✅ Parsed APT balance: {apt_balance}")
-            except ValueError:
-                logger.warning(f"Failed to parse APT balance from: {apt_match.group(1)}")
-        
-        # Parse ShelbyUSD balance - the table has ShelbyUSD split across lines
-        # Format: │ ShelbyU │ ... │ 29.79001344      │
-        #         │ SD      │ ... │ ShelbyUSD        │
-        shelbyusd_balance = 0
-        # Match the number in the Balance column before "ShelbyUSD" appears
-        usd_match = re.search(r'│\s+ShelbyU[^│]+│[^│]+│\s+([\d.]+)\s+│', output, re.IGNORECASE | re.MULTILINE)
-        if usd_match:
-            try:
-                shelbyusd_balance = float(usd_match.group(1))
-                logger.info(f"✅ Parsed ShelbyUSD balance: {shelbyusd_balance}")
-            except ValueError:
-                logger.warning(f"Failed to parse ShelbyUSD balance from: {usd_match.group(1)}")
-        
-        # If still not found, try line-by-line parsing
-        if apt_balance == 0 or shelbyusd_balance == 0:
-            lines = output.split('\n')
-            for i, line in enumerate(lines):
-                # APT row - look for line containing "│ APT" and extract balance from same line
-                if '│ APT' in line and 'APT' in line:
-                    # Match: │ APT     │ ... │ 29.989454 APT    │
-                    apt_match = re.search(r'│\s+APT\s+│[^│]+│\s+([\d.]+)\s+APT', line)
-                    if apt_match:
-                        try:
-                            apt_balance = float(apt_match.group(1))
-                            logger.info(f"✅ Parsed APT balance from line: {apt_balance}")
-                        except ValueError:
-                            pass
-                
-                # ShelbyUSD row - look for line with "│ ShelbyU" and extract number from same line
-                if '│ ShelbyU' in line:
-                    # Match: │ ShelbyU │ ... │ 29.79001344      │
-                    usd_match = re.search(r'│\s+ShelbyU[^│]+│[^│]+│\s+([\d.]+)\s+│', line)
-                    if usd_match:
-                        try:
-                            shelbyusd_balance = float(usd_match.group(1))
-                            logger.info(f"✅ Parsed ShelbyUSD balance from line: {shelbyusd_balance}")
-                        except ValueError:
-                            pass
-        
-        # Get account address from balance output or account list
-        account_address = None
-        # Try to extract from balance output first
-        address_match = re.search(r'Address:\s+(0x[a-f0-9]{64})', output)
-        if address_match:
-            account_address = address_match.group(1)
-            logger.info(f"✅ Extracted account address from balance output: {account_address[:10]}...")
-        else:
-            # Fallback to account list
-            try:
-                account_result = subprocess.run(
-                    ['shelby', 'account', 'list'],
-                    capture_output=True,
-                    text=True,
-                    timeout=10
-                )
-                if account_result.returncode == 0:
-                    # Parse default account address
-                    match = re.search(r'default.*?│\s*(0x[a-f0-9]{64})', account_result.stdout)
-                    if not match:
-                        # Try alternative format
-                        match = re.search(r'Address:\s+(0x[a-f0-9]{64})', account_result.stdout)
-                    if match:
-                        account_address = match.group(1)
-                        logger.info(f"✅ Extracted account address from account list: {account_address[:10]}...")
-            except Exception as e:
-                logger.warning(f"Could not get account address: {e}")
-                pass
-        
         return jsonify({
             "success": True,
-            "apt_balance": apt_balance,
-            "shelbyusd_balance": shelbyusd_balance,
-            "account_address": account_address,
-            "raw_output": output[:500]  # Include for debugging
+            "apt_balance": balance['apt_balance'],
+            "shelbyusd_balance": balance['shelbyusd_balance'],
+            "account_address": balance['account_address'] or shelby_status.account_address(),
+            "age_seconds": round(age, 1),
+            "raw_output": balance['raw_output']  # Include for debugging
         }), 200
         
     except Exception as e:
@@ -5930,36 +5157,45 @@ def shelby_account_balance():
 @app.route('/api/shelby/metadata', methods=['GET'])
 @cross_origin(supports_credentials=True)
 def shelby_metadata():
-    """Get blob metadata from Shelby"""
+    """Get blob metadata from the cached 'shelby account blobs' listing"""
     try:
         blob_url = request.args.get('blobUrl')
         if not blob_url:
             return jsonify({"success": False, "error": "blobUrl parameter required"}), 400
         
-        # Use Shelby CLI to get metadata
-        import subprocess
+        try:
+            blobs, age = shelby_status.get('blobs')
+        except ShelbyStatusUnavailable as e:
+            logger.warning(f"Shelby blob listing unavailable: {e}")
+            return jsonify({"success": False, "error": "Failed to get metadata"}), 500
         
-        cmd = f"shelby account blobs"
-        result = subprocess.run(
-            cmd,
-            shell=True,
-            capture_output=True,
-            text=True,
-            timeout=30
-        )
+        # Blob URLs end with the blob name: .../blobs/<account>/<blob_name>
+        blob_name = blob_url.split('?', 1)[0].rstrip('/').rsplit('/', 1)[-1]
+        def find_blob(blobs):
+            row = next((blob for blob in blobs if blob.get('name') in (blob_name, blob_url)), None)
+            if row is None:
+                row = next((blob for blob in blobs if any(blob_name == value for value in blob.values())), {})
+            return row
         
-        if result.returncode != 0:
-            return jsonify({"success": False, "error": "Failed to get metadata"}), 500
+        row = find_blob(blobs)
+        if not row:
+            # Possibly uploaded since the last listing - reload it rather than report a miss
+            try:
+                blobs, age = shelby_status.get_refreshed('blobs')
+                row = find_blob(blobs)
+            except ShelbyStatusUnavailable as e:
+                logger.warning(f"Shelby blob listing refresh failed: {e}")
         
-        # Parse output to find blob metadata
-        # This is a simplified version - adjust parsing based on actual CLI output
         return jsonify({
             "success": True,
             "metadata": {
+                **row,
                 "blobUrl": blob_url,
-                "size": "unknown",
-                "expires": "unknown"
-            }
+                "size": row.get('size', 'unknown'),
+                "expires": row.get('expires', row.get('expiration', 'unknown'))
+            },
+            "found": bool(row),
+            "age_seconds": round(age, 1)
         })
         
     except Exception as e:
@@ -5967,105 +5203,104 @@ def shelby_metadata():
         traceback.print_exc()
         return jsonify({"success": False, "error": str(e)}), 500
 
-def verify_token_balance_on_chain(user_address: str, creator_address: str, token_id: str, minimum_balance: int = 1) -> bool:
+@app.route('/api/shelby/status-stats', methods=['GET'])
+def shelby_status_stats():
+    """Shelby status cache statistics (entry ages, refreshes, stale/cold reads)"""
+    return jsonify({"success": True, "status": shelby_status.stats()})
+
+def verify_token_balance_on_chain(user_address: str, creator_address: str, token_id: str, minimum_balance: int = 1,
+                                  deadline: float = None) -> bool:
     """
     Verify token balance on Aptos blockchain
     Returns True if user has sufficient balance, False otherwise
+    
+    Balances come from the shared balance cache (short TTL, single-flight
+    node calls). Raises BalanceCheckTimeout if `deadline` (time.monotonic())
+    passes before the balance is known.
     """
     try:
-        import time
-        from datetime import datetime, timedelta
-        
-        # Convert token_id to hex
-        # Handle both string and numeric token IDs
-        if isinstance(token_id, (int, float)):
-            # If it's numeric, convert to string first
-            token_id = str(int(token_id))
-        token_id_str = str(token_id)
-        token_id_bytes = token_id_str.encode('utf-8')
-        token_id_hex = '0x' + ''.join([f'{b:02x}' for b in token_id_bytes])
+        balance = balance_cache.get(user_address, creator_address, token_id, deadline=deadline)
+        if balance is None:
+            logger.warning(f"Failed to verify token balance for {user_address} - tried both contracts")
+            return False
         
-        logger.info(f"🔍 Verifying balance: token_id={token_id_str[:50]}, token_id_hex={token_id_hex[:50]}...")
-        
-        # Aptos testnet node URL
-        APTOS_NODE_URL = os.getenv('APTOS_NODE_URL', 'https://fullnode.testnet.aptoslabs.com')
-        MODULE_ADDRESS = os.getenv('MODULE_ADDRESS', '0x033349213be67033ffd596fa85b69ab5c3ff82a508bb446002c8419d549d12c6')
-        OLD_MODULE_ADDRESS = os.getenv('OLD_MODULE_ADDRESS', '0xfbc34c56aab6dcbe5aa1c9c47807e8fc80f0e674341b11a5b4b6a742764cd0e2')
-        
-        # Try new contract first
-        for module_address in [MODULE_ADDRESS, OLD_MODULE_ADDRESS]:
-            try:
-                # Use shorter timeout to prevent hanging
-                response = requests.post(
-                    f"{APTOS_NODE_URL}/v1/view",
-                    json={
-                        "function": f"{module_address}::creator_token::get_balance",
-                        "type_arguments": [],
-                        "arguments": [creator_address, token_id_hex, user_address]
-                    },
-                    timeout=5  # Reduced timeout to 5 seconds
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    balance = int(data[0] or '0', 10)
-                    has_access = balance >= minimum_balance
-                    logger.info(f"✅ Token balance verified: {balance} tokens for {user_address[:10]}... (contract: {module_address[:10]}..., minimum: {minimum_balance}, access: {has_access})")
-                    if not has_access:
-                        logger.warning(f"⚠️ Insufficient balance: {balance} < {minimum_balance} (required)")
-                    return has_access
-                elif response.status_code == 429:
-                    # Rate limit - wait and retry once
-                    logger.warning(f"⚠️ Rate limit (429) when checking balance with {module_address[:10]}..., waiting 1s...")
-                    time.sleep(1)
-                    # Try one more time with this contract
-                    try:
-                        response = requests.post(
-                            f"{APTOS_NODE_URL}/v1/view",
-                            json={
-                                "function": f"{module_address}::creator_token::get_balance",
-                                "type_arguments": [],
-                                "arguments": [creator_address, token_id_hex, user_address]
-                            },
-                            timeout=5
-                        )
-                        if response.status_code == 200:
-                            data = response.json()
-                            balance = int(data[0] or '0', 10)
-                            logger.info(f"✅ Token balance verified (retry): {balance} tokens for {user_address[:10]}...")
-                            return balance >= minimum_balance
-                    except:
-                        pass
-                    # If retry failed, try next contract
-                    continue
-                elif response.status_code == 400:
-                    # Check if it's a token not found error
-                    try:
-                        error_data = response.json()
-                        if error_data.get('vm_error_code') == 4016 or 'E_TOKEN_NOT_FOUND' in str(error_data):
-                            logger.warning(f"⚠️ Token not found in {module_address[:10]}... (E_TOKEN_NOT_FOUND), trying next contract")
-                            # Try next contract
-                            continue
-                    except:
-                        pass
-                    # Other 400 error - log and try next contract
-                    logger.warning(f"⚠️ 400 error when checking balance with {module_address[:10]}...: {response.text[:200]}")
-                    continue
-            except requests.exceptions.Timeout:
-                logger.warning(f"⚠️ Timeout checking balance with {module_address[:10]}..., trying next contract")
-                continue
-            except Exception as e:
-                logger.warning(f"⚠️ Error checking balance with {module_address[:10]}...: {e}")
-                continue
-        
-        logger.warning(f"Failed to verify token balance for {user_address} - tried both contracts")
-        return False
+        has_access = balance >= minimum_balance
+        if not has_access:
+            logger.info(f"⚠️ Insufficient balance for {user_address[:10]}...: {balance} < {minimum_balance} (required)")
+        return has_access
         
+    except BalanceCheckTimeout:
+        raise
     except Exception as e:
         logger.error(f"Error verifying token balance: {e}")
         traceback.print_exc()
         return False
 
+def issue_premium_access_token(user_address: str, creator_address: str, token_id, blob_url: str):
+    """
+    Create a signed, time-limited (10 minute) token for /api/premium/content
+    Returns (access_token, expires_at)
+    """
+    from datetime import timedelta
+    expires_at = datetime.now() + timedelta(minutes=10)
+    
+    token_data = {
+        "userAddress": user_address,
+        "creatorAddress": creator_address,
+        "tokenId": token_id,
+        "blobUrl": blob_url,
+        "expiresAt": expires_at.isoformat(),
+        "nonce": secrets.token_urlsafe(16)
+    }
+    
+    # Sign token with secret key
+    token_string = json.dumps(token_data, sort_keys=True)
+    token_signature = hashlib.sha256(
+        (token_string + app.secret_key).encode()
+    ).hexdigest()
+    
+    access_token = base64.urlsafe_b64encode(
+        f"{token_string}:{token_signature}".encode()
+    ).decode()
+    return access_token, expires_at
+
+def resolve_premium_access(viewer_address: str, items: list, deadline: float = None) -> list:
+    """
+    Access decisions for one viewer over many premium items
+    
+    items: dicts with creatorAddress, tokenId, optional minimumBalance and
+    blobUrl (a token is issued for granted items that have one) and any
+    postId to echo back. Balances are deduped per (creator, token) and
+    looked up concurrently through the balance cache.
+    """
+    balances = balance_cache.get_many(
+        viewer_address, [(item['creatorAddress'], item['tokenId']) for item in items], deadline=deadline
+    )
+    
+    decisions = []
+    for item in items:
+        minimum_balance = item.get('minimumBalance', 1)
+        balance = balances.get(balance_key(viewer_address, item['creatorAddress'], item['tokenId']))
+        decision = {
+            "creatorAddress": item['creatorAddress'],
+            "tokenId": item['tokenId'],
+            "minimumBalance": minimum_balance,
+            "balance": balance,
+            "hasAccess": balance is not None and balance >= minimum_balance
+        }
+        if 'postId' in item:
+            decision["postId"] = item['postId']
+        if balance is None:
+            decision["error"] = "Balance unavailable - please try again"
+        elif decision["hasAccess"] and item.get('blobUrl') and item['blobUrl'] != 'check-access-only':
+            access_token, expires_at = issue_premium_access_token(
+                viewer_address, item['creatorAddress'], item['tokenId'], item['blobUrl']
+            )
+            decision["accessToken"] = access_token
+            decision["expiresAt"] = expires_at.isoformat()
+        decisions.append(decision)
+    return decisions
+
 @app.route('/api/premium/access-token', methods=['POST'])
 @cross_origin(supports_credentials=True)
 def get_premium_access_token():
@@ -6088,25 +5323,12 @@ def get_premium_access_token():
         # Log the request for debugging
         logger.info(f"🔐 Premium access check: user={user_address[:10] if user_address else 'None'}..., creator={creator_address[:10] if creator_address else 'None'}..., token_id={str(token_id)[:20] if token_id else 'None'}...")
         
-        # Verify token balance on-chain with timeout protection
+        # Verify token balance on-chain within the request's time budget
         try:
-            # Add timeout wrapper for balance check
-            import signal
-            
-            def timeout_handler(signum, frame):
-                raise TimeoutError("Balance check timeout")
-            
-            # Set timeout (Unix only - for Windows, we rely on requests timeout)
-            if hasattr(signal, 'SIGALRM'):
-                signal.signal(signal.SIGALRM, timeout_handler)
-                signal.alarm(10)  # 10 second timeout
-            
-            try:
-                has_access = verify_token_balance_on_chain(user_address, creator_address, token_id, minimum_balance)
-            finally:
-                if hasattr(signal, 'SIGALRM'):
-                    signal.alarm(0)  # Cancel timeout
-        except TimeoutError:
+            deadline = time.monotonic() + BALANCE_CHECK_TIMEOUT
+            has_access = verify_token_balance_on_chain(user_address, creator_address, token_id, minimum_balance,
+                                                       deadline=deadline)
+        except BalanceCheckTimeout:
             logger.error(f"⏱️ Balance check timeout for {user_address}")
             return jsonify({
                 "success": False,
@@ -6141,29 +5363,7 @@ def get_premium_access_token():
                 "message": "Access granted"
             }), 200
         
-        # Generate time-limited access token (valid for 10 minutes)
-        from datetime import datetime, timedelta
-        expires_at = datetime.now() + timedelta(minutes=10)
-        
-        # Create signed token
-        token_data = {
-            "userAddress": user_address,
-            "creatorAddress": creator_address,
-            "tokenId": token_id,
-            "blobUrl": blob_url,
-            "expiresAt": expires_at.isoformat(),
-            "nonce": secrets.token_urlsafe(16)
-        }
-        
-        # Sign token with secret key
-        token_string = json.dumps(token_data, sort_keys=True)
-        token_signature = hashlib.sha256(
-            (token_string + app.secret_key).encode()
-        ).hexdigest()
-        
-        access_token = base64.urlsafe_b64encode(
-            f"{token_string}:{token_signature}".encode()
-        ).decode()
+        access_token, expires_at = issue_premium_access_token(user_address, creator_address, token_id, blob_url)
         
         logger.info(f"Access token issued for {user_address} (expires: {expires_at})")
         
@@ -6179,6 +5379,53 @@ def get_premium_access_token():
         traceback.print_exc()
         return jsonify({"success": False, "error": str(e)}), 500
 
+# Upper bound on items per /api/premium/access-batch request
+PREMIUM_ACCESS_BATCH_MAX = int(os.getenv('PREMIUM_ACCESS_BATCH_MAX', '100'))
+# Seconds a client should wait after a premium content balance check times out
+PREMIUM_CONTENT_RETRY_AFTER = int(os.getenv('PREMIUM_CONTENT_RETRY_AFTER', '2'))
+
+@app.route('/api/premium/access-batch', methods=['POST'])
+@cross_origin(supports_credentials=True)
+def get_premium_access_batch():
+    """
+    Access decisions (and signed tokens) for a whole page of premium posts
+    
+    Body: {"viewerAddress": ..., "items": [{"creatorAddress", "tokenId",
+    "minimumBalance"?, "blobUrl"?, "postId"?}, ...]}
+    Results come back in request order.
+    """
+    try:
+        data = request.get_json() or {}
+        viewer_address = data.get('viewerAddress') or data.get('userAddress')
+        items = data.get('items')
+        
+        if not viewer_address or not isinstance(items, list):
+            return jsonify({"success": False, "error": "viewerAddress and items are required"}), 400
+        if len(items) > PREMIUM_ACCESS_BATCH_MAX:
+            return jsonify({"success": False, "error": f"At most {PREMIUM_ACCESS_BATCH_MAX} items per request"}), 400
+        for item in items:
+            if not isinstance(item, dict) or not item.get('creatorAddress') or not item.get('tokenId'):
+                return jsonify({"success": False, "error": "Each item needs creatorAddress and tokenId"}), 400
+            minimum_balance = item.get('minimumBalance', 1)
+            if isinstance(minimum_balance, bool) or not isinstance(minimum_balance, (int, float)) or minimum_balance < 0:
+                return jsonify({"success": False, "error": "minimumBalance must be a number >= 0"}), 400
+        
+        deadline = time.monotonic() + BALANCE_CHECK_TIMEOUT
+        results = resolve_premium_access(viewer_address, items, deadline=deadline)
+        
+        granted = sum(1 for result in results if result['hasAccess'])
+        logger.info(f"🔐 Premium access batch for {viewer_address[:10]}...: {granted}/{len(results)} granted")
+        
+        return jsonify({
+            "success": True,
+            "viewerAddress": viewer_address,
+            "results": results
+        })
+    except Exception as e:
+        logger.error(f"Error in premium access batch: {e}")
+        traceback.print_exc()
+        return jsonify({"success": False, "error": str(e)}), 500
+
 @app.route('/api/premium/content', methods=['GET'])
 @cross_origin(supports_credentials=True)
 def get_premium_content():
@@ -6215,13 +5462,25 @@ def get_premium_content():
                 return jsonify({"success": False, "error": "Access token expired"}), 401
             
             # Verify token balance again (double-check on every request)
-            has_access = verify_token_balance_on_chain(
-                token_data['userAddress'],
-                token_data['creatorAddress'],
-                token_data['tokenId'],
-                minimum_balance=1
-            )
-            
+            try:
+                has_access = verify_token_balance_on_chain(
+                    token_data['userAddress'],
+                    token_data['creatorAddress'],
+                    token_data['tokenId'],
+                    minimum_balance=1,
+                    deadline=time.monotonic() + BALANCE_CHECK_TIMEOUT
+                )
+            except BalanceCheckTimeout:
+                # A slow node, not a bad token: the lookup keeps running and lands in the cache
+                logger.error(f"⏱️ Balance check timeout serving premium content to {token_data['userAddress']}")
+                response = jsonify({
+                    "success": False,
+                    "error": "Balance check timeout - please try again",
+                    "retryAfter": PREMIUM_CONTENT_RETRY_AFTER
+                })
+                response.headers['Retry-After'] = str(PREMIUM_CONTENT_RETRY_AFTER)
+                return response, 503
+
             if not has_access:
                 logger.warning(f"Access revoked for {token_data['userAddress']} - balance changed")
                 return jsonify({
@@ -6229,30 +5488,16 @@ def get_premium_content():
                     "error": "Access revoked - insufficient token balance"
                 }), 403
             
-            # Fetch content from Shelby and proxy it
-            blob_url = token_data['blobUrl']
-            shelby_url = f"https://api.shelbynet.shelby.xyz/shelby/v1/blobs/{blob_url}"
-            
-            # Stream content from Shelby
-            response = requests.get(shelby_url, stream=True, timeout=60)
-            
-            if response.status_code != 200:
-                logger.error(f"Failed to fetch from Shelby: {response.status_code}")
+            # Serve from the local blob cache, fetching from Shelby on a miss
+            try:
+                blob = blob_cache.get(token_data['blobUrl'], fetch_over_http)
+            except BlobFetchError as e:
+                logger.error(f"Failed to fetch from Shelby: {e}")
                 return jsonify({"success": False, "error": "Failed to fetch content"}), 500
             
-            # Determine content type
-            content_type = response.headers.get('Content-Type', 'application/octet-stream')
-            
-            # Stream response
-            from flask import Response
-            return Response(
-                response.iter_content(chunk_size=8192),
-                mimetype=content_type,
-                headers={
-                    'Content-Disposition': f'inline; filename="premium_content"',
-                    'Cache-Control': 'no-store, no-cache, must-revalidate, max-age=0'
-                }
-            )
+            response = send_blob(blob, download_name='premium_content')
+            response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
+            return response
             
         except Exception as e:
             logger.error(f"Error verifying access token: {e}")
@@ -6287,7 +5532,7 @@ def create_post():
             return jsonify({"success": False, "error": "Missing required parameters"}), 400
         
         # Verify creator has a token
-        conn = sqlite3.connect('creatorvault.db')
+        conn = get_db()
         cursor = conn.cursor()
         cursor.execute('SELECT token_id FROM tokens WHERE creator = ? AND token_id = ?', (creator_address, token_id))
         token_row = cursor.fetchone()
@@ -6342,7 +5587,7 @@ def delete_post(post_id):
         if not creator_address:
             return jsonify({"success": False, "error": "Creator address required"}), 400
         
-        conn = sqlite3.connect('creatorvault.db')
+        conn = get_db()
         cursor = conn.cursor()
         
         # Verify post belongs to creator
@@ -6387,7 +5632,7 @@ def delete_all_posts():
         if not user_address:
             return jsonify({"success": False, "error": "User address required"}), 400
         
-        conn = sqlite3.connect('creatorvault.db')
+        conn = get_db()
         cursor = conn.cursor()
         
         # Get count before deletion
@@ -6425,8 +5670,10 @@ def get_feed():
         limit = int(request.args.get('limit', 20))
         content_type = request.args.get('contentType')
         sort_by = request.args.get('sortBy', 'latest')
+        # Optional: embed the viewer's access decision for premium posts
+        viewer_address = request.args.get('viewerAddress')
         
-        conn = sqlite3.connect('creatorvault.db')
+        conn = get_db()
         cursor = conn.cursor()
         
         # Build query
@@ -6485,6 +5732,21 @@ def get_feed():
                 "thumbnail": row[20]
             })
         
+        if viewer_address:
+            premium_posts = [post for post in posts if post["isPremium"] and post["tokenId"]]
+            if premium_posts:
+                decisions = resolve_premium_access(viewer_address, [{
+                    "creatorAddress": post["creator"] or post["creatorAddress"],
+                    "tokenId": post["tokenId"],
+                    "minimumBalance": post["minimumBalance"],
+                    "blobUrl": post["shelbyBlobUrl"] or post["shelbyBlobId"],
+                } for post in premium_posts], deadline=time.monotonic() + BALANCE_CHECK_TIMEOUT)
+                for post, decision in zip(premium_posts, decisions):
+                    post["viewerAccess"] = {
+                        key: decision[key] for key in ("hasAccess", "accessToken", "expiresAt", "error")
+                        if key in decision
+                    }
+        
         return jsonify({
             "success": True,
             "posts": posts,
@@ -6510,7 +5772,7 @@ def engage_with_post(post_id):
         if not user_address or not engagement_type:
             return jsonify({"success": False, "error": "Missing required parameters"}), 400
         
-        conn = sqlite3.connect('creatorvault.db')
+        conn = get_db()
         cursor = conn.cursor()
         
         if engagement_type == 'view':
@@ -6564,7 +5826,7 @@ def engage_with_post(post_id):
 def get_comments(post_id):
     """Get comments for a post"""
     try:
-        conn = sqlite3.connect('creatorvault.db')
+        conn = get_db()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -6607,7 +5869,7 @@ def create_comment(post_id):
         if not user_address or not comment_text:
             return jsonify({"success": False, "error": "Missing required parameters"}), 400
         
-        conn = sqlite3.connect('creatorvault.db')
+        conn = get_db()
         cursor = conn.cursor()
         
         # Verify post exists
@@ -6653,7 +5915,7 @@ def get_creator_posts(creator_address):
         page = int(request.args.get('page', 1))
         limit = int(request.args.get('limit', 20))
         
-        conn = sqlite3.connect('creatorvault.db')
+        conn = get_db()
         cursor = conn.cursor()
         
         # Get creator's token info (if exists)
@@ -6770,7 +6032,7 @@ def tokenize_post(post_id):
         if not creator_address:
             return jsonify({"success": False, "error": "Creator address required"}), 400
         
-        conn = sqlite3.connect('creatorvault.db')
+        conn = get_db()
         cursor = conn.cursor()
         
         # Get post details
@@ -6848,7 +6110,7 @@ def create_post_prediction(post_id):
         if not creator_address:
             return jsonify({"success": False, "error": "Creator address required"}), 400
         
-        conn = sqlite3.connect('creatorvault.db')
+        conn = get_db()
         cursor = conn.cursor()
         
         # Get post details
@@ -6907,14 +6169,21 @@ def create_post_prediction(post_id):
         traceback.print_exc()
         return jsonify({"success": False, "error": str(e)}), 500
 
+# Apply schema migrations once per process at startup (gunicorn workers import
+# this module without running __main__)
+init_db()
+# Background Shelby upload workers (also resume jobs left by dead workers)
+upload_jobs.start()
+# Shelby account/balance/blob listing, refreshed off the request path
+shelby_status.start()
+# Resolve prediction markets at their deadlines
+prediction_resolver.start(fetch_final_metric)
+
 if __name__ == '__main__':
     print("🚀 Starting CreatorVault backend server...")
     print(f"📡 Aptos Testnet: {APTOS_NODE_URL}")
     print("🔑 Using Aptos creator account")
     print("📺 YouTube OAuth enabled")
-    
-    # Initialize database
-    init_db()
     print("💾 SQLite database initialized")
     
     # Use PORT from environment (for production) or default to 5001
@@ -0,0 +1,214 @@
+"""
+Aptos view-function client for the creator_token module.
+
+Tokens live under either the current module (MODULE_ADDRESS) or the one it
+replaced (OLD_MODULE_ADDRESS), and callers used to probe them one view at a
+time: supply on the new module, then reserve, then both again on the old
+module, each over a fresh connection. This client sends every view for a
+lookup at once on a shared keep-alive session, prefers the current module
+when both answer, and goes through http_pool's per-host rate budget and
+retry/backoff. With a module cache (token_modules.TokenModuleCache) a token
+whose module is already known costs a single call against that module.
+
+Point APTOS_NODE_URL at a local stub fullnode to exercise it offline
+(see bench_aptos_view.py).
+"""
+
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from http_pool import get_session, request_with_retry, set_host_rate
+from token_modules import token_module_cache
+
+logger = logging.getLogger(__name__)
+
+APTOS_NODE_URL = os.getenv('APTOS_NODE_URL', 'https://fullnode.testnet.aptoslabs.com')
+MODULE_ADDRESS = os.getenv('MODULE_ADDRESS', '0x033349213be67033ffd596fa85b69ab5c3ff82a508bb446002c8419d549d12c6')
+OLD_MODULE_ADDRESS = os.getenv('OLD_MODULE_ADDRESS', '0xfbc34c56aab6dcbe5aa1c9c47807e8fc80f0e674341b11a5b4b6a742764cd0e2')
+APTOS_VIEW_TIMEOUT = float(os.getenv('APTOS_VIEW_TIMEOUT', '5'))
+APTOS_VIEW_WORKERS = int(os.getenv('APTOS_VIEW_WORKERS', '16'))
+# Per-worker budget for the fullnode host
+APTOS_VIEW_RATE = float(os.getenv('APTOS_VIEW_RATE', '20'))
+APTOS_VIEW_BURST = int(os.getenv('APTOS_VIEW_BURST', '40'))
+
+OCTAS_PER_APT = 100_000_000
+
+
+class AptosViewError(Exception):
+    """A view call the fullnode answered with an error."""
+
+    def __init__(self, status: int, body: str, vm_error_code: Optional[int] = None):
+        super().__init__(f"view failed ({status}): {body[:200]}")
+        self.status = status
+        self.body = body
+        self.vm_error_code = vm_error_code
+
+    @property
+    def not_found(self) -> bool:
+        """The token does not exist under the module that was asked."""
+        return self.status in (400, 404) and (
+            self.vm_error_code == 4016
+            or 'E_TOKEN_NOT_FOUND' in self.body
+            or 'Failed to borrow global resource' in self.body
+        )
+
+
+def encode_token_id(token_id) -> str:
+    """Hex-encode a token id the way the contract's vector<u8> argument expects."""
+    if isinstance(token_id, (int, float)):
+        token_id = str(int(token_id))
+    return '0x' + str(token_id).encode('utf-8').hex()
+
+
+class AptosViewClient:
+    """Concurrent, pooled view calls against one fullnode."""
+
+    def __init__(self, node_url: str = APTOS_NODE_URL,
+                 module_addresses: Sequence[str] = (MODULE_ADDRESS, OLD_MODULE_ADDRESS),
+                 timeout: float = APTOS_VIEW_TIMEOUT, max_workers: int = APTOS_VIEW_WORKERS,
+                 module_cache=None):
+        base = node_url.rstrip('/')
+        if not base.endswith('/v1'):
+            base += '/v1'
+        self.view_url = f'{base}/view'
+        self.module_addresses = tuple(module_addresses)
+        self.timeout = timeout
+        self.module_cache = module_cache
+        self.session = get_session('aptos')
+        set_host_rate(urlsplit(self.view_url).netloc, APTOS_VIEW_RATE, APTOS_VIEW_BURST, replace=False)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='aptos-view')
+
+    def view(self, module_address: str, function: str, arguments: List[Any],
+             deadline: Optional[float] = None) -> List[Any]:
+        """Call creator_token::<function> under module_address."""
+        if deadline is None:
+            deadline = time.monotonic() + self.timeout
+        response = request_with_retry(
+            'POST', self.view_url, session=self.session, timeout=self.timeout, deadline=deadline,
+            json={
+                'function': f'{module_address}::creator_token::{function}',
+                'type_arguments': [],
+                'arguments': arguments,
+            },
+        )
+        if response.status_code != 200:
+            vm_error_code = None
+            try:
+                vm_error_code = response.json().get('vm_error_code')
+            except (ValueError, AttributeError):
+                pass
+            raise AptosViewError(response.status_code, response.text, vm_error_code)
+        return response.json()
+
+    def _first_module(self, calls, deadline: float):
+        """Run `calls` (module -> [(function, args), ...]) concurrently.
+
+        Returns ((module, results), all_not_found). The first item is the
+        first module in preference order whose calls all succeeded, or None;
+        all_not_found is True when every module ahead of it (all of them, if
+        none answered) reported the token missing rather than timing out or
+        erroring. Stops waiting as soon as the answer is known.
+        """
+        futures = {
+            module: [self._executor.submit(self.view, module, function, args, deadline)
+                     for function, args in module_calls]
+            for module, module_calls in calls
+        }
+        pending = {f for fs in futures.values() for f in fs}
+        all_not_found = True
+        for module, module_futures in futures.items():
+            while True:
+                if all(f.done() for f in module_futures):
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                pending = {f for f in pending if not f.done()}
+
+            if not all(f.done() for f in module_futures):
+                logger.warning(f"⚠️ Aptos view timed out for module {module[:10]}...")
+                all_not_found = False
+                continue
+            errors = [f.exception() for f in module_futures if f.exception() is not None]
+            if not errors:
+                for f in pending:
+                    f.cancel()
+                return (module, [f.result() for f in module_futures]), all_not_found
+            error = errors[0]
+            if isinstance(error, AptosViewError) and error.not_found:
+                logger.info(f"🔍 Token not found under {module[:10]}..., checking next module")
+            else:
+                logger.warning(f"⚠️ Aptos view failed for module {module[:10]}...: {error}")
+                all_not_found = False
+        return None, all_not_found
+
+    def _resolve(self, creator_address: str, token_id, calls, deadline: float):
+        """Run calls(module) against the token's known module, or all of them.
+
+        A remembered module is trusted until the node says the token is not
+        there; a timeout against it is reported as a failure rather than
+        fanned out to the other module. Returns (found, all_not_found) like
+        _first_module.
+        """
+        cache = self.module_cache
+        known = cache.get(creator_address, token_id) if cache is not None else None
+        if known in self.module_addresses:
+            found, not_found = self._first_module([(known, calls(known))], deadline)
+            if found is not None or not not_found:
+                return found, not_found
+            cache.forget(creator_address, token_id)
+
+        found, definitive = self._first_module([(module, calls(module)) for module in self.module_addresses], deadline)
+        # Only remember an answer no earlier-preferred module could overrule
+        if found is not None and definitive and cache is not None:
+            cache.remember(creator_address, token_id, found[0])
+        return found, definitive
+
+    def token_state(self, creator_address: str, token_id,
+                    deadline: Optional[float] = None) -> Optional[Tuple[int, float, str]]:
+        """(current_supply, apt_reserve_in_apt, module_address) or None."""
+        deadline = deadline or time.monotonic() + self.timeout
+        args = [creator_address, encode_token_id(token_id)]
+        found, _ = self._resolve(
+            creator_address, token_id,
+            lambda module: [('get_current_supply', args), ('get_apt_reserve', args)],
+            deadline,
+        )
+        if found is None:
+            return None
+        module, (supply, reserve) = found
+        return int(supply[0] or '0', 10), int(reserve[0] or '0', 10) / OCTAS_PER_APT, module
+
+    def token_balance(self, creator_address: str, token_id, user_address: str,
+                      deadline: Optional[float] = None) -> Optional[Tuple[int, str]]:
+        """(balance, module_address), (0, None) if no module has the token, or
+        None if the node could not answer."""
+        deadline = deadline or time.monotonic() + self.timeout
+        args = [creator_address, encode_token_id(token_id), user_address]
+        found, not_found = self._resolve(creator_address, token_id, lambda module: [('get_balance', args)], deadline)
+        if found is None:
+            return (0, None) if not_found else None
+        module, (balance,) = found
+        return int(balance[0] or '0', 10), module
+
+
+_client: Optional[AptosViewClient] = None
+_client_pid: Optional[int] = None
+_client_lock = threading.Lock()
+
+
+def get_view_client() -> AptosViewClient:
+    """Process-wide client (recreated after fork: executor threads don't survive it)."""
+    global _client, _client_pid
+    if _client is None or _client_pid != os.getpid():
+        with _client_lock:
+            if _client is None or _client_pid != os.getpid():
+                _client = AptosViewClient(module_cache=token_module_cache)
+                _client_pid = os.getpid()
+    return _client
@@ -0,0 +1,226 @@
+"""
+On-chain token balance cache for premium content gating.
+
+Gated feeds check the viewer's balance for every premium post, and each check
+used to be a fresh fullnode round trip. Balances are cached per
+(user, creator, token_id) for BALANCE_CACHE_TTL seconds; confirmed-zero
+balances (no tokens, or the token doesn't exist on-chain) for the shorter
+BALANCE_CACHE_NEGATIVE_TTL. Node failures are never cached.
+
+Concurrent checks for the same key share one in-flight node call, and every
+call is bounded by a deadline instead of a signal alarm, so it is safe from
+any thread. sync_contract_trade applies confirmed trades to cached entries
+in place.
+
+The cache is per worker process: a trade synced through another worker
+shows up here once the entry's TTL lapses.
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from aptos_view import get_view_client
+
+logger = logging.getLogger(__name__)
+
+BALANCE_CACHE_TTL = float(os.getenv('BALANCE_CACHE_TTL', '15'))
+BALANCE_CACHE_NEGATIVE_TTL = float(os.getenv('BALANCE_CACHE_NEGATIVE_TTL', '5'))
+BALANCE_CACHE_MAX_ENTRIES = int(os.getenv('BALANCE_CACHE_MAX_ENTRIES', '50000'))
+BALANCE_CHECK_TIMEOUT = float(os.getenv('BALANCE_CHECK_TIMEOUT', '10'))
+BALANCE_BATCH_WORKERS = int(os.getenv('BALANCE_BATCH_WORKERS', '8'))
+
+BalanceKey = Tuple[str, str, str]
+
+
+class BalanceCheckTimeout(TimeoutError):
+    """The balance could not be determined before the caller's deadline."""
+
+
+def balance_key(user_address: str, creator_address: str, token_id) -> BalanceKey:
+    if isinstance(token_id, (int, float)):
+        token_id = str(int(token_id))
+    return (user_address or '').lower(), (creator_address or '').lower(), str(token_id)
+
+
+class _InFlight:
+    __slots__ = ('done', 'balance')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.balance: Optional[int] = None
+
+
+class BalanceCache:
+    """TTL + negative cache with single-flight loading."""
+
+    def __init__(self, fetch: Callable[[str, str, str, float], Optional[int]],
+                 ttl: float = BALANCE_CACHE_TTL, negative_ttl: float = BALANCE_CACHE_NEGATIVE_TTL,
+                 max_entries: int = BALANCE_CACHE_MAX_ENTRIES):
+        """`fetch(user, creator, token_id, deadline)` returns the on-chain
+        balance, 0 if the token doesn't exist, or None if the node could not
+        answer."""
+        self.fetch = fetch
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        # key -> (balance, expires_at)
+        self._entries: 'OrderedDict[BalanceKey, Tuple[float, float]]' = OrderedDict()
+        self._inflight: Dict[BalanceKey, _InFlight] = {}
+        # Bumped by trades/invalidations during a lookup so its (older) result isn't stored
+        self._versions: Dict[BalanceKey, int] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_pid: Optional[int] = None
+        self._stats = {'hits': 0, 'negative_hits': 0, 'misses': 0, 'shared': 0,
+                       'fetch_failures': 0, 'timeouts': 0, 'trade_updates': 0, 'invalidations': 0}
+
+    def _store(self, key: BalanceKey, balance: float):
+        ttl = self.ttl if balance > 0 else self.negative_ttl
+        self._entries[key] = (balance, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, user_address: str, creator_address: str, token_id,
+            deadline: Optional[float] = None) -> Optional[float]:
+        """Balance for the key, or None if the node could not answer.
+
+        Raises BalanceCheckTimeout if `deadline` (time.monotonic()) passes
+        before the node answered, either for this call or for the in-flight
+        lookup it joined.
+        """
+        if deadline is None:
+            deadline = time.monotonic() + BALANCE_CHECK_TIMEOUT
+        key = balance_key(user_address, creator_address, token_id)
+
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                balance, expires_at = cached
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self._stats['hits' if balance > 0 else 'negative_hits'] += 1
+                    return balance
+                del self._entries[key]
+
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _InFlight()
+                version = self._versions.get(key, 0)
+                self._stats['misses'] += 1
+            else:
+                self._stats['shared'] += 1
+
+        if not leader:
+            if not flight.done.wait(max(0.0, deadline - time.monotonic())):
+                with self._lock:
+                    self._stats['timeouts'] += 1
+                raise BalanceCheckTimeout("balance check timed out")
+            return flight.balance
+
+        balance = None
+        try:
+            balance = self.fetch(user_address, creator_address, key[2], deadline)
+        except Exception as e:
+            logger.warning(f"⚠️ Balance fetch failed for {user_address[:10]}...: {e}")
+        finally:
+            with self._lock:
+                if balance is None:
+                    self._stats['fetch_failures'] += 1
+                elif self._versions.get(key, 0) == version:
+                    self._store(key, balance)
+                flight.balance = balance
+                del self._inflight[key]
+                self._versions.pop(key, None)
+            flight.done.set()
+
+        if balance is None and time.monotonic() >= deadline:
+            with self._lock:
+                self._stats['timeouts'] += 1
+            raise BalanceCheckTimeout("balance check timed out")
+        return balance
+
+    def get_many(self, user_address: str, pairs: Iterable[Tuple[str, Any]],
+                 deadline: Optional[float] = None) -> Dict[BalanceKey, Optional[float]]:
+        """Balances for many (creator_address, token_id) pairs of one user.
+
+        Duplicate pairs are looked up once and distinct ones concurrently,
+        all within one deadline. Pairs that fail or run out of time map to
+        None. Keys are balance_key(user_address, creator, token_id).
+        """
+        if deadline is None:
+            deadline = time.monotonic() + BALANCE_CHECK_TIMEOUT
+        unique: Dict[BalanceKey, Tuple[str, Any]] = {}
+        for creator_address, token_id in pairs:
+            unique.setdefault(balance_key(user_address, creator_address, token_id), (creator_address, token_id))
+
+        def lookup(creator_address, token_id):
+            try:
+                return self.get(user_address, creator_address, token_id, deadline=deadline)
+            except BalanceCheckTimeout:
+                return None
+
+        if len(unique) <= 1:
+            return {key: lookup(*pair) for key, pair in unique.items()}
+
+        executor = self._get_executor()
+        futures = {key: executor.submit(lookup, *pair) for key, pair in unique.items()}
+        wait(futures.values(), timeout=max(0.0, deadline - time.monotonic()))
+        return {key: (future.result() if future.done() else None) for key, future in futures.items()}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Threads don't survive a fork; build the pool in the process that uses it
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=BALANCE_BATCH_WORKERS,
+                                                    thread_name_prefix='balance-batch')
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def apply_trade(self, user_address: str, creator_address: str, token_ids: Iterable,
+                    trade_type: str, token_amount: float):
+        """Apply a confirmed trade to cached entries in place.
+
+        Keys without a cached balance are left alone - the next check reads
+        the chain. An in-flight lookup started before the trade is not stored.
+        """
+        delta = token_amount if trade_type == 'buy' else -token_amount
+        with self._lock:
+            for token_id in set(t for t in token_ids if t not in (None, '')):
+                key = balance_key(user_address, creator_address, token_id)
+                if key in self._inflight:
+                    self._versions[key] = self._versions.get(key, 0) + 1
+                cached = self._entries.get(key)
+                if cached is not None:
+                    self._store(key, max(0, cached[0] + delta))
+                    self._stats['trade_updates'] += 1
+
+    def invalidate(self, user_address: str, creator_address: str, token_ids: Iterable):
+        with self._lock:
+            for token_id in set(t for t in token_ids if t not in (None, '')):
+                key = balance_key(user_address, creator_address, token_id)
+                if key in self._inflight:
+                    self._versions[key] = self._versions.get(key, 0) + 1
+                if self._entries.pop(key, None) is not None:
+                    self._stats['invalidations'] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['in_flight'] = len(self._inflight)
+        return stats
+
+
+def _fetch_on_chain(user_address: str, creator_address: str, token_id: str, deadline: float) -> Optional[int]:
+    result = get_view_client().token_balance(creator_address, token_id, user_address, deadline=deadline)
+    return None if result is None else result[0]
+
+
+balance_cache = BalanceCache(_fetch_on_chain)
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Aptos view client benchmark against a local stub fullnode.
+
+Starts a stub /v1/view server on localhost with simulated latency, where
+half of the tokens only exist under OLD_MODULE_ADDRESS and a fraction of
+calls are throttled with 429 + Retry-After. It then looks up contract state
+and balances two ways:
+
+- the old way: sequential requests.post calls, new module then old, with no
+  session and a flat 1s sleep on 429
+- the pooled AptosViewClient, first without and then with a module cache
+  (after the first lookup of a token, one call against its known module)
+
+Usage:
+    python bench_aptos_view.py [--lookups 200] [--latency-ms 40] [--throttle 0.05]
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from aptos_view import AptosViewClient, MODULE_ADDRESS, OLD_MODULE_ADDRESS, encode_token_id  # noqa: E402
+from http_pool import http_stats, set_host_rate  # noqa: E402
+
+
+class StubFullnode(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency: float, throttle: float):
+        super().__init__(('127.0.0.1', 0), StubHandler)
+        self.latency = latency
+        self.throttle = throttle
+        self.rng = random.Random(5)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = 0
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        # Headers and body go out in separate writes; without this, Nagle +
+        # delayed ACK adds ~40 ms to every keep-alive response
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, payload, headers=()):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            throttled = server.rng.random() < server.throttle
+        time.sleep(server.latency)
+        if throttled:
+            return self._reply(429, {'message': 'rate limited'}, [('Retry-After', '0.2')])
+
+        module, _, function = body['function'].partition('::creator_token::')
+        token_hex = body['arguments'][1]
+        index = int(bytes.fromhex(token_hex[2:]).decode().rsplit('_', 1)[1])
+        # Even tokens live under the current module, odd ones under the old one
+        home = MODULE_ADDRESS if index % 2 == 0 else OLD_MODULE_ADDRESS
+        if module != home:
+            return self._reply(400, {'message': 'Failed to borrow global resource', 'vm_error_code': 4016})
+        values = {'get_current_supply': 1000 + index, 'get_apt_reserve': 5 * 10**7, 'get_balance': 42}
+        return self._reply(200, [str(values[function])])
+
+
+class MemoryModuleCache:
+    """Dict stand-in for token_modules.TokenModuleCache (no database)."""
+
+    def __init__(self):
+        self.modules = {}
+
+    def get(self, creator_address, token_id):
+        return self.modules.get((creator_address, token_id))
+
+    def remember(self, creator_address, token_id, module_address):
+        self.modules[(creator_address, token_id)] = module_address
+
+    def forget(self, creator_address, token_id):
+        self.modules.pop((creator_address, token_id), None)
+
+
+def legacy_state(url, creator, token_id):
+    """Sequential probe order used before the pooled client."""
+    token_hex = encode_token_id(token_id)
+    for module in (MODULE_ADDRESS, OLD_MODULE_ADDRESS):
+        results = []
+        for function in ('get_current_supply', 'get_apt_reserve'):
+            response = requests.post(url, json={
+                'function': f'{module}::creator_token::{function}',
+                'type_arguments': [], 'arguments': [creator, token_hex],
+            }, timeout=5)
+            if response.status_code == 429:
+                time.sleep(1)
+                response = requests.post(url, json={
+                    'function': f'{module}::creator_token::{function}',
+                    'type_arguments': [], 'arguments': [creator, token_hex],
+                }, timeout=5)
+            if not response.ok:
+                break
+            results.append(response.json())
+        if len(results) == 2:
+            return int(results[0][0]), int(results[1][0]) / 10**8
+    return None
+
+
+def summarize(label, timings, failures, server, before):
+    timings = sorted(timings)
+    p = lambda q: timings[min(len(timings) - 1, int(q * len(timings)))]
+    print(f"   {label:22s} mean {statistics.fmean(timings):7.1f} ms   p50 {p(0.5):7.1f}   "
+          f"p99 {p(0.99):7.1f}   requests {server.requests - before[0]:5d}   "
+          f"new connections {server.connections - before[1]:5d}   failed {failures}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lookups', type=int, default=200)
+    parser.add_argument('--latency-ms', type=float, default=40)
+    parser.add_argument('--throttle', type=float, default=0.05, help='fraction of calls answered with 429')
+    parser.add_argument('--rate', type=float, default=1000,
+                        help='client rate budget for the stub host (requests/s); the production default is APTOS_VIEW_RATE')
+    args = parser.parse_args()
+
+    server = StubFullnode(args.latency_ms / 1000, args.throttle)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    node_url = f'http://127.0.0.1:{server.server_address[1]}'
+    view_url = f'{node_url}/v1/view'
+    creator = '0x' + 'c' * 64
+    tokens = [f'content_{i}' for i in range(args.lookups)]
+    print(f"🔍 Stub fullnode at {node_url}: {args.latency_ms:g} ms latency, {args.throttle:.0%} throttled\n")
+
+    print(f"📈 Contract state lookups ({args.lookups})")
+    before = (server.requests, server.connections)
+    timings, failures = [], 0
+    for token in tokens:
+        started = time.perf_counter()
+        failures += legacy_state(view_url, creator, token) is None
+        timings.append((time.perf_counter() - started) * 1000)
+    summarize('sequential, no session', timings, failures, server, before)
+
+    client = AptosViewClient(node_url=node_url)
+    set_host_rate(f'127.0.0.1:{server.server_address[1]}', args.rate, int(args.rate))
+    before = (server.requests, server.connections)
+    timings, failures = [], 0
+    for token in tokens:
+        started = time.perf_counter()
+        failures += client.token_state(creator, token) is None
+        timings.append((time.perf_counter() - started) * 1000)
+    summarize('pooled, concurrent', timings, failures, server, before)
+
+    before = (server.requests, server.connections)
+    timings, failures = [], 0
+    for token in tokens:
+        started = time.perf_counter()
+        failures += client.token_balance(creator, token, '0x' + 'a' * 64) is None
+        timings.append((time.perf_counter() - started) * 1000)
+    summarize('balance, pooled', timings, failures, server, before)
+
+    cached = AptosViewClient(node_url=node_url, module_cache=MemoryModuleCache())
+    for token in tokens:
+        cached.token_state(creator, token)  # first discovery
+    before = (server.requests, server.connections)
+    timings, failures = [], 0
+    for token in tokens:
+        started = time.perf_counter()
+        failures += cached.token_state(creator, token) is None
+        timings.append((time.perf_counter() - started) * 1000)
+    summarize('pooled, module known', timings, failures, server, before)
+    print(f"\n   client retry stats: {http_stats()}")
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Estimate-latency benchmark for the resident curve registry.
+
+Creates a throwaway database with N tokens (10k by default) and compares the
+old estimate path - read the JSON columns, json.loads both, rebuild
+BondingCurve/BondingCurveState, price - with a lookup in the resident registry,
+and a JSON-column UPDATE per trade with the registry's trade transaction
+(write lock, typed-column re-read, typed-column UPDATE).
+
+Usage:
+    python bench_curve_registry.py [--tokens 10000] [--samples 20000]
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import db  # noqa: E402
+from bonding_curve import BondingCurve, BondingCurveState  # noqa: E402
+from curve_registry import CurveRegistry, curve_column_values, CURVE_COLUMNS  # noqa: E402
+from migrations import migrate  # noqa: E402
+
+
+def build_database(path: str, token_count: int):
+    conn = sqlite3.connect(path)
+    migrate(conn)
+    rng = random.Random(7)
+    rows = []
+    for i in range(token_count):
+        curve = BondingCurve(initial_price=0.00001, initial_supply=1000000)
+        state = BondingCurveState(token_supply=rng.uniform(0, 500000), algo_reserve=rng.uniform(0, 5))
+        rows.append((
+            f'content_{i}', f'0x{i:064x}', f'Token {i}', f'T{i}', 1000000, 0.00001, 10.0,
+            json.dumps(curve.to_dict()), json.dumps(state.to_dict()),
+        ) + curve_column_values(curve, state))
+    placeholders = ', '.join('?' * len(rows[0]))
+    conn.executemany(f'''
+        INSERT INTO tokens (token_id, creator, token_name, token_symbol, total_supply, current_price, market_cap,
+                            bonding_curve_config, bonding_curve_state, {', '.join(CURVE_COLUMNS)})
+        VALUES ({placeholders})
+    ''', rows)
+    conn.commit()
+    conn.close()
+
+
+def percentiles(samples_us):
+    samples_us = sorted(samples_us)
+    pick = lambda q: samples_us[min(len(samples_us) - 1, int(q * len(samples_us)))]
+    return {
+        'mean': statistics.fmean(samples_us),
+        'p50': pick(0.50),
+        'p95': pick(0.95),
+        'p99': pick(0.99),
+    }
+
+
+def report(label, stats):
+    print(f"   {label:34s} mean {stats['mean']:8.1f} µs   p50 {stats['p50']:8.1f}   "
+          f"p95 {stats['p95']:8.1f}   p99 {stats['p99']:8.1f}")
+
+
+def bench_json_estimate(identifiers, amount):
+    timings = []
+    for identifier in identifiers:
+        started = time.perf_counter()
+        conn = db.get_db()
+        row = conn.execute(
+            'SELECT bonding_curve_config, bonding_curve_state, current_price, total_supply FROM tokens WHERE token_id = ?',
+            (identifier,)
+        ).fetchone()
+        conn.close()
+        curve = BondingCurve.from_dict(json.loads(row[0]))
+        state = BondingCurveState.from_dict(json.loads(row[1]))
+        curve.calculate_buy_price(state.token_supply, state.algo_reserve, amount)
+        timings.append((time.perf_counter() - started) * 1e6)
+    return percentiles(timings)
+
+
+def bench_registry_estimate(registry, identifiers, amount):
+    timings = []
+    for identifier in identifiers:
+        started = time.perf_counter()
+        entry = registry.get(identifier)
+        entry.curve.calculate_buy_price(entry.state.token_supply, entry.state.algo_reserve, amount)
+        timings.append((time.perf_counter() - started) * 1e6)
+    return percentiles(timings)
+
+
+def bench_sync_writes(identifiers, amount):
+    timings = []
+    for identifier in identifiers:
+        started = time.perf_counter()
+        conn = db.get_db()
+        row = conn.execute('SELECT bonding_curve_config, bonding_curve_state FROM tokens WHERE token_id = ?',
+                           (identifier,)).fetchone()
+        curve = BondingCurve.from_dict(json.loads(row[0]))
+        state = BondingCurveState.from_dict(json.loads(row[1]))
+        result = curve.calculate_buy_price(state.token_supply, state.algo_reserve, amount)
+        new_state = BondingCurveState(token_supply=result['new_supply'], algo_reserve=result['new_algo_reserve'])
+        conn.execute('UPDATE tokens SET bonding_curve_state = ?, current_price = ?, market_cap = ? WHERE token_id = ?',
+                     (json.dumps(new_state.to_dict()), result['new_price'],
+                      result['new_supply'] * result['new_price'], identifier))
+        conn.commit()
+        conn.close()
+        timings.append((time.perf_counter() - started) * 1e6)
+    return percentiles(timings)
+
+
+def bench_registry_trades(registry, identifiers, amount):
+    timings = []
+    for identifier in identifiers:
+        started = time.perf_counter()
+        entry = registry.get(identifier)
+        with registry.trade(entry) as conn:
+            result = entry.curve.calculate_buy_price(entry.state.token_supply, entry.state.algo_reserve, amount)
+            registry.apply_state(conn, entry, result['new_supply'], result['new_algo_reserve'], result['new_price'])
+        timings.append((time.perf_counter() - started) * 1e6)
+    return percentiles(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tokens', type=int, default=10_000)
+    parser.add_argument('--samples', type=int, default=20_000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='creatorvault_curves_')
+    try:
+        path = os.path.join(workdir, 'curves.db')
+        print(f"🔍 Building {args.tokens:,} tokens in {path}")
+        build_database(path, args.tokens)
+        db.configure_pool(path)
+
+        rng = random.Random(11)
+        identifiers = [f'content_{rng.randrange(args.tokens)}' for _ in range(args.samples)]
+
+        # Long TTL: measure steady-state lookups, not periodic re-reads
+        registry = CurveRegistry(ttl=3600)
+        started = time.perf_counter()
+        registry.load_all()
+        print(f"   registry warm-up: {(time.perf_counter() - started) * 1000:.1f} ms\n")
+
+        print(f"📈 Estimate latency ({args.samples:,} estimates)")
+        report('JSON columns + from_dict', bench_json_estimate(identifiers, 1000))
+        report('resident registry', bench_registry_estimate(registry, identifiers, 1000))
+
+        write_samples = identifiers[:min(len(identifiers), 5000)]
+        print(f"\n💾 Trade state write ({len(write_samples):,} trades)")
+        report('JSON UPDATE + commit', bench_sync_writes(write_samples, 10))
+        report('registry trade (typed columns)', bench_registry_trades(registry, write_samples, 10))
+    finally:
+        db.get_pool().close_all()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+HTML extraction benchmark: full BeautifulSoup tree vs PageMeta.
+
+Extracts what the scrapers read from a fetched page - og:title,
+og:description, og:image and the JSON-LD blocks - two ways:
+
+- the old way: BeautifulSoup(html, 'html.parser') and soup.find() per tag
+- PageMeta: head-only tokenizing for meta tags, regex + json for JSON-LD
+
+and reports parse time per page and peak memory (tracemalloc) for each,
+after checking both return the same values.
+
+Pages are the .html files in --pages (e.g. saved with
+`curl -A 'facebookexternalhit/1.1' <reel url> > fixtures/reel.html`), or, by
+default, synthetic Instagram/Twitter/LinkedIn-like pages: a head with the
+usual meta tags and a few hundred KB of inline script, and a long body.
+
+Usage:
+    python bench_html_extract.py [--pages DIR] [--iterations 20] [--script-kb 300]
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from html_extract import PageMeta  # noqa: E402
+
+META_PROPERTIES = ('og:title', 'og:description', 'og:image')
+
+
+def synthetic_page(platform: str, script_kb: int, rng: random.Random) -> str:
+    likes, comments = rng.randint(1000, 900000), rng.randint(10, 9000)
+    title = {
+        'instagram': f'{likes:,} likes, {comments:,} comments - creator on Instagram: "reel caption"',
+        'twitter': 'creator on X: "tweet text"',
+        'linkedin': f'Post text | {comments} comments on LinkedIn',
+    }[platform]
+    ld = {
+        '@context': 'https://schema.org', '@type': 'SocialMediaPosting', 'headline': title,
+        'interactionStatistic': [
+            {'@type': 'InteractionCounter', 'interactionType': 'https://schema.org/LikeAction',
+             'userInteractionCount': likes},
+            {'@type': 'InteractionCounter', 'interactionType': 'https://schema.org/CommentAction',
+             'userInteractionCount': comments},
+        ],
+    }
+    blob = json.dumps({'entry_data': {'items': [
+        {'id': str(rng.getrandbits(60)), 'text': 'x' * rng.randint(20, 200), 'like_count': rng.randint(0, 99)}
+        for _ in range(script_kb * 1024 // 150)
+    ]}})
+    head = [
+        '<!DOCTYPE html><html lang="en"><head><meta charset="utf-8">',
+        f'<title>{title}</title>',
+        '<meta name="viewport" content="width=device-width, initial-scale=1">',
+        f'<meta property="og:title" content="{title}">',
+        f'<meta property="og:description" content="{comments} comments - creator on {platform}">',
+        f'<meta property="og:image" content="https://cdn.example.com/{platform}/{rng.getrandbits(40):x}.jpg">',
+        '<meta name="twitter:card" content="summary_large_image">',
+        '<link rel="stylesheet" href="/static/app.css">' * 10,
+        f'<script type="application/ld+json">{json.dumps(ld)}</script>',
+        f'<script>window._sharedData = {blob};</script>',
+        '</head>',
+    ]
+    body = ''.join(
+        f'<div class="c{i % 7}"><span>{"lorem ipsum " * 5}</span><a href="/p/{i}">link</a></div>'
+        for i in range(3000)
+    )
+    return ''.join(head) + f'<body>{body}</body></html>'
+
+
+def extract_soup(html: str):
+    soup = BeautifulSoup(html, 'html.parser')
+    meta = {}
+    for prop in META_PROPERTIES:
+        tag = soup.find('meta', property=prop)
+        meta[prop] = tag.get('content', '') if tag else ''
+    blocks = []
+    for script in soup.find_all('script', type='application/ld+json'):
+        try:
+            blocks.append(json.loads(script.string or ''))
+        except ValueError:
+            continue
+    return meta, blocks
+
+
+def extract_page_meta(html: str):
+    page = PageMeta(html)
+    return {prop: page.prop(prop) for prop in META_PROPERTIES}, page.json_ld()
+
+
+def measure(label: str, fn, pages, iterations: int):
+    timings = []
+    for _ in range(iterations):
+        for html in pages:
+            started = time.perf_counter()
+            fn(html)
+            timings.append((time.perf_counter() - started) * 1000)
+    peaks = []
+    for html in pages:
+        tracemalloc.start()
+        fn(html)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    timings.sort()
+    print(f"   {label:14s} mean {statistics.fmean(timings):8.2f} ms   "
+          f"p50 {timings[len(timings) // 2]:8.2f}   p95 {timings[int(len(timings) * 0.95)]:8.2f}   "
+          f"peak mem {max(peaks) / 1024 / 1024:7.2f} MiB")
+    return statistics.fmean(timings), max(peaks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', help='directory of saved .html pages (default: synthetic pages)')
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--script-kb', type=int, default=300, help='inline script size of synthetic pages')
+    args = parser.parse_args()
+
+    if args.pages:
+        names = sorted(name for name in os.listdir(args.pages) if name.endswith('.html'))
+        pages = []
+        for name in names:
+            with open(os.path.join(args.pages, name), encoding='utf-8', errors='replace') as f:
+                pages.append(f.read())
+    else:
+        rng = random.Random(7)
+        names = ['instagram', 'twitter', 'linkedin']
+        pages = [synthetic_page(name, args.script_kb, rng) for name in names]
+    if not pages:
+        sys.exit(f"no .html pages in {args.pages}")
+
+    print(f"🔍 {len(pages)} pages, {sum(map(len, pages)) / len(pages) / 1024:.0f} KB on average, "
+          f"{args.iterations} iterations\n")
+    for name, html in zip(names, pages):
+        expected, got = extract_soup(html), extract_page_meta(html)
+        if expected != got:
+            print(f"⚠️ {name}: extraction differs\n   soup:     {expected[0]}\n   PageMeta: {got[0]}")
+
+    soup_ms, soup_peak = measure('BeautifulSoup', extract_soup, pages, args.iterations)
+    meta_ms, meta_peak = measure('PageMeta', extract_page_meta, pages, args.iterations)
+    print(f"\n   PageMeta: {soup_ms / meta_ms:.1f}x faster, {soup_peak / max(meta_peak, 1):.1f}x less peak memory")
+
+
+if __name__ == '__main__':
+    main()
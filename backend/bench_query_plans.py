@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Query-plan regression check for the trades ledger.
+
+Builds a throwaway database with the real schema, fills it with synthetic
+trades (1M by default), runs EXPLAIN QUERY PLAN on every hot ledger query and
+exits non-zero if any of them falls back to a full SCAN.
+
+Usage:
+    python bench_query_plans.py [--trades 1000000] [--keep]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from leaderboard import _RANKING_SQL  # noqa: E402
+from migrations import migrate  # noqa: E402
+
+TRADER = '0x' + '1' * 64
+TOKEN = 'token_42'
+
+# (name, sql, params) - kept in sync with the handlers in app.py
+HOT_QUERIES = [
+    ('get_trades', '''
+        SELECT trade_type, amount, price, created_at, transaction_id, trader_address
+        FROM trades
+        WHERE asa_id = ? AND created_at_ms >= ?
+        ORDER BY created_at_ms DESC
+        LIMIT ?
+    ''', (TOKEN, int((time.time() - 86400) * 1000), 50)),
+    # trader_token_daily buckets after the cutoff day + raw trades of the cutoff day
+    ('copy_trading_leaderboard', _RANKING_SQL, {
+        'cutoff': (datetime.utcnow() - timedelta(days=7)).strftime('%Y-%m-%d %H:%M:%S'),
+        'limit': 50,
+    }),
+    ('copy_trading_trader_pnl', '''
+        SELECT
+            strftime('%Y-%m-%d', epoch_day * 86400, 'unixepoch') as day,
+            sell_value - buy_value as pnl
+        FROM trader_pnl_daily
+        WHERE trader_address = ? AND epoch_day >= CAST(strftime('%s', datetime('now', '-30 days')) AS INTEGER) / 86400
+        ORDER BY epoch_day
+    ''', (TRADER,)),
+    ('copy_trading_trader_pnl_hourly', '''
+        SELECT
+            strftime('%Y-%m-%d %H:00:00', epoch_hour * 3600, 'unixepoch') as hour,
+            sell_value - buy_value as pnl
+        FROM trader_pnl_hourly
+        WHERE trader_address = ? AND epoch_hour >= CAST(strftime('%s', datetime('now', '-7 days')) AS INTEGER) / 3600
+        ORDER BY epoch_hour
+    ''', (TRADER,)),
+    ('copy_trading_trader_analytics', '''
+        SELECT p.asa_id, p.trade_count, p.buy_amount, p.buy_value, p.sell_value,
+               p.first_trade_at, p.last_trade_at, tk.token_name, tk.token_symbol,
+               tk.current_price, tk.market_cap,
+               (julianday(p.last_trade_at) - julianday(p.first_trade_at)) * 1440 as hold_minutes
+        FROM trader_positions p
+        LEFT JOIN tokens tk ON p.asa_id = tk.asa_id
+        WHERE p.trader_address = ?
+    ''', (TRADER,)),
+    ('copy_trading_trader_analytics_7d', '''
+        SELECT
+            COUNT(*),
+            COUNT(DISTINCT asa_id),
+            COALESCE(SUM(total_value), 0),
+            COALESCE(SUM(CASE WHEN trade_type = 'buy' THEN total_value ELSE 0 END), 0),
+            COALESCE(SUM(CASE WHEN trade_type = 'sell' THEN total_value ELSE 0 END), 0),
+            COALESCE(SUM(trade_type = 'sell'), 0)
+        FROM trades
+        WHERE trader_address = ? AND created_at_ms >= ?
+    ''', (TRADER, int((time.time() - 7 * 86400) * 1000))),
+    ('copy_trading_trader_trades', '''
+        SELECT t.trade_type, t.amount, t.price, t.total_value, t.created_at,
+               t.transaction_id, t.asa_id, tk.token_name, tk.token_symbol
+        FROM trades t
+        LEFT JOIN tokens tk ON t.asa_id = tk.asa_id
+        WHERE t.trader_address = ?
+        ORDER BY t.created_at_ms DESC
+        LIMIT ?
+    ''', (TRADER, 50)),
+    ('get_portfolio', '''
+        SELECT t.asa_id, tk.token_name, tk.token_symbol, tk.current_price,
+               SUM(CASE WHEN t.trade_type = 'buy' THEN t.amount ELSE -t.amount END) as net_amount
+        FROM trades t
+        LEFT JOIN tokens tk ON t.asa_id = tk.asa_id
+        WHERE t.trader_address = ?
+        GROUP BY t.asa_id
+        HAVING net_amount > 0
+    ''', (TRADER,)),
+    # load_candles: a token's ids (token_id / metadata_address) at one resolution over 24h
+    ('get_trade_candles', '''
+        SELECT bucket_start, open, high, low, close, volume, quote_volume, trade_count, open_at, close_at
+        FROM token_candles
+        WHERE asa_id IN (?,?) AND resolution = ? AND bucket_start >= ? AND bucket_start <= ?
+        ORDER BY bucket_start, open_at
+    ''', (TOKEN, '0x' + '4' * 64, 300, int(time.time()) - 86400, int(time.time()))),
+    ('get_token_details', 'SELECT COUNT(*) FROM trades WHERE asa_id = ?', (TOKEN,)),
+    ('get_creator_earnings', 'SELECT SUM(creator_fee) FROM trades WHERE asa_id = ?', (TOKEN,)),
+    ('bonding_curve_estimate', 'SELECT SUM(amount) FROM trades WHERE asa_id = ? AND trade_type = ?', (TOKEN, 'buy')),
+    ('token_lookup_by_asa_id', 'SELECT creator FROM tokens WHERE asa_id = ?', (TOKEN,)),
+    ('token_contract_module', '''
+        SELECT contract_module_address FROM tokens
+        WHERE contract_module_address IS NOT NULL
+          AND ((creator = ? AND content_id = ?) OR token_id = ?)
+        LIMIT 1
+    ''', (TRADER, TOKEN, TOKEN)),
+]
+
+
+def build_database(path: str, trade_count: int, token_count: int = 2000, trader_count: int = 20000):
+    """Create the schema with the app's migrations and load synthetic trades."""
+    conn = sqlite3.connect(path)
+    migrate(conn)
+    cursor = conn.cursor()
+    rng = random.Random(42)
+
+    cursor.executemany(
+        'INSERT INTO tokens (token_id, asa_id, token_name, token_symbol, creator, total_supply, current_price, market_cap) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+        ((f'token_{i}', f'token_{i}', f'Token {i}', f'T{i}', f'0x{i:064x}', 1000000, 0.00001, 10.0)
+         for i in range(token_count))
+    )
+
+    traders = [TRADER] + [f'0x{i:064x}' for i in range(1, trader_count)]
+    now = datetime.utcnow()
+
+    def trades():
+        for i in range(trade_count):
+            created = now - timedelta(seconds=rng.randint(0, 365 * 86400))
+            amount = rng.uniform(1, 10000)
+            price = rng.uniform(0.00001, 0.001)
+            yield (
+                f'token_{rng.randrange(token_count)}',
+                traders[rng.randrange(trader_count)],
+                'buy' if rng.random() < 0.6 else 'sell',
+                amount, price, f'tx_{i}', amount * price,
+                created.strftime('%Y-%m-%d %H:%M:%S'),
+            )
+
+    cursor.executemany(
+        'INSERT INTO trades (asa_id, trader_address, trade_type, amount, price, transaction_id, total_value, created_at) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+        trades()
+    )
+    conn.commit()
+    cursor.execute('ANALYZE')
+    conn.commit()
+    return conn
+
+
+def check_plans(conn: sqlite3.Connection) -> int:
+    failures = 0
+    cursor = conn.cursor()
+    for name, sql, params in HOT_QUERIES:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        details = [row[3] for row in cursor.fetchall()]
+        # Reading a CTE / subquery result row by row is fine; only table scans count
+        subqueries = {d.split()[1] for d in details if d.startswith(('CO-ROUTINE ', 'MATERIALIZE '))}
+        scans = [d for d in details if d.startswith('SCAN ') and d.split()[1] not in subqueries]
+
+        started = time.perf_counter()
+        cursor.execute(sql, params).fetchall()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        status = '❌ SCAN' if scans else '✅'
+        print(f"{status} {name:32s} {elapsed_ms:9.2f} ms")
+        for d in details:
+            print(f"      {d}")
+        if scans:
+            failures += 1
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--trades', type=int, default=1_000_000, help='number of synthetic trades')
+    parser.add_argument('--keep', action='store_true', help='keep the generated database')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='creatorvault_plans_')
+    path = os.path.join(workdir, 'plans.db')
+
+    print(f"🔍 Building synthetic ledger with {args.trades:,} trades in {path}")
+    started = time.perf_counter()
+    conn = build_database(path, args.trades)
+    print(f"   built in {time.perf_counter() - started:.1f}s\n")
+
+    failures = check_plans(conn)
+    conn.close()
+
+    if not args.keep:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if failures:
+        print(f"\n❌ {failures} hot quer{'y' if failures == 1 else 'ies'} fell back to a full SCAN")
+        sys.exit(1)
+    print("\n✅ All hot queries use an index")
+
+
+if __name__ == '__main__':
+    main()
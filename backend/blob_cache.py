@@ -0,0 +1,352 @@
+"""
+Content-addressed on-disk cache for Shelby blobs.
+
+Every /api/shelby/download and /api/premium/content request used to pull the
+whole blob from Shelby again - the download endpoint into a temp file that
+was never deleted. Blobs are now stored once under their SHA-256:
+
+    <BLOB_CACHE_DIR>/objects/ab/abcdef...    blob bytes
+    <BLOB_CACHE_DIR>/refs/12/1234....json    blob URL -> sha256, size, content type
+    <BLOB_CACHE_DIR>/tmp/                    downloads in progress
+
+Objects are published with an atomic rename, so every gunicorn worker on the
+host shares the cache, and two URLs with the same bytes share one object.
+Recency is the object's mtime (touched on hits) and the oldest objects are
+evicted once the directory grows past BLOB_CACHE_MAX_BYTES. Callers serve
+the returned path with send_file(conditional=True), which answers Range
+requests and lets the WSGI server use sendfile().
+
+Concurrent misses for the same URL in one worker share a single download.
+Blobs larger than BLOB_CACHE_MAX_OBJECT_BYTES are not kept: they come back
+as temporary files the caller deletes once the response is closed.
+"""
+
+import os
+import time
+import json
+import errno
+import hashlib
+import logging
+import mimetypes
+import tempfile
+import threading
+import subprocess
+from typing import Callable, Dict, Optional
+
+from http_pool import get_session, request_with_retry
+
+logger = logging.getLogger(__name__)
+
+BLOB_CACHE_DIR = os.getenv('BLOB_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'creatorvault-blob-cache'))
+BLOB_CACHE_MAX_BYTES = int(os.getenv('BLOB_CACHE_MAX_BYTES', str(2 * 1024 ** 3)))
+BLOB_CACHE_MAX_OBJECT_BYTES = int(os.getenv('BLOB_CACHE_MAX_OBJECT_BYTES', str(512 * 1024 ** 2)))
+BLOB_FETCH_TIMEOUT = float(os.getenv('BLOB_FETCH_TIMEOUT', '60'))
+SHELBY_BLOB_API_URL = os.getenv('SHELBY_BLOB_API_URL', 'https://api.shelbynet.shelby.xyz/shelby/v1/blobs')
+
+# Evict down to this fraction of the budget so eviction doesn't run on every insert
+_EVICT_TARGET = 0.9
+# Hits touch the object's mtime at most this often (it's a metadata write)
+_TOUCH_INTERVAL = 60
+_CHUNK_SIZE = 1024 * 1024
+
+
+class BlobFetchError(Exception):
+    """The blob could not be downloaded from Shelby."""
+
+
+class CachedBlob:
+    """A blob on local disk, ready for send_file()."""
+
+    __slots__ = ('path', 'size', 'sha256', 'content_type', 'temporary')
+
+    def __init__(self, path: str, size: int, sha256: str, content_type: str, temporary: bool = False):
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+        self.content_type = content_type
+        # Not in the cache: the caller must delete it after serving
+        self.temporary = temporary
+
+    def cleanup(self):
+        if self.temporary:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+
+class _InFlight:
+    __slots__ = ('done',)
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+def _sha256_hex(data: str) -> str:
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def guess_content_type(blob_url: str) -> str:
+    return mimetypes.guess_type(blob_url.split('?', 1)[0])[0] or 'application/octet-stream'
+
+
+class BlobCache:
+    """Size-bounded LRU of blobs on disk, shared by all workers on the host."""
+
+    def __init__(self, root: str = BLOB_CACHE_DIR, max_bytes: int = BLOB_CACHE_MAX_BYTES,
+                 max_object_bytes: int = BLOB_CACHE_MAX_OBJECT_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_object_bytes = min(max_object_bytes, max_bytes)
+        self._objects = os.path.join(root, 'objects')
+        self._refs = os.path.join(root, 'refs')
+        self._tmp = os.path.join(root, 'tmp')
+        self._ready = False
+        # Bytes on disk as of the last scan plus what this worker added since
+        self._disk_bytes = 0
+        self._inflight: Dict[str, _InFlight] = {}
+        self._lock = threading.Lock()
+        self._evict_lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'shared': 0, 'fetch_failures': 0, 'oversized': 0,
+                       'deduplicated': 0, 'evictions': 0, 'bytes_fetched': 0, 'bytes_evicted': 0,
+                       'bytes_served': 0}
+
+    def _ensure_dirs(self):
+        if self._ready:
+            return
+        for path in (self._objects, self._refs, self._tmp):
+            os.makedirs(path, exist_ok=True)
+        # Partial downloads left by a crashed worker; live ones are younger than the fetch timeout
+        cutoff = time.time() - 2 * BLOB_FETCH_TIMEOUT
+        with os.scandir(self._tmp) as entries:
+            for entry in entries:
+                try:
+                    if entry.stat().st_mtime < cutoff:
+                        os.unlink(entry.path)
+                except FileNotFoundError:
+                    pass
+        self._disk_bytes = self._scan_size()
+        self._ready = True
+
+    def _object_path(self, sha256: str) -> str:
+        return os.path.join(self._objects, sha256[:2], sha256)
+
+    def _ref_path(self, blob_url: str) -> str:
+        key = _sha256_hex(blob_url)
+        return os.path.join(self._refs, key[:2], key + '.json')
+
+    def _lookup(self, blob_url: str) -> Optional[CachedBlob]:
+        try:
+            with open(self._ref_path(blob_url)) as f:
+                ref = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        path = self._object_path(ref['sha256'])
+        try:
+            mtime = os.stat(path).st_mtime
+        except FileNotFoundError:
+            # Object was evicted; the ref is rewritten on the next fill
+            return None
+        if time.time() - mtime > _TOUCH_INTERVAL:
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                return None
+        return CachedBlob(path, ref['size'], ref['sha256'], ref['content_type'])
+
+    def get(self, blob_url: str, fetch: Callable[[str, str], Optional[str]]) -> CachedBlob:
+        """Local copy of the blob, downloading it on a miss.
+
+        `fetch(blob_url, dest_path)` writes the blob to dest_path and returns
+        its content type (or None to guess from the URL); it raises
+        BlobFetchError on failure, which propagates to the caller.
+        """
+        with self._lock:
+            self._ensure_dirs()
+
+        blob = self._lookup(blob_url)
+        if blob is not None:
+            with self._lock:
+                self._stats['hits'] += 1
+            return blob
+
+        with self._lock:
+            flight = self._inflight.get(blob_url)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[blob_url] = _InFlight()
+                self._stats['misses'] += 1
+            else:
+                self._stats['shared'] += 1
+
+        if not leader:
+            flight.done.wait(BLOB_FETCH_TIMEOUT)
+            blob = self._lookup(blob_url)
+            if blob is not None:
+                return blob
+            # The leader failed or the blob is too big to keep: fetch our own copy
+            return self._fill(blob_url, fetch)
+
+        try:
+            return self._fill(blob_url, fetch)
+        finally:
+            with self._lock:
+                del self._inflight[blob_url]
+            flight.done.set()
+
+    def _fill(self, blob_url: str, fetch: Callable[[str, str], Optional[str]]) -> CachedBlob:
+        fd, tmp_path = tempfile.mkstemp(dir=self._tmp)
+        os.close(fd)
+        try:
+            content_type = fetch(blob_url, tmp_path) or guess_content_type(blob_url)
+            size = os.path.getsize(tmp_path)
+            sha256 = _hash_file(tmp_path)
+        except BaseException:
+            with self._lock:
+                self._stats['fetch_failures'] += 1
+            os.unlink(tmp_path)
+            raise
+
+        oversized = size > self.max_object_bytes
+        with self._lock:
+            self._stats['bytes_fetched'] += size
+            self._stats['oversized'] += oversized
+        if oversized:
+            logger.info(f"📦 Blob {blob_url[:60]} is {size / 1024 ** 2:.0f} MB - serving without caching")
+            return CachedBlob(tmp_path, size, sha256, content_type, temporary=True)
+
+        path = self._object_path(sha256)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path):
+            # Same bytes already cached under another URL
+            os.unlink(tmp_path)
+            os.utime(path)
+            with self._lock:
+                self._stats['deduplicated'] += 1
+        else:
+            os.replace(tmp_path, path)
+            with self._lock:
+                self._disk_bytes += size
+
+        self._write_ref(blob_url, {'sha256': sha256, 'size': size, 'content_type': content_type, 'blob_url': blob_url})
+        logger.info(f"📦 Cached blob {blob_url[:60]} ({size} bytes, {sha256[:12]})")
+
+        if self._disk_bytes > self.max_bytes:
+            self._evict()
+        return CachedBlob(path, size, sha256, content_type)
+
+    def _write_ref(self, blob_url: str, ref: Dict):
+        path = self._ref_path(blob_url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self._tmp)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(ref, f)
+        os.replace(tmp_path, path)
+
+    def _scan(self):
+        objects = []
+        with os.scandir(self._objects) as prefixes:
+            for prefix in prefixes:
+                if not prefix.is_dir():
+                    continue
+                with os.scandir(prefix.path) as entries:
+                    for entry in entries:
+                        try:
+                            st = entry.stat()
+                        except FileNotFoundError:
+                            continue
+                        objects.append((st.st_mtime, st.st_size, entry.path))
+        return objects
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._scan())
+
+    def _evict(self):
+        """Delete least recently used objects until under the target size."""
+        if not self._evict_lock.acquire(blocking=False):
+            return
+        try:
+            objects = sorted(self._scan())
+            total = sum(size for _, size, _ in objects)
+            target = self.max_bytes * _EVICT_TARGET
+            evicted = evicted_bytes = 0
+            for _, size, path in objects:
+                if total <= target:
+                    break
+                try:
+                    # Open file handles (responses in progress) keep their data
+                    os.unlink(path)
+                except OSError as e:
+                    if e.errno != errno.ENOENT:
+                        logger.warning(f"⚠️ Could not evict blob {path}: {e}")
+                        continue
+                total -= size
+                evicted += 1
+                evicted_bytes += size
+            with self._lock:
+                self._disk_bytes = total
+                self._stats['evictions'] += evicted
+                self._stats['bytes_evicted'] += evicted_bytes
+            if evicted:
+                logger.info(f"🧹 Evicted {evicted} blobs ({evicted_bytes / 1024 ** 2:.1f} MB) from blob cache")
+        finally:
+            self._evict_lock.release()
+
+    def record_served(self, nbytes: Optional[int]):
+        """Count bytes actually sent to a client (partial for Range requests)."""
+        if nbytes:
+            with self._lock:
+                self._stats['bytes_served'] += nbytes
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            lookups = stats['hits'] + stats['misses'] + stats['shared']
+            stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else None
+            stats['disk_bytes'] = self._disk_bytes
+            stats['max_bytes'] = self.max_bytes
+            stats['in_flight'] = len(self._inflight)
+        return stats
+
+
+def fetch_with_cli(blob_url: str, dest_path: str) -> Optional[str]:
+    """Download through the Shelby CLI (uses the configured account)."""
+    try:
+        result = subprocess.run(
+            ['shelby', 'download', blob_url, dest_path],
+            capture_output=True,
+            text=True,
+            timeout=BLOB_FETCH_TIMEOUT
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        raise BlobFetchError(f"shelby download failed: {e}") from e
+    if result.returncode != 0:
+        raise BlobFetchError(f"shelby download failed: {(result.stderr or result.stdout).strip()[:300]}")
+    return None
+
+
+def fetch_over_http(blob_url: str, dest_path: str) -> Optional[str]:
+    """Download from the Shelby blob API over the shared keep-alive session."""
+    url = blob_url if blob_url.startswith(('http://', 'https://')) else f"{SHELBY_BLOB_API_URL}/{blob_url}"
+    response = request_with_retry('GET', url, session=get_session('shelby'), timeout=BLOB_FETCH_TIMEOUT,
+                                  deadline=time.monotonic() + BLOB_FETCH_TIMEOUT, stream=True)
+    try:
+        if response.status_code != 200:
+            raise BlobFetchError(f"Shelby returned {response.status_code} for {blob_url[:60]}")
+        with open(dest_path, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=_CHUNK_SIZE):
+                f.write(chunk)
+        return response.headers.get('Content-Type')
+    finally:
+        response.close()
+
+
+blob_cache = BlobCache()
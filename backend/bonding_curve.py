@@ -4,7 +4,9 @@ Similar to pump.fun mechanism - realistic pricing for creator tokens
 """
 
 import json
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, List, Optional
+
+import numpy as np
 
 class BondingCurve:
     """
@@ -18,6 +20,9 @@ class BondingCurve:
     - Constant product: k = x * y (price increases as tokens are bought)
     - Price impact: Larger trades have more impact on price
     """
+
+    __slots__ = ('initial_price', 'initial_supply', 'curve_steepness',
+                 'virtual_token_reserve', 'virtual_algo_reserve', 'k')
     
     def __init__(self, initial_price: float = 0.00001, initial_supply: int = 1000000, 
                  virtual_algo: float = None, curve_steepness: float = 0.5):
@@ -165,6 +170,153 @@ class BondingCurve:
             'new_algo_reserve': current_algo_reserve - algo_received
         }
     
+    def calculate_tokens_for_budget(self, current_supply: float, current_algo_reserve: float, algo_budget: float) -> Dict[str, float]:
+        """
+        Calculate how many tokens a buy of exactly algo_budget APTOS gets
+        
+        Exact inverse of calculate_buy_price. With T = available token reserve
+        and A = total APTOS reserve, paying B moves the APTOS reserve to A + B,
+        so the token reserve becomes k / (A + B):
+        
+            tokens = T - k / (A + B)
+        
+        Args:
+            current_supply: Tokens currently in circulation
+            current_algo_reserve: APTOS currently in the reserve
+            algo_budget: APTOS to spend
+        
+        Returns:
+            dict with 'token_amount', 'algo_cost', 'new_price', 'new_supply', 'new_algo_reserve'
+        """
+        if algo_budget <= 0:
+            raise ValueError("APTOS amount must be positive")
+        if self.k <= 0:
+            # A zero-price curve gives every token away; there is no price to size a budget against
+            raise ValueError("Bonding curve has no price to size a budget against")
+        
+        current_token_reserve = self.virtual_token_reserve - current_supply
+        current_algo_reserve_total = self.virtual_algo_reserve + current_algo_reserve
+        
+        if current_token_reserve <= 0:
+            raise ValueError("No tokens available in bonding curve")
+        
+        new_algo_reserve_total = current_algo_reserve_total + algo_budget
+        new_token_reserve = self.k / new_algo_reserve_total
+        token_amount = current_token_reserve - new_token_reserve
+        
+        if token_amount <= 0:
+            raise ValueError(f"{algo_budget} APTOS is not enough to buy any tokens at the current price")
+        
+        return {
+            'token_amount': token_amount,
+            'algo_cost': algo_budget,
+            'new_price': new_algo_reserve_total / new_token_reserve,
+            'new_supply': current_supply + token_amount,
+            'new_algo_reserve': current_algo_reserve + algo_budget
+        }
+    
+    def calculate_tokens_for_proceeds(self, current_supply: float, current_algo_reserve: float, algo_target: float) -> Dict[str, float]:
+        """
+        Calculate how many tokens must be sold to receive exactly algo_target APTOS
+        
+        Exact inverse of calculate_sell_price. Receiving P moves the total
+        APTOS reserve from A to A - P, so the token reserve becomes k / (A - P):
+        
+            tokens = k / (A - P) - T
+        
+        Args:
+            current_supply: Tokens currently in circulation
+            current_algo_reserve: APTOS currently in the reserve
+            algo_target: APTOS to receive
+        
+        Returns:
+            dict with 'token_amount', 'algo_received', 'new_price', 'new_supply', 'new_algo_reserve'
+        """
+        if algo_target <= 0:
+            raise ValueError("APTOS amount must be positive")
+        if self.k <= 0:
+            raise ValueError("Bonding curve has no price to size a budget against")
+        
+        current_token_reserve = self.virtual_token_reserve - current_supply
+        current_algo_reserve_total = self.virtual_algo_reserve + current_algo_reserve
+        
+        new_algo_reserve_total = current_algo_reserve_total - algo_target
+        if new_algo_reserve_total <= 0:
+            raise ValueError(f"Cannot receive {algo_target} APTOS. Selling all {current_supply} tokens returns less.")
+        
+        new_token_reserve = self.k / new_algo_reserve_total
+        token_amount = new_token_reserve - current_token_reserve
+        
+        if token_amount <= 0:
+            raise ValueError(f"Cannot receive {algo_target} APTOS by selling at the current price")
+        if token_amount > current_supply:
+            raise ValueError(f"Receiving {algo_target} APTOS needs {token_amount} tokens. Only {current_supply} in circulation.")
+        
+        return {
+            'token_amount': token_amount,
+            'algo_received': algo_target,
+            'new_price': new_algo_reserve_total / new_token_reserve,
+            'new_supply': current_supply - token_amount,
+            'new_algo_reserve': current_algo_reserve - algo_target
+        }
+    
+    def quote_ladder(self, current_supply: float, current_algo_reserve: float,
+                     token_amounts: Iterable[float], side: str = 'buy') -> Dict[str, Any]:
+        """
+        Quote many trade sizes against the same curve state in one pass
+        
+        Same math as calculate_buy_price / calculate_sell_price, vectorized
+        with NumPy. Sizes the curve cannot fill (more
+        tokens than are available / in circulation, or non-positive amounts)
+        come back as None instead of raising, so one bad rung does not sink
+        the whole ladder.
+        
+        Args:
+            current_supply: Tokens currently in circulation
+            current_algo_reserve: APTOS currently in the reserve
+            token_amounts: Trade sizes to quote
+            side: 'buy' or 'sell'
+        
+        Returns:
+            dict with 'spot_price' and parallel lists 'token_amount',
+            'algo_cost' (buy) or 'algo_received' (sell), 'new_price' and
+            'price_impact' (percent)
+        """
+        if side not in ('buy', 'sell'):
+            raise ValueError(f"Unknown side {side!r}, expected 'buy' or 'sell'")
+        
+        current_token_reserve = self.virtual_token_reserve - current_supply
+        current_algo_reserve_total = self.virtual_algo_reserve + current_algo_reserve
+        spot_price = self.get_current_price(current_supply, current_algo_reserve)
+        algo_key = 'algo_cost' if side == 'buy' else 'algo_received'
+        
+        amounts = np.asarray(list(token_amounts), dtype=np.float64)
+        if side == 'buy':
+            new_token_reserve = current_token_reserve - amounts
+            valid = (amounts > 0) & (new_token_reserve > 0) & (current_token_reserve > 0)
+        else:
+            new_token_reserve = current_token_reserve + amounts
+            valid = (amounts > 0) & (amounts <= current_supply) & (new_token_reserve > 0)
+        # Keep invalid rungs away from the division; they are masked out below
+        new_token_reserve = np.where(valid, new_token_reserve, 1.0)
+        new_algo_reserve_total = self.k / new_token_reserve
+        if side == 'buy':
+            algo = new_algo_reserve_total - current_algo_reserve_total
+        else:
+            algo = current_algo_reserve_total - new_algo_reserve_total
+        new_price = new_algo_reserve_total / new_token_reserve
+        if spot_price > 0:
+            impact = np.abs(new_price - spot_price) / spot_price * 100
+        else:
+            impact = np.zeros_like(new_price)
+        return {
+            'spot_price': spot_price,
+            'token_amount': amounts.tolist(),
+            algo_key: _masked(algo, valid),
+            'new_price': _masked(new_price, valid),
+            'price_impact': _masked(impact, valid),
+        }
+    
     def get_current_price(self, current_supply: float, current_algo_reserve: float) -> float:
         """Get current price from state"""
         current_token_reserve = self.virtual_token_reserve - current_supply
@@ -172,8 +324,15 @@ class BondingCurve:
         return current_algo_reserve_total / current_token_reserve if current_token_reserve > 0 else self.initial_price
 
 
+def _masked(values, valid) -> List[Optional[float]]:
+    """NumPy array -> JSON-friendly list with None where valid is False."""
+    return [v if ok else None for v, ok in zip(values.tolist(), valid.tolist())]
+
+
 class BondingCurveState:
     """Current state of bonding curve"""
+
+    __slots__ = ('token_supply', 'algo_reserve')
     
     def __init__(self, token_supply: float = 0, algo_reserve: float = 0):
         self.token_supply = token_supply
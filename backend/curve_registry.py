@@ -0,0 +1,297 @@
+"""
+Resident bonding curve registry.
+
+Keeps every token's curve parameters and state in memory as compact
+__slots__ objects keyed by token_id, loaded from the typed curve_* columns on
+the tokens table. Pricing an estimate is a dict lookup plus arithmetic - no
+JSON parsing and no full-row read.
+
+The registry is only a read cache: the tokens row is the source of truth.
+Each gunicorn worker holds its own registry, and entries are re-read from the
+typed columns after CURVE_REGISTRY_TTL seconds so trades recorded by other
+workers show up quickly. A trade runs in trade(), which takes the database
+write lock (shared by every worker), re-reads the token's curve inside the
+transaction, and writes the new state in the same transaction as the trade
+row; the entry is then refreshed from the committed row.
+"""
+
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+from bonding_curve import BondingCurve, BondingCurveState
+from db import get_db
+
+logger = logging.getLogger(__name__)
+
+CURVE_REGISTRY_TTL = float(os.getenv('CURVE_REGISTRY_TTL', '2'))
+
+# Typed columns on tokens backing BondingCurve / BondingCurveState
+CURVE_COLUMNS = (
+    'curve_initial_price',
+    'curve_initial_supply',
+    'curve_steepness',
+    'curve_virtual_token_reserve',
+    'curve_virtual_algo_reserve',
+    'curve_k',
+    'curve_token_supply',
+    'curve_algo_reserve',
+)
+
+_SELECT_ENTRY = (
+    'SELECT id, token_id, asa_id, metadata_address, creator, content_id, total_supply, current_price, '
+    + ', '.join(CURVE_COLUMNS) + ' FROM tokens'
+)
+
+
+def curve_column_values(curve: BondingCurve, state: BondingCurveState) -> Tuple:
+    """Values for CURVE_COLUMNS, in order."""
+    return (
+        curve.initial_price,
+        int(curve.initial_supply),
+        curve.curve_steepness,
+        curve.virtual_token_reserve,
+        curve.virtual_algo_reserve,
+        curve.k,
+        state.token_supply,
+        state.algo_reserve,
+    )
+
+
+class CurveEntry:
+    """One token's curve, state and the identifiers it can be looked up by."""
+
+    __slots__ = (
+        'row_id', 'token_id', 'asa_id', 'metadata_address', 'creator', 'content_id',
+        'total_supply', 'current_price', 'curve', 'state', 'loaded_at',
+    )
+
+    def __init__(self, row):
+        self.refresh(row)
+
+    def refresh(self, row):
+        """(Re)load every field from a _SELECT_ENTRY row."""
+        self.row_id = row[0]
+        self.token_id = row[1]
+        self.asa_id = row[2]
+        self.metadata_address = row[3]
+        self.creator = row[4]
+        self.content_id = row[5]
+        self.total_supply = row[6]
+        self.current_price = row[7] or 0.0
+        self.loaded_at = time.monotonic()
+        self._load_curve(row[8:])
+
+    def _load_curve(self, values):
+        (initial_price, initial_supply, steepness, virtual_tokens,
+         virtual_algo, k, token_supply, algo_reserve) = values
+        if k is None:
+            self.curve = None
+            self.state = None
+            return
+        curve = BondingCurve.__new__(BondingCurve)
+        curve.initial_price = initial_price
+        curve.initial_supply = initial_supply
+        curve.curve_steepness = steepness
+        curve.virtual_token_reserve = virtual_tokens
+        curve.virtual_algo_reserve = virtual_algo
+        curve.k = k
+        self.curve = curve
+        self.state = BondingCurveState(token_supply=token_supply or 0, algo_reserve=algo_reserve or 0)
+
+    @property
+    def key(self) -> str:
+        return self.token_id or f'#{self.row_id}'
+
+    @property
+    def trade_asa_id(self) -> str:
+        """Value recorded in trades.asa_id: the legacy asa_id, else the token_id."""
+        return str(self.asa_id) if self.asa_id not in (None, '') else self.key
+
+    def pricing_curve(self) -> Tuple[BondingCurve, BondingCurveState]:
+        """The token's curve and state, or the default curve a token without one starts on.
+
+        The default is not stored; the first trade on the token writes it.
+        """
+        if self.curve is not None:
+            return self.curve, self.state
+        curve = BondingCurve(
+            initial_price=0.0,
+            initial_supply=int(self.total_supply) if self.total_supply else 1000000
+        )
+        return curve, BondingCurveState(token_supply=0, algo_reserve=0)
+
+
+class CurveRegistry:
+    """Process-wide read cache of token identifier -> CurveEntry."""
+
+    def __init__(self, ttl: float = CURVE_REGISTRY_TTL):
+        self.ttl = ttl
+        self._entries: Dict[str, CurveEntry] = {}
+        self._aliases: Dict[str, str] = {}
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._stats = {'hits': 0, 'misses': 0, 'reloads': 0, 'trades': 0}
+
+    # -- lookup -----------------------------------------------------------
+
+    def _index(self, entry: CurveEntry):
+        key = entry.key
+        self._entries[key] = entry
+        for alias in (entry.metadata_address, entry.asa_id, entry.content_id):
+            if alias not in (None, ''):
+                self._aliases.setdefault(str(alias), key)
+
+    def load_all(self):
+        """Load every token's curve in one pass (called lazily on first use)."""
+        conn = get_db()
+        try:
+            rows = conn.execute(_SELECT_ENTRY).fetchall()
+        finally:
+            conn.close()
+        with self._lock:
+            for row in rows:
+                entry = CurveEntry(row)
+                existing = self._entries.get(entry.key)
+                if existing is None:
+                    self._index(entry)
+                else:
+                    existing.refresh(row)
+                    self._index(existing)
+            self._loaded = True
+        logger.info(f"✅ Curve registry loaded {len(rows)} tokens")
+
+    def _fetch(self, identifier: str):
+        conn = get_db()
+        try:
+            for column in ('token_id', 'metadata_address', 'asa_id'):
+                row = conn.execute(f'{_SELECT_ENTRY} WHERE {column} = ? LIMIT 1', (identifier,)).fetchone()
+                if row:
+                    return row
+            return None
+        finally:
+            conn.close()
+
+    def _refresh_from(self, conn, entry: CurveEntry) -> Optional[CurveEntry]:
+        """Re-read `entry` on `conn`, in place so callers holding it see the same object."""
+        row = conn.execute(f'{_SELECT_ENTRY} WHERE id = ?', (entry.row_id,)).fetchone()
+        with self._lock:
+            self._stats['reloads'] += 1
+            if row is None:
+                self._entries.pop(entry.key, None)
+                return None
+            entry.refresh(row)
+            self._index(entry)
+            return entry
+
+    def _reload(self, entry: CurveEntry) -> Optional[CurveEntry]:
+        conn = get_db()
+        try:
+            return self._refresh_from(conn, entry)
+        finally:
+            conn.close()
+
+    def get(self, identifier) -> Optional[CurveEntry]:
+        """Entry for a token_id, metadata_address or legacy asa_id."""
+        if identifier in (None, ''):
+            return None
+        identifier = str(identifier)
+        if not self._loaded:
+            self.load_all()
+
+        with self._lock:
+            entry = self._entries.get(identifier)
+            if entry is None:
+                key = self._aliases.get(identifier)
+                entry = self._entries.get(key) if key else None
+
+        if entry is None:
+            self._stats['misses'] += 1
+            row = self._fetch(identifier)
+            if row is None:
+                return None
+            entry = CurveEntry(row)
+            with self._lock:
+                existing = self._entries.get(entry.key)
+                if existing is not None:
+                    # Known under its primary key; remember this identifier too
+                    self._aliases[identifier] = existing.key
+                    return existing
+                self._index(entry)
+            return entry
+
+        self._stats['hits'] += 1
+        if time.monotonic() - entry.loaded_at > self.ttl:
+            return self._reload(entry)
+        return entry
+
+    def invalidate(self, identifier):
+        """Drop an entry so the next get() re-reads it."""
+        with self._lock:
+            key = str(identifier)
+            key = key if key in self._entries else self._aliases.get(key)
+            if key:
+                self._entries.pop(key, None)
+
+    # -- trades -----------------------------------------------------------
+
+    @contextmanager
+    def trade(self, entry: CurveEntry) -> Iterator:
+        """Transaction for one trade on `entry`'s token.
+
+        Takes the database write lock (BEGIN IMMEDIATE), which serialises
+        trades across every worker, and re-reads the entry inside it: the
+        caller prices against the committed state, inserts the trade and
+        calls apply_state() / apply_curve() on the yielded connection.
+        Commits on success; either way the entry is then refreshed from the
+        committed row.
+        """
+        conn = get_db()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                if self._refresh_from(conn, entry) is None:
+                    raise LookupError(f"Token {entry.key} no longer exists")
+                yield conn
+                conn.commit()
+                with self._lock:
+                    self._stats['trades'] += 1
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                self._refresh_from(conn, entry)
+        finally:
+            conn.close()
+
+    def apply_curve(self, conn, entry: CurveEntry, curve: BondingCurve, state: BondingCurveState):
+        """Store a curve for a token that had none, inside trade()."""
+        assignments = ', '.join(f'{column} = ?' for column in CURVE_COLUMNS)
+        conn.execute(f'UPDATE tokens SET {assignments} WHERE id = ?',
+                     curve_column_values(curve, state) + (entry.row_id,))
+
+    def apply_state(self, conn, entry: CurveEntry, token_supply: float, algo_reserve: float,
+                    current_price: float, market_cap: Optional[float] = None):
+        """Write a trade's resulting state inside trade().
+
+        The state was computed from the row re-read under the write lock, so
+        no other trade can have moved it in between.
+        """
+        conn.execute('''
+            UPDATE tokens
+            SET curve_token_supply = ?, curve_algo_reserve = ?, current_price = ?, market_cap = ?
+            WHERE id = ?
+        ''', (token_supply, algo_reserve, current_price,
+              market_cap if market_cap is not None else token_supply * current_price, entry.row_id))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        return stats
+
+
+curve_registry = CurveRegistry()
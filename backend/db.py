@@ -0,0 +1,295 @@
+"""
+SQLite connection pool for the CreatorVault backend.
+
+Every request used to open (and close) its own sqlite3 connection, paying the
+connect + PRAGMA setup cost each time and throwing away sqlite's prepared
+statement cache. This module keeps a small bounded pool of long-lived
+connections per worker process, configured once for WAL mode, and hands them
+out through a thin proxy whose close() returns the connection to the pool.
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = os.getenv('DATABASE_PATH', 'creatorvault.db')
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '8'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))
+DB_BUSY_TIMEOUT_MS = int(os.getenv('DB_BUSY_TIMEOUT_MS', '5000'))
+DB_CACHE_SIZE_KB = int(os.getenv('DB_CACHE_SIZE_KB', '20000'))
+DB_MMAP_SIZE = int(os.getenv('DB_MMAP_SIZE', str(256 * 1024 * 1024)))
+DB_CACHED_STATEMENTS = int(os.getenv('DB_CACHED_STATEMENTS', '256'))
+
+
+class PooledConnection:
+    """Proxy around a pooled sqlite3.Connection.
+
+    Behaves like the underlying connection, except that close() hands the
+    connection back to the pool (rolling back anything left uncommitted, which
+    is what a real close would have done) instead of closing it.
+    """
+
+    __slots__ = ('_pool', '_conn', '_checked_out_at')
+
+    def __init__(self, pool: 'ConnectionPool', conn: sqlite3.Connection):
+        self._pool = pool
+        self._conn = conn
+        self._checked_out_at = time.perf_counter()
+
+    def __getattr__(self, name):
+        conn = self._conn
+        if conn is None:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+        return getattr(conn, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Same semantics as sqlite3.Connection: commit or roll back, but keep
+        # the connection checked out until close() is called.
+        if self._conn is None:
+            return False
+        if exc_type is None:
+            self._conn.commit()
+        else:
+            self._conn.rollback()
+        return False
+
+    @property
+    def closed(self) -> bool:
+        return self._conn is None
+
+    def close(self):
+        """Return the connection to the pool. Safe to call more than once."""
+        conn = self._conn
+        if conn is None:
+            return
+        self._conn = None
+        self._pool._release(self, conn)
+
+
+class ConnectionPool:
+    """Bounded pool of WAL-mode sqlite3 connections for one process."""
+
+    def __init__(self, path: str = DB_PATH, size: int = DB_POOL_SIZE,
+                 timeout: float = DB_POOL_TIMEOUT):
+        self.path = path
+        self.size = max(1, size)
+        self.timeout = timeout
+        self._pid = os.getpid()
+        self._idle: 'queue.LifoQueue[sqlite3.Connection]' = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._local = threading.local()
+        self._stats = {
+            'checkouts': 0,
+            'connections_opened': 0,
+            'reuses': 0,
+            'waits': 0,
+            'wait_time_total_ms': 0.0,
+            'wait_time_max_ms': 0.0,
+            'hold_time_total_ms': 0.0,
+            'hold_time_max_ms': 0.0,
+            'timeouts': 0,
+            'leaked_releases': 0,
+        }
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=DB_BUSY_TIMEOUT_MS / 1000.0,
+            check_same_thread=False,
+            cached_statements=DB_CACHED_STATEMENTS,
+        )
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA cache_size=-{DB_CACHE_SIZE_KB}')
+        conn.execute(f'PRAGMA mmap_size={DB_MMAP_SIZE}')
+        conn.execute(f'PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        return conn
+
+    def _reset_after_fork(self):
+        # Connections must never cross a fork (gunicorn --preload); start over.
+        self._pid = os.getpid()
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._local = threading.local()
+
+    def acquire(self) -> PooledConnection:
+        if os.getpid() != self._pid:
+            with self._lock:
+                if os.getpid() != self._pid:
+                    self._reset_after_fork()
+
+        started = time.perf_counter()
+        conn = None
+        try:
+            conn = self._idle.get_nowait()
+            reused = True
+        except queue.Empty:
+            reused = False
+            with self._lock:
+                can_create = self._created < self.size
+                if can_create:
+                    self._created += 1
+            if can_create:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                with self._lock:
+                    self._stats['waits'] += 1
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                    reused = True
+                except queue.Empty:
+                    with self._lock:
+                        self._stats['timeouts'] += 1
+                    raise sqlite3.OperationalError(
+                        f"connection pool exhausted ({self.size} connections busy for {self.timeout}s)"
+                    )
+
+        waited_ms = (time.perf_counter() - started) * 1000
+        proxy = PooledConnection(self, conn)
+        with self._lock:
+            self._stats['checkouts'] += 1
+            if reused:
+                self._stats['reuses'] += 1
+            else:
+                self._stats['connections_opened'] += 1
+            self._stats['wait_time_total_ms'] += waited_ms
+            self._stats['wait_time_max_ms'] = max(self._stats['wait_time_max_ms'], waited_ms)
+
+        outstanding = getattr(self._local, 'outstanding', None)
+        if outstanding is None:
+            outstanding = self._local.outstanding = []
+        outstanding.append(proxy)
+        return proxy
+
+    def _release(self, proxy: PooledConnection, conn: sqlite3.Connection):
+        held_ms = (time.perf_counter() - proxy._checked_out_at) * 1000
+        outstanding = getattr(self._local, 'outstanding', None)
+        if outstanding and proxy in outstanding:
+            outstanding.remove(proxy)
+
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Dropping broken pooled connection: {e}")
+            try:
+                conn.close()
+            finally:
+                with self._lock:
+                    self._created -= 1
+            return
+
+        with self._lock:
+            self._stats['hold_time_total_ms'] += held_ms
+            self._stats['hold_time_max_ms'] = max(self._stats['hold_time_max_ms'], held_ms)
+        if os.getpid() == self._pid:
+            self._idle.put(conn)
+
+    def release_thread_connections(self):
+        """Return any connections the current thread forgot to close."""
+        outstanding = getattr(self._local, 'outstanding', None)
+        if not outstanding:
+            return
+        for proxy in list(outstanding):
+            if proxy.closed:
+                outstanding.remove(proxy)
+                continue
+            with self._lock:
+                self._stats['leaked_releases'] += 1
+            proxy.close()
+
+    def close_all(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+            with self._lock:
+                self._created -= 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pool_size'] = self.size
+            stats['open_connections'] = self._created
+            stats['idle_connections'] = self._idle.qsize()
+        stats['in_use'] = stats['open_connections'] - stats['idle_connections']
+        checkouts = stats['checkouts'] or 1
+        stats['wait_time_avg_ms'] = round(stats['wait_time_total_ms'] / checkouts, 3)
+        stats['hold_time_avg_ms'] = round(stats['hold_time_total_ms'] / checkouts, 3)
+        for key in ('wait_time_total_ms', 'wait_time_max_ms', 'hold_time_total_ms', 'hold_time_max_ms'):
+            stats[key] = round(stats[key], 3)
+        stats['database'] = self.path
+        return stats
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+
+def configure_pool(path: Optional[str] = None, size: Optional[int] = None) -> ConnectionPool:
+    """Replace the process-wide pool (used by scripts pointing at another database)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close_all()
+        _pool = ConnectionPool(path or DB_PATH, size or DB_POOL_SIZE)
+    return _pool
+
+
+def get_db() -> PooledConnection:
+    """Check a connection out of the pool. Call close() to give it back."""
+    return get_pool().acquire()
+
+
+@contextmanager
+def transaction():
+    """Check out a connection, commit on success, roll back on error, release."""
+    conn = get_db()
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def release_thread_connections():
+    if _pool is not None:
+        _pool.release_thread_connections()
+
+
+def pool_stats() -> Dict:
+    return get_pool().stats()
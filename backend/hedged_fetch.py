@@ -0,0 +1,252 @@
+"""
+Hedged, first-complete execution of alternative fetch strategies.
+
+The scrapers know several ways to get the same post (an API, oEmbed, embed
+pages, mirrors, the page itself) and used to try them one after another,
+each with its own 10-15 s timeout. HedgedFetcher starts the most promising
+strategy immediately and the next one every HEDGE_STAGGER seconds - or at
+once when one fails - merges partial results as they arrive and returns as
+soon as the merged result is complete. Strategies still queued are
+cancelled; ones already running finish in the background (bounded by the
+deadline their requests were given) and their outcome still feeds the stats.
+
+Per (group, strategy) it keeps an exponentially weighted success rate and
+latency, and orders the next run by expected time to a useful answer
+(latency / success rate), so a mirror that keeps failing drifts to the back
+and a fast, reliable source is tried first. Strategies that have never run
+keep their given priority, behind the ones with a track record. Latency is
+timed from when a pool thread starts the strategy, so time spent queued
+behind other scrapes isn't charged to the source.
+
+One pool serves every concurrent scrape (a bulk scrape runs
+SCRAPE_BULK_WORKERS at once), so each run keeps at most HEDGE_MAX_IN_FLIGHT
+strategies in flight and the pool is sized for a full bulk batch of them.
+"""
+
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+HEDGE_STAGGER = float(os.getenv('SCRAPE_HEDGE_STAGGER', '0.25'))
+HEDGE_MAX_IN_FLIGHT = int(os.getenv('SCRAPE_HEDGE_MAX_IN_FLIGHT', '3'))
+# 12 bulk scrapes (SCRAPE_BULK_WORKERS) x HEDGE_MAX_IN_FLIGHT, plus interactive scrapes
+HEDGE_WORKERS = int(os.getenv('SCRAPE_HEDGE_WORKERS', '64'))
+SCRAPE_DEADLINE = float(os.getenv('SCRAPE_DEADLINE', '20'))
+
+# Weight of the newest sample in the success/latency averages
+_EWMA_ALPHA = 0.2
+# Floor on the success rate when ranking, so a flaky source isn't ranked infinitely late
+_MIN_SUCCESS = 0.05
+
+# fn(deadline) -> partial result dict, or None if this source had nothing useful
+StrategyFn = Callable[[float], Optional[Dict[str, Any]]]
+
+
+class _StrategyStats:
+    __slots__ = ('attempts', 'successes', 'failures', 'errors', 'wins', 'success_rate', 'latency')
+
+    def __init__(self):
+        self.attempts = 0
+        self.successes = 0
+        self.failures = 0
+        self.errors = 0
+        self.wins = 0
+        self.success_rate: Optional[float] = None
+        self.latency: Optional[float] = None
+
+    def record(self, success: bool, latency: float):
+        self.attempts += 1
+        if success:
+            self.successes += 1
+        else:
+            self.failures += 1
+        value = 1.0 if success else 0.0
+        if self.success_rate is None:
+            self.success_rate, self.latency = value, latency
+        else:
+            self.success_rate += _EWMA_ALPHA * (value - self.success_rate)
+            self.latency += _EWMA_ALPHA * (latency - self.latency)
+
+    def expected_cost(self) -> Optional[float]:
+        """Expected seconds to a useful answer; None until the strategy has run."""
+        if self.success_rate is None:
+            return None
+        # A fast failure still costs a launch slot, so latency is floored at the stagger
+        return max(self.latency, HEDGE_STAGGER) / max(self.success_rate, _MIN_SUCCESS)
+
+
+class _Attempt:
+    __slots__ = ('started',)
+
+    def __init__(self):
+        # Set by the pool thread when the strategy starts running
+        self.started: Optional[float] = None
+
+
+class HedgedFetcher:
+    """Runs alternative strategies concurrently and keeps per-strategy stats."""
+
+    def __init__(self, max_workers: int = HEDGE_WORKERS, stagger: float = HEDGE_STAGGER,
+                 max_in_flight: int = HEDGE_MAX_IN_FLIGHT):
+        self.max_workers = max_workers
+        self.stagger = stagger
+        self.max_in_flight = max(1, max_in_flight)
+        self._stats: Dict[Tuple[str, str], _StrategyStats] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_pid: Optional[int] = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Threads don't survive a fork; build the pool in the process that uses it
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='hedged-fetch')
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def _strategy_stats(self, group: str, name: str) -> _StrategyStats:
+        stats = self._stats.get((group, name))
+        if stats is None:
+            stats = self._stats[(group, name)] = _StrategyStats()
+        return stats
+
+    def order(self, group: str, names: Sequence[str]) -> List[str]:
+        """Names sorted by learned expected cost, untried ones after in the given order.
+
+        Untried strategies still get sampled whenever the ones ahead of them
+        are slow or fail, since every strategy is launched within a few staggers.
+        """
+        with self._lock:
+            costs = {name: self._strategy_stats(group, name).expected_cost() for name in names}
+        tried = sorted((name for name in names if costs[name] is not None), key=lambda name: costs[name])
+        return tried + [name for name in names if costs[name] is None]
+
+    def run(self, group: str, strategies: Sequence[Tuple[str, StrategyFn]],
+            merge: Callable[[Dict[str, Dict[str, Any]]], Dict[str, Any]],
+            is_complete: Callable[[Dict[str, Any]], bool],
+            deadline: Optional[float] = None, stagger: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Merged result of the strategies that answered before it was complete.
+
+        `strategies` are (name, fn) in priority order; `merge` receives the
+        partial results so far keyed by name (in that same order) and must
+        prefer earlier strategies. At most max_in_flight strategies run at
+        once; the next one launches when one finishes. Returns the best merge
+        available when the result is complete, every strategy has finished,
+        or `deadline` (time.monotonic()) passes - or None if no strategy
+        answered at all, so callers don't mistake merge defaults for data.
+        """
+        if deadline is None:
+            deadline = time.monotonic() + SCRAPE_DEADLINE
+        stagger = self.stagger if stagger is None else stagger
+        functions = dict(strategies)
+        priority = [name for name, _ in strategies]
+        launch_order = self.order(group, priority)
+        executor = self._get_executor()
+
+        results: Dict[str, Dict[str, Any]] = {}
+        futures = {}
+        next_index = 0
+        next_launch = time.monotonic()
+
+        def merged():
+            return merge({name: results[name] for name in priority if name in results})
+
+        def timed(fn: StrategyFn, attempt: _Attempt, deadline: float):
+            attempt.started = time.monotonic()
+            return fn(deadline)
+
+        def launch():
+            nonlocal next_index, next_launch
+            name = launch_order[next_index]
+            next_index += 1
+            attempt = _Attempt()
+            future = executor.submit(timed, functions[name], attempt, deadline)
+            future.add_done_callback(lambda f, name=name, attempt=attempt: self._record(group, name, f, attempt))
+            futures[future] = name
+            next_launch = time.monotonic() + stagger
+
+        try:
+            while True:
+                now = time.monotonic()
+                if now >= deadline:
+                    logger.warning(f"⏱️ {group}: no complete result before the deadline")
+                    break
+                pending = [f for f in futures if not f.done()]
+                can_launch = next_index < len(launch_order) and len(pending) < self.max_in_flight
+                if can_launch and now >= next_launch:
+                    launch()
+                    pending = [f for f in futures if not f.done()]
+                    can_launch = next_index < len(launch_order) and len(pending) < self.max_in_flight
+                if not pending and next_index >= len(launch_order):
+                    break
+                # At the in-flight cap the next launch waits for a completion
+                wake_at = min(deadline, next_launch) if can_launch else deadline
+                timeout = max(0.0, wake_at - time.monotonic())
+                if not pending:
+                    time.sleep(timeout)
+                    continue
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = futures.pop(future)
+                    result = None if future.cancelled() or future.exception() else future.result()
+                    if result:
+                        results[name] = result
+                        if is_complete(merged()):
+                            with self._lock:
+                                self._strategy_stats(group, name).wins += 1
+                            return merged()
+                    else:
+                        # A failed source shouldn't cost the next one its stagger
+                        next_launch = time.monotonic()
+            if not results:
+                logger.warning(f"❌ {group}: no strategy answered")
+                return None
+            return merged()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def _record(self, group: str, name: str, future, attempt: _Attempt):
+        if future.cancelled() or attempt.started is None:
+            return
+        error = future.exception()
+        success = error is None and bool(future.result())
+        with self._lock:
+            stats = self._strategy_stats(group, name)
+            stats.record(success, time.monotonic() - attempt.started)
+            if error is not None:
+                stats.errors += 1
+        if error is not None:
+            logger.warning(f"⚠️ {group} strategy {name} failed: {error}")
+
+    def stats(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        with self._lock:
+            grouped: Dict[str, Dict[str, Dict[str, Any]]] = {}
+            for (group, name), stats in self._stats.items():
+                grouped.setdefault(group, {})[name] = {
+                    'attempts': stats.attempts,
+                    'successes': stats.successes,
+                    'failures': stats.failures,
+                    'errors': stats.errors,
+                    'wins': stats.wins,
+                    'success_rate': None if stats.success_rate is None else round(stats.success_rate, 3),
+                    'latency_ms': None if stats.latency is None else round(stats.latency * 1000, 1),
+                }
+        return grouped
+
+
+def first_present(partials: Dict[str, Dict[str, Any]], field: str, default: Any = None) -> Any:
+    """First truthy value of `field` across partial results, in priority order."""
+    for partial in partials.values():
+        value = partial.get(field)
+        if value:
+            return value
+    return default
+
+
+hedged_fetcher = HedgedFetcher()
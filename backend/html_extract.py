@@ -0,0 +1,183 @@
+"""
+Lightweight extraction of meta tags and embedded JSON from scraped pages.
+
+The scrapers used to build a full BeautifulSoup tree of every fetched page
+(often several hundred KB of inline scripts) just to read a few og:* meta
+tags. PageMeta instead runs the standard library's HTML tokenizer over the
+document head only - where meta tags live - without building a tree, and
+pulls JSON-LD and `window._sharedData = {...}` style blobs out with targeted
+regexes and a JSON decoder. The rest of the document is tokenized only if a
+requested tag isn't in the head.
+
+The Instagram page and embed strategies read media counts from the shared
+data JSON before falling back to regexes over the raw page text.
+
+bench_html_extract.py compares both paths on fixture pages.
+"""
+
+import re
+import json
+import logging
+from html.parser import HTMLParser
+from typing import Any, Dict, Iterator, List, Optional, Pattern
+
+logger = logging.getLogger(__name__)
+
+_HEAD_END_RE = re.compile(r'</head\s*>|<body[\s>]', re.IGNORECASE)
+_LD_JSON_RE = re.compile(
+    r'<script[^>]*type\s*=\s*["\']application/ld\+json["\'][^>]*>(.*?)</script\s*>',
+    re.IGNORECASE | re.DOTALL,
+)
+# `window._sharedData = {...};`, `window.__additionalDataLoaded('...', {...});` and the like
+_SHARED_DATA_RE = re.compile(
+    r'window\.(_sharedData|__additionalData|__INITIAL_STATE__|__APOLLO_STATE__)\s*=\s*'
+    r'|window\.__additionalDataLoaded\(\s*["\'][^"\']*["\']\s*,\s*'
+)
+_JSON_DECODER = json.JSONDecoder()
+
+# schema.org interaction types -> engagement field
+_INTERACTION_FIELDS = {
+    'likeaction': 'likes',
+    'commentaction': 'comments',
+    'shareaction': 'shares',
+    'watchaction': 'views',
+}
+
+
+class _MetaCollector(HTMLParser):
+    """Collects <meta> attributes; keeps the first tag for each property/name."""
+
+    def __init__(self, properties: Dict[str, str], names: Dict[str, str]):
+        super().__init__(convert_charrefs=True)
+        self.properties = properties
+        self.names = names
+
+    def handle_starttag(self, tag, attrs):
+        if tag != 'meta':
+            return
+        attributes = dict(attrs)
+        content = attributes.get('content') or ''
+        prop = attributes.get('property')
+        if prop and prop not in self.properties:
+            self.properties[prop] = content
+        name = attributes.get('name')
+        if name and name not in self.names:
+            self.names[name] = content
+
+    handle_startendtag = handle_starttag
+
+
+class PageMeta:
+    """Meta tags and embedded JSON of one HTML document, parsed lazily."""
+
+    __slots__ = ('html', '_properties', '_names', '_scanned_all', '_json_ld', '_shared_data')
+
+    def __init__(self, html: str):
+        self.html = html
+        self._properties: Dict[str, str] = {}
+        self._names: Dict[str, str] = {}
+        self._json_ld: Optional[List[Any]] = None
+        self._shared_data: Optional[Dict[str, Any]] = None
+
+        head_end = _HEAD_END_RE.search(html)
+        self._scanned_all = head_end is None
+        self._scan(html if head_end is None else html[:head_end.start()])
+
+    def _scan(self, fragment: str):
+        collector = _MetaCollector(self._properties, self._names)
+        collector.feed(fragment)
+        collector.close()
+
+    def _scan_rest(self):
+        # A tag missing from the head: fall back to tokenizing the whole document
+        if not self._scanned_all:
+            self._scanned_all = True
+            self._scan(self.html)
+
+    def prop(self, prop: str, default: str = '') -> str:
+        """content of the first <meta property=prop> (like soup.find('meta', property=prop))."""
+        if prop not in self._properties:
+            self._scan_rest()
+        return self._properties.get(prop, default)
+
+    def name(self, name: str, default: str = '') -> str:
+        """content of the first <meta name=name>."""
+        if name not in self._names:
+            self._scan_rest()
+        return self._names.get(name, default)
+
+    def has(self, prop: str) -> bool:
+        if prop not in self._properties:
+            self._scan_rest()
+        return prop in self._properties
+
+    def find_name(self, pattern: Pattern) -> Optional[str]:
+        """content of the first <meta> whose name matches the regex, or None."""
+        self._scan_rest()
+        for name, content in self._names.items():
+            if pattern.search(name):
+                return content
+        return None
+
+    def json_ld(self) -> List[Any]:
+        """Parsed <script type="application/ld+json"> blocks (unparseable ones skipped)."""
+        if self._json_ld is None:
+            self._json_ld = []
+            for match in _LD_JSON_RE.finditer(self.html):
+                try:
+                    self._json_ld.append(json.loads(match.group(1).strip()))
+                except ValueError:
+                    continue
+        return self._json_ld
+
+    def shared_data(self) -> Dict[str, Any]:
+        """JSON objects assigned to window._sharedData-style globals, by global name."""
+        if self._shared_data is None:
+            self._shared_data = {}
+            for match in _SHARED_DATA_RE.finditer(self.html):
+                try:
+                    value, _ = _JSON_DECODER.raw_decode(self.html, match.end())
+                except ValueError:
+                    continue
+                self._shared_data.setdefault(match.group(1) or '__additionalDataLoaded', value)
+        return self._shared_data
+
+    def shared_nodes(self) -> Iterator[Dict[str, Any]]:
+        """Every dict nested anywhere in shared_data(), depth first."""
+        return _walk(list(self.shared_data().values()))
+
+    def interaction_counts(self) -> Dict[str, int]:
+        """likes/comments/shares/views from schema.org interactionStatistic in JSON-LD."""
+        counts: Dict[str, int] = {}
+        for node in _walk(self.json_ld()):
+            stats = node.get('interactionStatistic')
+            if isinstance(stats, dict):
+                stats = [stats]
+            if not isinstance(stats, list):
+                continue
+            for stat in stats:
+                if not isinstance(stat, dict):
+                    continue
+                kind = stat.get('interactionType')
+                if isinstance(kind, dict):
+                    kind = kind.get('@type', '')
+                field = _INTERACTION_FIELDS.get(str(kind).rsplit('/', 1)[-1].lower())
+                try:
+                    count = int(stat.get('userInteractionCount'))
+                except (TypeError, ValueError):
+                    continue
+                if field and field not in counts:
+                    counts[field] = count
+        return counts
+
+
+def _walk(value: Any):
+    """Every dict nested anywhere in a JSON value."""
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, dict):
+            yield item
+            stack.extend(item.values())
+        elif isinstance(item, list):
+            stack.extend(reversed(item))
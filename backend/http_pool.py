@@ -0,0 +1,321 @@
+"""
+Shared outbound HTTP plumbing.
+
+Calling requests.post() directly opens a new connection (and TLS handshake)
+for every call. This module keeps one keep-alive requests.Session per
+upstream, a per-host token bucket so one worker's bursts stay inside the
+provider's rate budget, and a retry helper with jittered exponential
+backoff that honours Retry-After.
+
+Callers talking to many flaky hosts (the scrapers' mirrors and APIs) can
+also opt into a per-host circuit breaker: after HTTP_BREAKER_THRESHOLD
+consecutive connection errors, timeouts or 5xx responses the host is
+skipped - requests fail at once with CircuitOpen - for a cooldown that
+doubles on every failed trial request, up to HTTP_BREAKER_MAX_COOLDOWN.
+"""
+
+import os
+import time
+import random
+import logging
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+HTTP_POOL_CONNECTIONS = int(os.getenv('HTTP_POOL_CONNECTIONS', '16'))
+HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', '32'))
+HTTP_MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', '3'))
+HTTP_BACKOFF_BASE = float(os.getenv('HTTP_BACKOFF_BASE', '0.25'))
+HTTP_BACKOFF_MAX = float(os.getenv('HTTP_BACKOFF_MAX', '4'))
+HTTP_BREAKER_THRESHOLD = int(os.getenv('HTTP_BREAKER_THRESHOLD', '3'))
+HTTP_BREAKER_COOLDOWN = float(os.getenv('HTTP_BREAKER_COOLDOWN', '30'))
+HTTP_BREAKER_MAX_COOLDOWN = float(os.getenv('HTTP_BREAKER_MAX_COOLDOWN', '600'))
+
+# Statuses worth retrying: throttling and transient gateway errors
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+
+
+class RateBudgetExceeded(Exception):
+    """The per-host rate budget could not be met before the deadline."""
+
+
+class CircuitOpen(requests.exceptions.ConnectionError):
+    """The host's circuit breaker is open; the request was not sent."""
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` requests/second, bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = max(rate, 0.001)
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, deadline: Optional[float] = None) -> float:
+        """Take one token, sleeping if needed. Returns seconds waited.
+
+        Raises RateBudgetExceeded if a token would not be available before
+        `deadline` (a time.monotonic() value).
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            if deadline is not None and now + delay > deadline:
+                raise RateBudgetExceeded(f"rate budget exhausted ({self.rate:g}/s)")
+            time.sleep(delay)
+            waited += delay
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker for one host (guarded by the module lock)."""
+
+    __slots__ = ('failures', 'open_until', 'cooldown', 'trial', 'trips')
+
+    def __init__(self):
+        self.failures = 0
+        self.open_until = 0.0
+        self.cooldown = HTTP_BREAKER_COOLDOWN
+        # A half-open trial request is in flight
+        self.trial = False
+        self.trips = 0
+
+    def state(self, now: float) -> str:
+        if not self.open_until:
+            return 'closed'
+        return 'open' if now < self.open_until or self.trial else 'half_open'
+
+    def allow(self, now: float) -> bool:
+        """Whether a request may be sent; after the cooldown, lets exactly one trial through."""
+        if not self.open_until:
+            return True
+        if now < self.open_until or self.trial:
+            return False
+        self.trial = True
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.open_until = 0.0
+        self.cooldown = HTTP_BREAKER_COOLDOWN
+        self.trial = False
+
+    def record_failure(self, now: float) -> bool:
+        """Count a failure; returns True if it (re)opened the breaker."""
+        self.failures += 1
+        if self.trial:
+            self.trial = False
+            self.cooldown = min(HTTP_BREAKER_MAX_COOLDOWN, self.cooldown * 2)
+        elif self.failures < HTTP_BREAKER_THRESHOLD or self.open_until:
+            return False
+        self.open_until = now + self.cooldown
+        self.trips += 1
+        return True
+
+    def release_trial(self):
+        # The trial ended without telling us anything about the host
+        self.trial = False
+
+
+_lock = threading.Lock()
+_pid = os.getpid()
+_sessions: Dict[str, requests.Session] = {}
+_buckets: Dict[str, TokenBucket] = {}
+_breakers: Dict[str, CircuitBreaker] = {}
+_stats: Dict[str, Dict[str, float]] = {}
+
+
+def _check_fork():
+    # Pooled sockets must never be shared across a fork
+    global _pid
+    if os.getpid() != _pid:
+        _pid = os.getpid()
+        _sessions.clear()
+
+
+def get_session(name: str = 'default') -> requests.Session:
+    """Keep-alive session shared by every caller using the same name."""
+    with _lock:
+        _check_fork()
+        session = _sessions.get(name)
+        if session is None:
+            session = requests.Session()
+            # Retries are handled by request_with_retry, not urllib3
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS,
+                                  pool_maxsize=HTTP_POOL_MAXSIZE, max_retries=0)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _sessions[name] = session
+        return session
+
+
+def set_host_rate(host: str, rate: float, burst: int, replace: bool = True):
+    """Set the rate budget for one host (keeping an existing one unless `replace`)."""
+    with _lock:
+        if replace or host not in _buckets:
+            _buckets[host] = TokenBucket(rate, burst)
+
+
+def _host_stats(host: str) -> Dict[str, float]:
+    stats = _stats.get(host)
+    if stats is None:
+        stats = _stats[host] = {'requests': 0, 'retries': 0, 'errors': 0,
+                                'throttled': 0, 'short_circuited': 0, 'rate_wait_ms': 0.0}
+    return stats
+
+
+def _breaker(host: str) -> CircuitBreaker:
+    breaker = _breakers.get(host)
+    if breaker is None:
+        breaker = _breakers[host] = CircuitBreaker()
+    return breaker
+
+
+def _check_breaker(host: str, reserve: bool):
+    """Raise CircuitOpen if the host's breaker rejects the request."""
+    with _lock:
+        breaker = _breaker(host)
+        now = time.monotonic()
+        allowed = breaker.allow(now) if reserve else breaker.state(now) != 'open'
+        if not allowed:
+            _host_stats(host)['short_circuited'] += 1
+            remaining = max(0.0, breaker.open_until - now)
+    if not allowed:
+        raise CircuitOpen(f"circuit open for {host} ({remaining:.0f}s left)")
+
+
+def _record_outcome(host: str, failed: Optional[bool]):
+    """Feed a request outcome to the host's breaker (None: inconclusive)."""
+    with _lock:
+        breaker = _breaker(host)
+        if failed is None:
+            breaker.release_trial()
+        elif not failed:
+            breaker.record_success()
+        elif breaker.record_failure(time.monotonic()):
+            logger.warning(f"🔌 Circuit open for {host} for {breaker.cooldown:.0f}s after {breaker.failures} failures")
+
+
+def retry_after_seconds(response: requests.Response) -> Optional[float]:
+    """Parse a Retry-After header (delta-seconds or HTTP-date)."""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Full-jitter exponential backoff, never shorter than Retry-After."""
+    delay = random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * (2 ** attempt)))
+    if retry_after is not None:
+        delay = retry_after + delay / 4
+    return delay
+
+
+def request_with_retry(method: str, url: str, session: Optional[requests.Session] = None,
+                       retries: int = HTTP_MAX_RETRIES, timeout: float = 10,
+                       deadline: Optional[float] = None, circuit_breaker: bool = False,
+                       **kwargs) -> requests.Response:
+    """Send a request through the host's rate budget, retrying transient failures.
+
+    Retries connection errors, timeouts and RETRY_STATUSES up to `retries`
+    times. `deadline` (time.monotonic()) bounds the whole call including
+    backoff sleeps; the last response is returned (or the last exception
+    raised) once retries or time run out. With `circuit_breaker`, raises
+    CircuitOpen without sending anything while the host's breaker is open.
+    """
+    session = session or get_session()
+    host = urlsplit(url).netloc
+    bucket = _buckets.get(host)
+
+    attempt = 0
+    while True:
+        if circuit_breaker:
+            # Fail fast before spending rate budget (or sleeping for it) on a dead host
+            _check_breaker(host, reserve=False)
+        if bucket is not None:
+            waited = bucket.acquire(deadline)
+            if waited:
+                with _lock:
+                    _host_stats(host)['rate_wait_ms'] += waited * 1000
+        if circuit_breaker:
+            _check_breaker(host, reserve=True)
+
+        request_timeout = timeout
+        if deadline is not None:
+            request_timeout = min(timeout, max(0.05, deadline - time.monotonic()))
+
+        with _lock:
+            _host_stats(host)['requests'] += 1
+        retry_after = None
+        try:
+            response = session.request(method, url, timeout=request_timeout, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            with _lock:
+                _host_stats(host)['errors'] += 1
+            if circuit_breaker:
+                _record_outcome(host, True)
+            if attempt >= retries:
+                raise
+            response = None
+        except BaseException:
+            if circuit_breaker:
+                _record_outcome(host, None)
+            raise
+        else:
+            if circuit_breaker:
+                _record_outcome(host, response.status_code >= 500)
+            if response.status_code not in RETRY_STATUSES or attempt >= retries:
+                return response
+            if response.status_code == 429:
+                with _lock:
+                    _host_stats(host)['throttled'] += 1
+            retry_after = retry_after_seconds(response)
+
+        delay = backoff_delay(attempt, retry_after)
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            if response is not None:
+                return response
+            raise requests.exceptions.Timeout(f"deadline reached before retrying {url}")
+        attempt += 1
+        with _lock:
+            _host_stats(host)['retries'] += 1
+        time.sleep(delay)
+
+
+def http_stats() -> Dict[str, Dict[str, Any]]:
+    now = time.monotonic()
+    with _lock:
+        stats = {host: {k: round(v, 3) for k, v in host_stats.items()} for host, host_stats in _stats.items()}
+        for host, breaker in _breakers.items():
+            stats.setdefault(host, {})['circuit'] = {
+                'state': breaker.state(now),
+                'consecutive_failures': breaker.failures,
+                'trips': breaker.trips,
+                'open_for_s': round(max(0.0, breaker.open_until - now), 1),
+            }
+        return stats
@@ -0,0 +1,198 @@
+"""
+Copy-trading leaderboard served from in-memory snapshots.
+
+/api/copy-trading/leaderboard ran a GROUP BY over every trade in the window
+(7d/30d/90d/all) on each request, and the copy-trading page polls it. Trades
+are now also rolled up into per-day, per-(trader, token) buckets
+(trader_token_daily, kept current by a trigger on trades). A window's
+ranking merges the whole days of buckets after its cutoff with the raw trades
+of the cutoff's own day - an index range over a single day - so it matches
+the old rolling cutoff exactly.
+
+Each worker keeps the ranking of each timeframe in memory. Readers check at
+most every LEADERBOARD_POLL seconds whether any trade was recorded since
+(MAX(trades.id), from any worker) and recompute only then, or once the
+snapshot is LEADERBOARD_MAX_AGE old, since trades also age out of a window.
+One reader recomputes while the others keep getting the previous snapshot.
+ETags hash the returned rows, so every worker gives the same ETag for the
+same leaderboard and an unchanged one is answered with 304.
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from db import get_db
+
+logger = logging.getLogger(__name__)
+
+LEADERBOARD_POLL = float(os.getenv('LEADERBOARD_POLL', '2'))
+LEADERBOARD_MAX_AGE = float(os.getenv('LEADERBOARD_MAX_AGE', '60'))
+LEADERBOARD_MAX_ROWS = int(os.getenv('LEADERBOARD_MAX_ROWS', '200'))
+
+# Window start per timeframe, as SQLite datetime() modifiers (created_at is UTC)
+TIMEFRAMES = {
+    '7d': ('now', '-7 days'),
+    '30d': ('now', '-30 days'),
+    '90d': ('now', '-90 days'),
+    'all': ('1970-01-01',),
+}
+DEFAULT_TIMEFRAME = '30d'
+
+# Whole days from the buckets, plus the cutoff's own day from trades (created_at_ms range:
+# created_at mixes 'YYYY-MM-DD HH:MM:SS' and ISO 'T' strings, which don't compare as text)
+_RANKING_SQL = '''
+    WITH window_trades AS (
+        SELECT trader_address, asa_id, trade_count, buy_value, sell_value, first_trade_at, last_trade_at
+        FROM trader_token_daily
+        WHERE day > DATE(:cutoff)
+        UNION ALL
+        SELECT trader_address, asa_id, 1,
+               CASE WHEN trade_type = 'buy' THEN COALESCE(total_value, 0) ELSE 0 END,
+               CASE WHEN trade_type = 'sell' THEN COALESCE(total_value, 0) ELSE 0 END,
+               created_at, created_at
+        FROM trades INDEXED BY idx_trades_created_ms_trader
+        WHERE created_at_ms >= CAST(strftime('%s', :cutoff) AS INTEGER) * 1000
+          AND created_at_ms < CAST(strftime('%s', DATE(:cutoff, '+1 day')) AS INTEGER) * 1000
+    )
+    SELECT
+        trader_address,
+        SUM(trade_count) as trade_count,
+        SUM(buy_value) as buy_volume,
+        SUM(sell_value) as sell_volume,
+        COUNT(DISTINCT asa_id) as distinct_tokens,
+        MIN(first_trade_at) as first_trade_at,
+        MAX(last_trade_at) as last_trade_at
+    FROM window_trades
+    GROUP BY trader_address
+    ORDER BY sell_volume DESC, trader_address
+    LIMIT :limit
+'''
+
+
+def _trader_entry(row) -> Dict[str, Any]:
+    trader_address, trade_count, buy_volume, sell_volume, distinct_tokens, first_trade_at, last_trade_at = row
+    buy_volume = buy_volume or 0
+    sell_volume = sell_volume or 0
+    net_pnl = sell_volume - buy_volume
+    roi_pct = (net_pnl / buy_volume * 100) if buy_volume > 0 else 0
+    return {
+        "trader_address": trader_address,
+        "trade_count": trade_count,
+        "buy_volume": buy_volume,
+        "sell_volume": sell_volume,
+        "net_pnl": net_pnl,
+        "roi_pct": roi_pct,
+        "distinct_tokens": distinct_tokens,
+        "first_trade_at": first_trade_at,
+        "last_trade_at": last_trade_at
+    }
+
+
+class _Snapshot:
+    __slots__ = ('traders', 'last_trade_id', 'computed_at', 'checked_at', 'etags')
+
+    def __init__(self, traders: List[Dict[str, Any]], last_trade_id: Optional[int]):
+        self.traders = traders
+        self.last_trade_id = last_trade_id
+        self.computed_at = self.checked_at = time.monotonic()
+        # limit -> ETag of traders[:limit]
+        self.etags: Dict[int, str] = {}
+
+    def etag(self, limit: int) -> str:
+        etag = self.etags.get(limit)
+        if etag is None:
+            body = json.dumps(self.traders[:limit], sort_keys=True, default=str).encode()
+            etag = self.etags[limit] = hashlib.sha1(body).hexdigest()[:20]
+        return etag
+
+
+class LeaderboardEngine:
+    """Per-timeframe ranking snapshots over the trader_token_daily buckets."""
+
+    def __init__(self, max_rows: int = LEADERBOARD_MAX_ROWS):
+        self.max_rows = max_rows
+        self._snapshots: Dict[str, _Snapshot] = {}
+        self._refresh_locks = {timeframe: threading.Lock() for timeframe in TIMEFRAMES}
+        self._lock = threading.Lock()
+        self._stats = {'reads': 0, 'change_checks': 0, 'refreshes': 0, 'refresh_failures': 0,
+                       'served_previous': 0, 'last_refresh_ms': None}
+
+    def get(self, timeframe: str, limit: int) -> Tuple[List[Dict[str, Any]], str]:
+        """(top `limit` traders, ETag) for a timeframe; unknown timeframes fall back to 30d."""
+        if timeframe not in TIMEFRAMES:
+            timeframe = DEFAULT_TIMEFRAME
+        limit = max(0, min(limit, self.max_rows))
+        with self._lock:
+            self._stats['reads'] += 1
+        snapshot = self._current(timeframe)
+        return snapshot.traders[:limit], f'{timeframe}-{snapshot.etag(limit)}'
+
+    def _current(self, timeframe: str) -> _Snapshot:
+        snapshot = self._snapshots.get(timeframe)
+        if snapshot is not None and time.monotonic() - snapshot.checked_at < LEADERBOARD_POLL:
+            return snapshot
+        refresh_lock = self._refresh_locks[timeframe]
+        # Only a cold start waits; otherwise one reader refreshes and the rest serve the previous snapshot
+        if not refresh_lock.acquire(blocking=snapshot is None):
+            with self._lock:
+                self._stats['served_previous'] += 1
+            return snapshot
+        try:
+            snapshot = self._snapshots.get(timeframe)
+            now = time.monotonic()
+            if snapshot is not None and now - snapshot.checked_at < LEADERBOARD_POLL:
+                return snapshot
+            try:
+                return self._refresh(timeframe, snapshot)
+            except Exception as e:
+                with self._lock:
+                    self._stats['refresh_failures'] += 1
+                if snapshot is None:
+                    raise
+                logger.warning(f"⚠️ Leaderboard {timeframe} refresh failed, serving previous snapshot: {e}")
+                snapshot.checked_at = now
+                return snapshot
+        finally:
+            refresh_lock.release()
+
+    def _refresh(self, timeframe: str, snapshot: Optional[_Snapshot]) -> _Snapshot:
+        started = time.monotonic()
+        conn = get_db()
+        try:
+            last_trade_id = conn.execute('SELECT MAX(id) FROM trades').fetchone()[0]
+            with self._lock:
+                self._stats['change_checks'] += 1
+            if (snapshot is not None and snapshot.last_trade_id == last_trade_id
+                    and started - snapshot.computed_at < LEADERBOARD_MAX_AGE):
+                snapshot.checked_at = started
+                return snapshot
+            modifiers = TIMEFRAMES[timeframe]
+            cutoff = conn.execute(f"SELECT datetime({', '.join('?' * len(modifiers))})", modifiers).fetchone()[0]
+            rows = conn.execute(_RANKING_SQL, {'cutoff': cutoff, 'limit': self.max_rows}).fetchall()
+        finally:
+            conn.close()
+        snapshot = _Snapshot([_trader_entry(row) for row in rows], last_trade_id)
+        self._snapshots[timeframe] = snapshot
+        with self._lock:
+            self._stats['refreshes'] += 1
+            self._stats['last_refresh_ms'] = round((time.monotonic() - started) * 1000, 1)
+        return snapshot
+
+    def stats(self) -> Dict:
+        now = time.monotonic()
+        with self._lock:
+            stats = dict(self._stats)
+        stats['snapshots'] = {
+            timeframe: {'traders': len(snapshot.traders), 'age_seconds': round(now - snapshot.computed_at, 1),
+                        'last_trade_id': snapshot.last_trade_id}
+            for timeframe, snapshot in list(self._snapshots.items())
+        }
+        return stats
+
+
+leaderboard = LeaderboardEngine()
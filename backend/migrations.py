@@ -0,0 +1,839 @@
+"""
+Versioned schema migrations for the CreatorVault SQLite database.
+
+Migrations run once, at startup, in order. The schema version is stored in
+PRAGMA user_version, so a database that is already current costs a single
+PRAGMA read and request handlers can assume every table and column exists.
+
+To change the schema, append a new (version, description, function) entry to
+MIGRATIONS - never edit one that has already shipped.
+"""
+
+import json
+import sqlite3
+import logging
+from datetime import datetime
+from typing import Callable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _column_names(cursor, table: str) -> List[str]:
+    cursor.execute(f'PRAGMA table_info({table})')
+    return [row[1] for row in cursor.fetchall()]
+
+
+def _add_column(cursor, table: str, column_def: str):
+    """ALTER TABLE ... ADD COLUMN, skipped when the column already exists."""
+    column = column_def.split()[0]
+    if column not in _column_names(cursor, table):
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column_def}')
+
+
+def _baseline_schema(cursor):
+    """Schema as previously created by init_db() on every call."""
+    # Create tokens table - Updated for Aptos (asa_id is now metadata_address as TEXT)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS tokens (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            token_id TEXT UNIQUE,  -- Aptos FA metadata address or token identifier
+            creator TEXT NOT NULL,
+            token_name TEXT NOT NULL,
+            token_symbol TEXT NOT NULL,
+            total_supply INTEGER NOT NULL,
+            current_price REAL NOT NULL,
+            market_cap REAL NOT NULL,
+            volume_24h REAL DEFAULT 0,
+            holders INTEGER DEFAULT 1,
+            price_change_24h REAL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            youtube_channel_title TEXT,
+            youtube_subscribers INTEGER,
+            video_id TEXT,
+            video_title TEXT,
+            platform TEXT,
+            content_url TEXT,
+            content_id TEXT,
+            content_description TEXT,
+            content_thumbnail TEXT,
+            bonding_curve_config TEXT,
+            bonding_curve_state TEXT,
+            transaction_id TEXT,
+            metadata_address TEXT  -- Aptos FA metadata object address
+        )
+    ''')
+
+    # Migrate existing INTEGER asa_id to TEXT if needed
+    _add_column(cursor, 'tokens', 'metadata_address TEXT')
+
+    # Add token_id column if it doesn't exist (for Aptos content_id-based tokens)
+    _add_column(cursor, 'tokens', 'token_id TEXT')
+
+    # Add premium content columns for Shelby Protocol integration
+    _add_column(cursor, 'tokens', 'premium_content_url TEXT')
+    _add_column(cursor, 'tokens', 'premium_content_blob_id TEXT')
+    _add_column(cursor, 'tokens', 'premium_content_type TEXT')
+    _add_column(cursor, 'tokens', 'premium_content_account_address TEXT')
+    _add_column(cursor, 'tokens', 'premium_content_explorer_url TEXT')
+
+    # Create unique index on token_id if it doesn't exist
+    try:
+        cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_tokens_token_id ON tokens(token_id)')
+    except sqlite3.Error as e:
+        logger.warning(f"Could not create unique index on token_id: {e}")
+
+    # Create posts table for social media feed
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS posts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            creator_address TEXT NOT NULL,
+            token_id TEXT NOT NULL,
+            content_type TEXT NOT NULL,
+            shelby_blob_id TEXT,
+            shelby_blob_url TEXT,
+            title TEXT,
+            description TEXT,
+            is_premium BOOLEAN DEFAULT 0,
+            minimum_balance REAL DEFAULT 1,
+            likes_count INTEGER DEFAULT 0,
+            comments_count INTEGER DEFAULT 0,
+            shares_count INTEGER DEFAULT 0,
+            views_count INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (token_id) REFERENCES tokens(token_id)
+        )
+    ''')
+
+    # Create engagement table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS engagement (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            post_id INTEGER NOT NULL,
+            user_address TEXT NOT NULL,
+            engagement_type TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (post_id) REFERENCES posts(id),
+            UNIQUE(post_id, user_address, engagement_type)
+        )
+    ''')
+
+    # Create comments table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS comments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            post_id INTEGER NOT NULL,
+            user_address TEXT NOT NULL,
+            comment_text TEXT NOT NULL,
+            shelby_blob_id TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (post_id) REFERENCES posts(id)
+        )
+    ''')
+
+    # Create trades table - Updated for Aptos (asa_id is now TEXT)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS trades (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            asa_id TEXT NOT NULL,  -- Changed to TEXT for Aptos metadata address
+            trader_address TEXT NOT NULL,
+            trade_type TEXT NOT NULL,
+            amount REAL NOT NULL,
+            price REAL NOT NULL,
+            transaction_id TEXT NOT NULL,
+            creator_fee REAL DEFAULT 0,
+            platform_fee REAL DEFAULT 0,
+            total_value REAL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            referral_code TEXT,
+            referral_earnings REAL DEFAULT 0,
+            FOREIGN KEY (asa_id) REFERENCES tokens (asa_id)
+        )
+    ''')
+
+    # Add fee columns if they don't exist (for existing databases)
+    _add_column(cursor, 'trades', 'creator_fee REAL DEFAULT 0')
+    _add_column(cursor, 'trades', 'platform_fee REAL DEFAULT 0')
+    _add_column(cursor, 'trades', 'total_value REAL DEFAULT 0')
+    _add_column(cursor, 'trades', 'referral_code TEXT')
+    _add_column(cursor, 'trades', 'referral_earnings REAL DEFAULT 0')
+
+    # Create referrals table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS referrals (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            referrer_address TEXT NOT NULL,
+            referred_address TEXT NOT NULL UNIQUE,
+            referral_code TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            total_earnings REAL DEFAULT 0,
+            total_trades_count INTEGER DEFAULT 0,
+            total_volume REAL DEFAULT 0
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_referrals_referrer ON referrals (referrer_address)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_referrals_referred ON referrals (referred_address)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_referrals_code ON referrals (referral_code)')
+
+    # Create referral_earnings table for detailed tracking
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS referral_earnings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            referrer_address TEXT NOT NULL,
+            referred_address TEXT NOT NULL,
+            trade_id INTEGER NOT NULL,
+            earnings REAL NOT NULL,
+            trade_value REAL NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (trade_id) REFERENCES trades (id)
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_referral_earnings_referrer ON referral_earnings (referrer_address)')
+
+    # Add bonding curve columns if they don't exist
+    _add_column(cursor, 'tokens', 'bonding_curve_config TEXT')
+    _add_column(cursor, 'tokens', 'bonding_curve_state TEXT')
+    _add_column(cursor, 'tokens', 'liquidity_pool_config TEXT')
+    _add_column(cursor, 'tokens', 'is_amm_migrated INTEGER DEFAULT 0')
+    _add_column(cursor, 'tokens', 'migration_threshold REAL DEFAULT 0')
+    _add_column(cursor, 'tokens', 'platform TEXT')
+    _add_column(cursor, 'tokens', 'content_url TEXT')
+    _add_column(cursor, 'tokens', 'content_id TEXT')
+    _add_column(cursor, 'tokens', 'content_description TEXT')
+    _add_column(cursor, 'tokens', 'content_thumbnail TEXT')
+
+    # Create holders table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS holders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            asa_id TEXT NOT NULL,  -- Changed to TEXT for Aptos metadata address
+            holder_address TEXT NOT NULL,
+            balance REAL NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (asa_id) REFERENCES tokens (asa_id)
+        )
+    ''')
+
+    # Create YouTube sessions table for persistent auth
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS youtube_sessions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_key TEXT UNIQUE NOT NULL,
+            credentials TEXT NOT NULL,
+            channel_id TEXT NOT NULL,
+            channel_title TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Create YouTube channel cache table to avoid quota issues
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS youtube_channel_cache (
+            channel_id TEXT PRIMARY KEY,
+            channel_title TEXT,
+            channel_data TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Create YouTube videos cache table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS youtube_videos_cache (
+            channel_id TEXT PRIMARY KEY,
+            channel_title TEXT,
+            videos_data TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Create YouTube video info cache table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS youtube_video_info_cache (
+            video_id TEXT PRIMARY KEY,
+            video_data TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Create predictions table for prediction markets
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS predictions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            prediction_id TEXT UNIQUE NOT NULL,
+            creator_address TEXT NOT NULL,
+            content_url TEXT NOT NULL,
+            platform TEXT NOT NULL,
+            metric_type TEXT NOT NULL,
+            target_value REAL NOT NULL,
+            timeframe_hours INTEGER NOT NULL,
+            end_time TIMESTAMP NOT NULL,
+            yes_pool REAL DEFAULT 0,
+            no_pool REAL DEFAULT 0,
+            status TEXT DEFAULT 'active',
+            outcome TEXT,
+            initial_value REAL,
+            final_value REAL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Create prediction_trades table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS prediction_trades (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            prediction_id TEXT NOT NULL,
+            trader_address TEXT NOT NULL,
+            side TEXT NOT NULL,
+            amount REAL NOT NULL,
+            odds REAL NOT NULL,
+            potential_payout REAL NOT NULL,
+            transaction_id TEXT,
+            status TEXT DEFAULT 'pending',
+            payout_amount REAL DEFAULT 0,
+            claimed INTEGER DEFAULT 0,
+            claim_txid TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (prediction_id) REFERENCES predictions (prediction_id)
+        )
+    ''')
+
+    # Add claim columns to prediction_trades if they don't exist
+    _add_column(cursor, 'prediction_trades', 'claimed INTEGER DEFAULT 0')
+    _add_column(cursor, 'prediction_trades', 'claim_txid TEXT')
+
+    # Create copy trading profiles table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS copy_profiles (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            leader_address TEXT NOT NULL,
+            follower_address TEXT NOT NULL,
+            allocation_percent REAL NOT NULL,
+            max_single_trade_algo REAL NOT NULL,
+            copy_type TEXT DEFAULT 'proportional',
+            risk_level TEXT DEFAULT 'balanced',
+            status TEXT DEFAULT 'active',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_copy_profiles_leader ON copy_profiles (leader_address)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_copy_profiles_follower ON copy_profiles (follower_address)')
+
+    # Add risk_level column to copy_profiles if it doesn't exist
+    _add_column(cursor, 'copy_profiles', "risk_level TEXT DEFAULT 'balanced'")
+
+    # Create bot strategies table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS bot_strategies (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            owner_address TEXT NOT NULL,
+            label TEXT NOT NULL,
+            asa_id TEXT,  -- Changed to TEXT for Aptos metadata address
+            token_symbol TEXT,
+            metric_type TEXT NOT NULL,
+            condition TEXT NOT NULL,
+            action TEXT NOT NULL,
+            status TEXT DEFAULT 'active',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_bot_strategies_owner ON bot_strategies (owner_address)')
+
+    # Strategy executions table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS strategy_executions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            strategy_id INTEGER NOT NULL,
+            trader_address TEXT NOT NULL,
+            asa_id TEXT NOT NULL,  -- Changed to TEXT for Aptos metadata address
+            trade_type TEXT NOT NULL,
+            amount REAL NOT NULL,
+            price REAL NOT NULL,
+            total_value REAL NOT NULL,
+            pnl REAL DEFAULT 0,
+            executed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (strategy_id) REFERENCES bot_strategies(id)
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_strategy_executions_strategy ON strategy_executions (strategy_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_strategy_executions_trader ON strategy_executions (trader_address)')
+
+
+def _ledger_indexes(cursor):
+    """tokens.asa_id (still joined on by trade queries) and trades ledger indexes."""
+    # Fresh databases never got tokens.asa_id, but trade, portfolio and
+    # bonding-curve queries join and filter on it
+    _add_column(cursor, 'tokens', 'asa_id TEXT')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_tokens_asa_id ON tokens (asa_id)')
+
+    # Per-trader history/P&L, per-token history and the time-window
+    # leaderboard scan (covering, so it never touches the table)
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_trades_trader_created ON trades (trader_address, created_at, trade_type, total_value)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_trades_asa_created ON trades (asa_id, created_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_trades_created_trader ON trades (created_at, trader_address, trade_type, total_value, asa_id)')
+
+
+def _user_balances(cursor):
+    """Per-user balance cache written by sync_contract_trade."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_balances (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_address TEXT NOT NULL,
+            token_id TEXT NOT NULL,
+            creator_address TEXT NOT NULL,
+            balance REAL NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(user_address, token_id, creator_address)
+        )
+    ''')
+
+
+def _typed_curve_columns(cursor):
+    """Typed curve_* columns replacing the bonding_curve_config/state JSON blobs."""
+    for column_def in (
+        'curve_initial_price REAL',
+        'curve_initial_supply INTEGER',
+        'curve_steepness REAL',
+        'curve_virtual_token_reserve REAL',
+        'curve_virtual_algo_reserve REAL',
+        'curve_k REAL',
+        'curve_token_supply REAL DEFAULT 0',
+        'curve_algo_reserve REAL DEFAULT 0',
+    ):
+        _add_column(cursor, 'tokens', column_def)
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_tokens_metadata_address ON tokens (metadata_address)')
+
+    # One-time parse of the existing JSON; same defaults as BondingCurve.from_dict
+    cursor.execute('''
+        SELECT id, bonding_curve_config, bonding_curve_state FROM tokens
+        WHERE bonding_curve_config IS NOT NULL AND bonding_curve_config != ''
+    ''')
+    updates = []
+    for row_id, config_json, state_json in cursor.fetchall():
+        try:
+            config = json.loads(config_json)
+            state = json.loads(state_json) if state_json else {}
+        except (TypeError, ValueError):
+            logger.warning(f"⚠️ Skipping unparseable bonding curve for token row {row_id}")
+            continue
+        initial_price = config.get('initial_price', 0.0001)
+        initial_supply = config.get('initial_supply', config.get('virtual_token_reserve', 1000000))
+        virtual_tokens = config.get('virtual_token_reserve', initial_supply)
+        virtual_algo = config.get('virtual_algo_reserve', initial_price * virtual_tokens)
+        updates.append((
+            initial_price, int(initial_supply), config.get('curve_steepness', 1.0),
+            virtual_tokens, virtual_algo, config.get('k', virtual_tokens * virtual_algo),
+            state.get('token_supply', 0), state.get('algo_reserve', 0), row_id,
+        ))
+    cursor.executemany('''
+        UPDATE tokens
+        SET curve_initial_price = ?, curve_initial_supply = ?, curve_steepness = ?,
+            curve_virtual_token_reserve = ?, curve_virtual_algo_reserve = ?, curve_k = ?,
+            curve_token_supply = ?, curve_algo_reserve = ?
+        WHERE id = ?
+    ''', updates)
+
+
+def _token_contract_module(cursor):
+    """Which creator_token module address each token was found under on-chain."""
+    _add_column(cursor, 'tokens', 'contract_module_address TEXT')
+    # View calls are keyed by (creator, content_id); token_id is already unique-indexed
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_tokens_creator_content ON tokens (creator, content_id)')
+
+
+def _shelby_upload_jobs(cursor):
+    """Persistent queue for background Shelby uploads (see shelby_jobs.py)."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS shelby_upload_jobs (
+            id TEXT PRIMARY KEY,
+            status TEXT NOT NULL DEFAULT 'queued',
+            stage TEXT,
+            progress INTEGER DEFAULT 0,
+            blob_name TEXT NOT NULL,
+            expiration TEXT,
+            file_path TEXT,
+            file_name TEXT,
+            file_size INTEGER,
+            attempts INTEGER DEFAULT 0,
+            max_attempts INTEGER DEFAULT 3,
+            upload_committed INTEGER DEFAULT 0,
+            transaction_hash TEXT,
+            account_address TEXT,
+            cli_output TEXT,
+            result TEXT,
+            error TEXT,
+            claimed_by TEXT,
+            lease_expires_at REAL,
+            next_attempt_at REAL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    # Workers poll for due queued jobs and lapsed leases
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_shelby_upload_jobs_status
+        ON shelby_upload_jobs (status, next_attempt_at, lease_expires_at)
+    ''')
+
+
+def _shelby_upload_content_hash(cursor):
+    """SHA-256 of each upload, so identical files are uploaded once."""
+    _add_column(cursor, 'shelby_upload_jobs', 'content_hash TEXT')
+    # At most one live (not failed) job per content; failed ones can be resubmitted
+    cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_shelby_upload_jobs_content_hash
+        ON shelby_upload_jobs (content_hash)
+        WHERE content_hash IS NOT NULL AND status != 'failed'
+    ''')
+
+
+def _scrape_cache(cursor):
+    """Scraped social post results keyed by normalized URL (see scrape_cache.py)."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS scrape_cache (
+            url_key TEXT PRIMARY KEY,
+            platform TEXT NOT NULL,
+            result TEXT NOT NULL,
+            fetched_at REAL NOT NULL,
+            etag TEXT,
+            last_modified TEXT,
+            probed INTEGER DEFAULT 0
+        )
+    ''')
+
+
+def _prediction_resolver(cursor):
+    """Resolver claim columns and the expiry index (see prediction_resolver.py)."""
+    _add_column(cursor, 'predictions', 'resolver_claimed_by TEXT')
+    _add_column(cursor, 'predictions', 'resolver_lease_expires_at REAL')
+    # Resolvers load upcoming deadlines of open markets in end_time order
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_predictions_status_end ON predictions (status, end_time)')
+
+
+def _trader_positions(cursor):
+    """Per-(trader, token) trade rollup, kept current by a trigger on trades."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS trader_positions (
+            trader_address TEXT NOT NULL,
+            asa_id TEXT NOT NULL,
+            trade_count INTEGER NOT NULL DEFAULT 0,
+            buy_count INTEGER NOT NULL DEFAULT 0,
+            sell_count INTEGER NOT NULL DEFAULT 0,
+            buy_amount REAL NOT NULL DEFAULT 0,
+            sell_amount REAL NOT NULL DEFAULT 0,
+            buy_value REAL NOT NULL DEFAULT 0,
+            sell_value REAL NOT NULL DEFAULT 0,
+            first_trade_at TIMESTAMP,
+            last_trade_at TIMESTAMP,
+            PRIMARY KEY (trader_address, asa_id)
+        ) WITHOUT ROWID
+    ''')
+    # Anything that isn't a buy counts as a sell, as in the analytics it feeds
+    cursor.execute('''
+        INSERT OR REPLACE INTO trader_positions
+        SELECT trader_address, asa_id, COUNT(*),
+               SUM(trade_type = 'buy'), SUM(trade_type != 'buy'),
+               SUM(CASE WHEN trade_type = 'buy' THEN amount ELSE 0 END),
+               SUM(CASE WHEN trade_type != 'buy' THEN amount ELSE 0 END),
+               SUM(CASE WHEN trade_type = 'buy' THEN COALESCE(total_value, 0) ELSE 0 END),
+               SUM(CASE WHEN trade_type != 'buy' THEN COALESCE(total_value, 0) ELSE 0 END),
+               MIN(created_at), MAX(created_at)
+        FROM trades GROUP BY trader_address, asa_id
+    ''')
+    # Same transaction as the trade insert, whichever endpoint records it
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_trades_trader_positions AFTER INSERT ON trades
+        BEGIN
+            INSERT INTO trader_positions
+                (trader_address, asa_id, trade_count, buy_count, sell_count, buy_amount, sell_amount,
+                 buy_value, sell_value, first_trade_at, last_trade_at)
+            VALUES (NEW.trader_address, NEW.asa_id, 1,
+                    NEW.trade_type = 'buy', NEW.trade_type != 'buy',
+                    CASE WHEN NEW.trade_type = 'buy' THEN NEW.amount ELSE 0 END,
+                    CASE WHEN NEW.trade_type != 'buy' THEN NEW.amount ELSE 0 END,
+                    CASE WHEN NEW.trade_type = 'buy' THEN COALESCE(NEW.total_value, 0) ELSE 0 END,
+                    CASE WHEN NEW.trade_type != 'buy' THEN COALESCE(NEW.total_value, 0) ELSE 0 END,
+                    NEW.created_at, NEW.created_at)
+            ON CONFLICT (trader_address, asa_id) DO UPDATE SET
+                trade_count = trade_count + 1,
+                buy_count = buy_count + excluded.buy_count,
+                sell_count = sell_count + excluded.sell_count,
+                buy_amount = buy_amount + excluded.buy_amount,
+                sell_amount = sell_amount + excluded.sell_amount,
+                buy_value = buy_value + excluded.buy_value,
+                sell_value = sell_value + excluded.sell_value,
+                first_trade_at = MIN(first_trade_at, excluded.first_trade_at),
+                last_trade_at = MAX(last_trade_at, excluded.last_trade_at);
+        END
+    ''')
+
+
+def _trader_token_daily(cursor):
+    """Per-day, per-(trader, token) volume buckets for the leaderboard (see leaderboard.py)."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS trader_token_daily (
+            day TEXT NOT NULL,
+            trader_address TEXT NOT NULL,
+            asa_id TEXT NOT NULL,
+            trade_count INTEGER NOT NULL DEFAULT 0,
+            buy_value REAL NOT NULL DEFAULT 0,
+            sell_value REAL NOT NULL DEFAULT 0,
+            first_trade_at TIMESTAMP,
+            last_trade_at TIMESTAMP,
+            PRIMARY KEY (day, trader_address, asa_id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        INSERT OR REPLACE INTO trader_token_daily
+        SELECT DATE(created_at), trader_address, asa_id, COUNT(*),
+               SUM(CASE WHEN trade_type = 'buy' THEN COALESCE(total_value, 0) ELSE 0 END),
+               SUM(CASE WHEN trade_type = 'sell' THEN COALESCE(total_value, 0) ELSE 0 END),
+               MIN(created_at), MAX(created_at)
+        FROM trades WHERE DATE(created_at) IS NOT NULL
+        GROUP BY DATE(created_at), trader_address, asa_id
+    ''')
+    # Trades with an unparseable created_at have no day and stay out of the buckets
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_trades_trader_token_daily AFTER INSERT ON trades
+        WHEN DATE(NEW.created_at) IS NOT NULL
+        BEGIN
+            INSERT INTO trader_token_daily
+                (day, trader_address, asa_id, trade_count, buy_value, sell_value, first_trade_at, last_trade_at)
+            VALUES (DATE(NEW.created_at), NEW.trader_address, NEW.asa_id, 1,
+                    CASE WHEN NEW.trade_type = 'buy' THEN COALESCE(NEW.total_value, 0) ELSE 0 END,
+                    CASE WHEN NEW.trade_type = 'sell' THEN COALESCE(NEW.total_value, 0) ELSE 0 END,
+                    NEW.created_at, NEW.created_at)
+            ON CONFLICT (day, trader_address, asa_id) DO UPDATE SET
+                trade_count = trade_count + 1,
+                buy_value = buy_value + excluded.buy_value,
+                sell_value = sell_value + excluded.sell_value,
+                first_trade_at = MIN(first_trade_at, excluded.first_trade_at),
+                last_trade_at = MAX(last_trade_at, excluded.last_trade_at);
+        END
+    ''')
+
+
+def _trader_pnl_buckets(cursor):
+    """Per-trader daily and hourly P&L by integer epoch day/hour, kept current by triggers."""
+    for table, bucket, seconds in (('trader_pnl_daily', 'epoch_day', 86400), ('trader_pnl_hourly', 'epoch_hour', 3600)):
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                trader_address TEXT NOT NULL,
+                {bucket} INTEGER NOT NULL,
+                trade_count INTEGER NOT NULL DEFAULT 0,
+                buy_value REAL NOT NULL DEFAULT 0,
+                sell_value REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (trader_address, {bucket})
+            ) WITHOUT ROWID
+        ''')
+        # created_at is UTC text; strftime('%s') is NULL for unparseable values, which stay out
+        epoch = "CAST(strftime('%s', {}) AS INTEGER) / " + str(seconds)
+        cursor.execute(f'''
+            INSERT OR REPLACE INTO {table}
+            SELECT trader_address, {epoch.format('created_at')}, COUNT(*),
+                   SUM(CASE WHEN trade_type = 'buy' THEN COALESCE(total_value, 0) ELSE 0 END),
+                   SUM(CASE WHEN trade_type = 'sell' THEN COALESCE(total_value, 0) ELSE 0 END)
+            FROM trades WHERE strftime('%s', created_at) IS NOT NULL
+            GROUP BY trader_address, {epoch.format('created_at')}
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_trades_{table} AFTER INSERT ON trades
+            WHEN strftime('%s', NEW.created_at) IS NOT NULL
+            BEGIN
+                INSERT INTO {table} (trader_address, {bucket}, trade_count, buy_value, sell_value)
+                VALUES (NEW.trader_address, {epoch.format('NEW.created_at')}, 1,
+                        CASE WHEN NEW.trade_type = 'buy' THEN COALESCE(NEW.total_value, 0) ELSE 0 END,
+                        CASE WHEN NEW.trade_type = 'sell' THEN COALESCE(NEW.total_value, 0) ELSE 0 END)
+                ON CONFLICT (trader_address, {bucket}) DO UPDATE SET
+                    trade_count = trade_count + 1,
+                    buy_value = buy_value + excluded.buy_value,
+                    sell_value = sell_value + excluded.sell_value;
+            END
+        ''')
+
+
+def _token_candles(cursor):
+    """OHLCV candles per token at 1m/5m/1h/1d, kept current by a trigger (see token_candles.py)."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS token_candles (
+            asa_id TEXT NOT NULL,
+            resolution INTEGER NOT NULL,  -- bucket width in seconds
+            bucket_start INTEGER NOT NULL,  -- epoch seconds, a multiple of resolution
+            open REAL NOT NULL,
+            high REAL NOT NULL,
+            low REAL NOT NULL,
+            close REAL NOT NULL,
+            volume REAL NOT NULL DEFAULT 0,
+            quote_volume REAL NOT NULL DEFAULT 0,
+            trade_count INTEGER NOT NULL DEFAULT 0,
+            open_at INTEGER NOT NULL,
+            close_at INTEGER NOT NULL,
+            PRIMARY KEY (asa_id, resolution, bucket_start)
+        ) WITHOUT ROWID
+    ''')
+
+    # Backfill in trade order, so open/close are the first/last trade of each bucket
+    resolutions = (60, 300, 3600, 86400)
+    candles = {}
+    rows = cursor.execute('''
+        SELECT asa_id, CAST(strftime('%s', created_at) AS INTEGER), price, amount, COALESCE(total_value, 0)
+        FROM trades WHERE strftime('%s', created_at) IS NOT NULL
+        ORDER BY CAST(strftime('%s', created_at) AS INTEGER), id
+    ''')
+    for asa_id, at, price, amount, value in rows:
+        for resolution in resolutions:
+            key = (asa_id, resolution, at // resolution * resolution)
+            candle = candles.get(key)
+            if candle is None:
+                candles[key] = [price, price, price, price, amount, value, 1, at, at]
+            else:
+                candle[1] = max(candle[1], price)
+                candle[2] = min(candle[2], price)
+                candle[3] = price
+                candle[4] += amount
+                candle[5] += value
+                candle[6] += 1
+                candle[8] = at
+    cursor.executemany('INSERT OR REPLACE INTO token_candles VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                       [key + tuple(candle) for key, candle in candles.items()])
+
+    # A later trade (or the later-inserted of two in the same second) closes the bucket
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_trades_token_candles AFTER INSERT ON trades
+        WHEN strftime('%s', NEW.created_at) IS NOT NULL
+        BEGIN
+            INSERT INTO token_candles
+                (asa_id, resolution, bucket_start, open, high, low, close, volume, quote_volume,
+                 trade_count, open_at, close_at)
+            SELECT NEW.asa_id, r.seconds,
+                   CAST(strftime('%s', NEW.created_at) AS INTEGER) / r.seconds * r.seconds,
+                   NEW.price, NEW.price, NEW.price, NEW.price, NEW.amount, COALESCE(NEW.total_value, 0), 1,
+                   CAST(strftime('%s', NEW.created_at) AS INTEGER), CAST(strftime('%s', NEW.created_at) AS INTEGER)
+            FROM (SELECT 60 AS seconds UNION ALL SELECT 300 UNION ALL SELECT 3600 UNION ALL SELECT 86400) r
+            WHERE 1
+            ON CONFLICT (asa_id, resolution, bucket_start) DO UPDATE SET
+                open = CASE WHEN excluded.open_at < open_at THEN excluded.open ELSE open END,
+                high = MAX(high, excluded.high),
+                low = MIN(low, excluded.low),
+                close = CASE WHEN excluded.close_at >= close_at THEN excluded.close ELSE close END,
+                volume = volume + excluded.volume,
+                quote_volume = quote_volume + excluded.quote_volume,
+                trade_count = trade_count + 1,
+                open_at = MIN(open_at, excluded.open_at),
+                close_at = MAX(close_at, excluded.close_at);
+        END
+    ''')
+
+
+def _epoch_ms(column: str) -> str:
+    """SQL for a SQLite date string (either 'YYYY-MM-DD HH:MM:SS' or ISO with a 'T') as epoch ms."""
+    return (f"CAST(strftime('%s', {column}) AS INTEGER) * 1000"
+            f" + CAST(substr(strftime('%f', {column}), 4) AS INTEGER)")
+
+
+def _epoch_ms_columns(cursor):
+    """Integer epoch-ms timestamps on the ledger tables and predictions.end_time_ms."""
+    for table, text_column, ms_column in (
+        ('trades', 'created_at', 'created_at_ms'),
+        ('prediction_trades', 'created_at', 'created_at_ms'),
+        ('referral_earnings', 'created_at', 'created_at_ms'),
+        ('strategy_executions', 'executed_at', 'executed_at_ms'),
+    ):
+        _add_column(cursor, table, f'{ms_column} INTEGER')
+        cursor.execute(f'UPDATE {table} SET {ms_column} = {_epoch_ms(text_column)} WHERE {ms_column} IS NULL')
+        # Inserts keep writing the text column (or its CURRENT_TIMESTAMP default)
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_{ms_column} AFTER INSERT ON {table}
+            WHEN NEW.{ms_column} IS NULL
+            BEGIN
+                UPDATE {table} SET {ms_column} = {_epoch_ms('NEW.' + text_column)} WHERE id = NEW.id;
+            END
+        ''')
+
+    # Trader 7d analytics (covering) and per-token time ranges
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_trades_trader_created_ms
+        ON trades (trader_address, created_at_ms, trade_type, total_value, asa_id)
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_trades_asa_created_ms ON trades (asa_id, created_at_ms)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_prediction_trades_trader_created_ms ON prediction_trades (trader_address, created_at_ms)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_referral_earnings_referrer_created_ms ON referral_earnings (referrer_address, created_at_ms)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_strategy_executions_strategy_executed_ms ON strategy_executions (strategy_id, executed_at_ms)')
+
+    # end_time is written as a naive local isoformat(), which SQLite would read as UTC:
+    # convert it the way the app reads it
+    _add_column(cursor, 'predictions', 'end_time_ms INTEGER')
+    updates = []
+    for prediction_id, end_time in cursor.execute('SELECT prediction_id, end_time FROM predictions WHERE end_time_ms IS NULL').fetchall():
+        try:
+            updates.append((int(datetime.fromisoformat(end_time).timestamp() * 1000), prediction_id))
+        except (TypeError, ValueError):
+            continue
+    cursor.executemany('UPDATE predictions SET end_time_ms = ? WHERE prediction_id = ?', updates)
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_predictions_status_end_ms ON predictions (status, end_time_ms)')
+    # The resolver now reads end_time_ms
+    cursor.execute('DROP INDEX IF EXISTS idx_predictions_status_end')
+
+
+def _trades_created_ms_index(cursor):
+    """Leaderboard cutoff-day range on created_at_ms instead of the text created_at."""
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_trades_created_ms_trader
+        ON trades (created_at_ms, trader_address, trade_type, total_value, asa_id, created_at)
+    ''')
+    # Only the leaderboard read it
+    cursor.execute('DROP INDEX IF EXISTS idx_trades_created_trader')
+
+
+MIGRATIONS: List[Tuple[int, str, Callable]] = [
+    (1, 'baseline schema', _baseline_schema),
+    (2, 'tokens.asa_id and trades ledger indexes', _ledger_indexes),
+    (3, 'user_balances cache table', _user_balances),
+    (4, 'typed bonding curve columns', _typed_curve_columns),
+    (5, 'tokens.contract_module_address', _token_contract_module),
+    (6, 'shelby_upload_jobs queue', _shelby_upload_jobs),
+    (7, 'shelby_upload_jobs.content_hash', _shelby_upload_content_hash),
+    (8, 'scrape_cache table', _scrape_cache),
+    (9, 'prediction resolver claims and expiry index', _prediction_resolver),
+    (10, 'trader_positions rollup and trigger', _trader_positions),
+    (11, 'trader_token_daily leaderboard buckets', _trader_token_daily),
+    (12, 'trader_pnl_daily and trader_pnl_hourly buckets', _trader_pnl_buckets),
+    (13, 'token_candles OHLCV table', _token_candles),
+    (14, 'epoch-ms timestamp columns', _epoch_ms_columns),
+    (15, 'trades (created_at_ms, trader_address) index', _trades_created_ms_index),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn) -> int:
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn) -> int:
+    """Apply pending migrations and return the resulting schema version.
+
+    Each migration runs in its own IMMEDIATE transaction together with the
+    user_version bump, so concurrent workers starting at the same time apply
+    it exactly once and a failed migration leaves the previous version intact.
+    """
+    if get_schema_version(conn) >= SCHEMA_VERSION:
+        return get_schema_version(conn)
+
+    for version, description, apply in MIGRATIONS:
+        if conn.in_transaction:
+            conn.commit()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Re-check under the write lock: another worker may have got here first
+            if get_schema_version(conn) >= version:
+                conn.rollback()
+                continue
+            apply(conn.cursor())
+            conn.execute(f'PRAGMA user_version = {version}')
+            conn.commit()
+            logger.info(f"✅ Applied migration {version}: {description}")
+        except Exception:
+            conn.rollback()
+            logger.error(f"❌ Migration {version} ({description}) failed")
+            raise
+
+    return get_schema_version(conn)
@@ -0,0 +1,285 @@
+"""
+Background resolution of expired prediction markets.
+
+Markets used to be resolved only when something called
+/api/predictions/auto-resolve, which walked every expired market inside that
+request, re-SELECTed each row and scraped the URLs one after another. Each
+worker process now runs a resolver thread that keeps a min-heap of the
+deadlines (end_time_ms) of open markets and resolves each one when it expires.
+
+The heap is filled from the (status, end_time_ms) index: on start and every
+RESOLVER_RESCAN seconds the resolver loads open markets ending within
+RESOLVER_HORIZON, which also picks up markets created in other workers;
+create_prediction schedules its own market right away. Markets that come due
+together are claimed in one statement batch, their final metrics are fetched
+in parallel, and each market's outcome and trade payouts are written in one
+transaction.
+
+Every worker has its own heap, so a market is claimed before it is resolved:
+a conditional UPDATE sets resolver_claimed_by and a lease, and only the
+worker whose UPDATE matched goes on. Settling again requires the claim and an
+open status, so a market resolved meanwhile through the resolve endpoint is
+left alone. A failed metric fetch keeps the claim but shortens the lease to
+the retry delay, which backs the retry off across all workers; a claim left
+by a dead worker lapses after RESOLVER_LEASE.
+"""
+
+import os
+import time
+import heapq
+import socket
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from db import get_db, transaction
+
+logger = logging.getLogger(__name__)
+
+RESOLVER_RESCAN = float(os.getenv('RESOLVER_RESCAN', '60'))
+RESOLVER_HORIZON = float(os.getenv('RESOLVER_HORIZON', '3600'))
+RESOLVER_FETCH_WORKERS = int(os.getenv('RESOLVER_FETCH_WORKERS', '8'))
+# Must outlast one batch of metric fetches, or a slow market would be claimed twice
+RESOLVER_LEASE = float(os.getenv('RESOLVER_LEASE', '300'))
+RESOLVER_RETRY_MAX = float(os.getenv('RESOLVER_RETRY_MAX', '900'))
+
+OPEN_STATUSES = ('active', 'resolving')
+
+# fn(content_url, platform, metric_type) -> final metric value; raises if it can't be fetched
+MetricFetcher = Callable[[str, str, str], float]
+
+
+class MetricUnavailable(Exception):
+    """The final metric could not be read (failed scrape, no session); the market is retried, not settled."""
+
+
+def _retry_delay(attempts: int) -> float:
+    return min(RESOLVER_RETRY_MAX, 30.0 * 2 ** (attempts - 1))
+
+
+class PredictionResolver:
+    """Per-process deadline heap over open markets, resolved by a background thread."""
+
+    def __init__(self, fetch_workers: int = RESOLVER_FETCH_WORKERS):
+        self.fetch_workers = fetch_workers
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._fetch_metric: Optional[MetricFetcher] = None
+        self._heap: List[Tuple[float, str]] = []
+        # prediction_id -> due time of its live heap entry; other entries for it are stale
+        self._scheduled: Dict[str, float] = {}
+        self._attempts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_pid: Optional[int] = None
+        self._next_rescan = 0.0
+        self._stats = {'loaded': 0, 'claimed': 0, 'claim_conflicts': 0, 'resolved': 0, 'fetch_failures': 0,
+                       'lost_claims': 0, 'batches': 0, 'last_batch_ms': None}
+
+    def start(self, fetch_metric: MetricFetcher):
+        """Start this process's resolver thread, fetching final values with `fetch_metric`."""
+        self._fetch_metric = fetch_metric
+        with self._lock:
+            # Threads don't survive a fork
+            if os.getpid() != int(self.worker_id.rsplit(':', 1)[1]):
+                self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+                self._thread = None
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run_loop, name='prediction-resolver', daemon=True)
+                self._thread.start()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.fetch_workers, thread_name_prefix='resolver-fetch')
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def schedule(self, prediction_id: str, end_time_ms: int):
+        """Resolve `prediction_id` at its end_time_ms (called for markets created in this process)."""
+        self._push(prediction_id, end_time_ms / 1000)
+
+    def _push(self, prediction_id: str, due: float, replace: bool = True):
+        with self._lock:
+            if not replace and prediction_id in self._scheduled:
+                return
+            self._scheduled[prediction_id] = due
+            heapq.heappush(self._heap, (due, prediction_id))
+            earliest = self._heap[0][1] == prediction_id
+        if earliest:
+            self._wakeup.set()
+
+    def _pop_due(self, now: float) -> List[str]:
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                when, prediction_id = heapq.heappop(self._heap)
+                if self._scheduled.get(prediction_id) == when:
+                    del self._scheduled[prediction_id]
+                    due.append(prediction_id)
+        return due
+
+    def _load(self, horizon: float = RESOLVER_HORIZON) -> int:
+        """Schedule open markets ending within `horizon` seconds; returns how many were new."""
+        until_ms = int((time.time() + horizon) * 1000)
+        conn = get_db()
+        try:
+            rows = conn.execute('''
+                SELECT prediction_id, end_time_ms FROM predictions
+                WHERE status IN (?, ?) AND end_time_ms <= ?
+                ORDER BY end_time_ms
+            ''', OPEN_STATUSES + (until_ms,)).fetchall()
+        finally:
+            conn.close()
+        with self._lock:
+            new = [(prediction_id, end_time_ms) for prediction_id, end_time_ms in rows if prediction_id not in self._scheduled]
+        for prediction_id, end_time_ms in new:
+            self._push(prediction_id, end_time_ms / 1000, replace=False)
+        with self._lock:
+            self._stats['loaded'] += len(new)
+        return len(new)
+
+    def _run_loop(self):
+        while True:
+            try:
+                now = time.time()
+                if now >= self._next_rescan:
+                    self._load()
+                    self._next_rescan = now + RESOLVER_RESCAN
+                due = self._pop_due(now)
+                if due:
+                    self._resolve_batch(due)
+                    continue
+                with self._lock:
+                    wake_at = min(self._next_rescan, self._heap[0][0]) if self._heap else self._next_rescan
+            except Exception as e:
+                logger.error(f"❌ Prediction resolver loop failed: {e}")
+                wake_at = time.time() + min(RESOLVER_RESCAN, 10)
+            self._wakeup.wait(max(0.05, wake_at - time.time()))
+            self._wakeup.clear()
+
+    def resolve_due(self) -> int:
+        """Resolve every expired open market now (the auto-resolve endpoint); returns how many were resolved."""
+        self._load(horizon=0)
+        return self._resolve_batch(self._pop_due(time.time()))
+
+    def _claim(self, prediction_ids: Sequence[str]) -> List[Tuple[str, str, str, str]]:
+        """Take the expired, unclaimed (or lapsed) markets among `prediction_ids`.
+
+        Returns (prediction_id, content_url, platform, metric_type) of the ones this process now owns.
+        """
+        now = time.time()
+        claimed = []
+        with transaction() as conn:
+            for prediction_id in prediction_ids:
+                # Another worker may have claimed or resolved it since it was scheduled
+                if conn.execute('''
+                    UPDATE predictions SET resolver_claimed_by = ?, resolver_lease_expires_at = ?
+                    WHERE prediction_id = ? AND status IN (?, ?) AND end_time_ms <= ?
+                      AND (resolver_claimed_by IS NULL OR resolver_lease_expires_at <= ?)
+                ''', (self.worker_id, now + RESOLVER_LEASE, prediction_id) + OPEN_STATUSES
+                        + (int(now * 1000), now)).rowcount:
+                    claimed.append(prediction_id)
+            rows = []
+            if claimed:
+                placeholders = ','.join('?' * len(claimed))
+                rows = conn.execute(f'''
+                    SELECT prediction_id, content_url, platform, metric_type
+                    FROM predictions WHERE prediction_id IN ({placeholders})
+                ''', claimed).fetchall()
+        with self._lock:
+            self._stats['claimed'] += len(rows)
+            self._stats['claim_conflicts'] += len(prediction_ids) - len(rows)
+        return rows
+
+    def _resolve_batch(self, prediction_ids: Sequence[str]) -> int:
+        if not prediction_ids:
+            return 0
+        started = time.monotonic()
+        markets = self._claim(prediction_ids)
+        resolved = 0
+        if markets:
+            executor = self._get_executor()
+            futures = {executor.submit(self._fetch_metric, content_url, platform, metric_type): prediction_id
+                       for prediction_id, content_url, platform, metric_type in markets}
+            for future in as_completed(futures):
+                prediction_id = futures[future]
+                try:
+                    final_value = future.result()
+                except Exception as e:
+                    self._fetch_failed(prediction_id, e)
+                    continue
+                try:
+                    outcome = self._settle(prediction_id, final_value)
+                except Exception as e:
+                    logger.error(f"❌ Could not settle prediction {prediction_id}: {e}")
+                    self._fetch_failed(prediction_id, e)
+                    continue
+                if outcome is not None:
+                    resolved += 1
+                    logger.info(f"✅ Auto-resolved prediction {prediction_id}: {outcome} (final: {final_value})")
+        with self._lock:
+            self._stats['batches'] += 1
+            self._stats['last_batch_ms'] = round((time.monotonic() - started) * 1000, 1)
+        return resolved
+
+    def _settle(self, prediction_id: str, final_value: float) -> Optional[str]:
+        """Write the outcome and payouts in one transaction; None if the claim was lost."""
+        with transaction() as conn:
+            updated = conn.execute('''
+                UPDATE predictions
+                SET status = 'resolved', outcome = CASE WHEN ? >= target_value THEN 'YES' ELSE 'NO' END,
+                    final_value = ?, resolver_claimed_by = NULL, resolver_lease_expires_at = NULL
+                WHERE prediction_id = ? AND resolver_claimed_by = ? AND status IN (?, ?)
+            ''', (final_value, final_value, prediction_id, self.worker_id) + OPEN_STATUSES).rowcount
+            if not updated:
+                outcome = None
+            else:
+                outcome = conn.execute('SELECT outcome FROM predictions WHERE prediction_id = ?',
+                                       (prediction_id,)).fetchone()[0]
+                conn.execute('''
+                    UPDATE prediction_trades
+                    SET status = CASE WHEN side = ? THEN 'won' ELSE 'lost' END,
+                        payout_amount = CASE WHEN side = ? THEN potential_payout ELSE 0 END
+                    WHERE prediction_id = ? AND status = 'pending'
+                ''', (outcome, outcome, prediction_id))
+        with self._lock:
+            self._attempts.pop(prediction_id, None)
+            self._stats['resolved' if outcome else 'lost_claims'] += 1
+        if outcome is None:
+            logger.warning(f"⚠️ Prediction {prediction_id} was resolved elsewhere while its metric was fetched")
+        return outcome
+
+    def _fetch_failed(self, prediction_id: str, error: Exception):
+        with self._lock:
+            attempts = self._attempts[prediction_id] = self._attempts.get(prediction_id, 0) + 1
+            self._stats['fetch_failures'] += 1
+        delay = _retry_delay(attempts)
+        logger.warning(f"⚠️ Could not fetch final value for {prediction_id} (attempt {attempts}), "
+                       f"retrying in {delay:.0f}s: {error}")
+        retry_at = time.time() + delay
+        try:
+            # Keep the claim until the retry, so no worker retries it sooner
+            with transaction() as conn:
+                conn.execute('''
+                    UPDATE predictions SET resolver_lease_expires_at = ?
+                    WHERE prediction_id = ? AND resolver_claimed_by = ?
+                ''', (retry_at, prediction_id, self.worker_id))
+        except Exception as e:
+            logger.error(f"❌ Could not reschedule prediction {prediction_id}: {e}")
+        self._push(prediction_id, retry_at)
+
+    def stats(self) -> Dict:
+        now = time.time()
+        with self._lock:
+            stats = dict(self._stats)
+            stats['scheduled'] = len(self._scheduled)
+            stats['retrying'] = len(self._attempts)
+            stats['next_due_in'] = round(min(self._scheduled.values()) - now, 1) if self._scheduled else None
+            stats['running'] = self._thread is not None and self._thread.is_alive()
+        return stats
+
+
+prediction_resolver = PredictionResolver()
@@ -0,0 +1,421 @@
+"""
+Persistent cache of scraped social post data.
+
+/api/scrape-content, prediction creation, the prediction detail view and
+resolution all scraped the same Instagram, Twitter and LinkedIn URLs from
+scratch - a hedged multi-source scrape that can take seconds. Parsed results
+are now kept in the scrape_cache table (shared by every worker), keyed by a
+normalized URL so tracking parameters, x.com/twitter.com and www/mobile
+variants of one post share an entry.
+
+Each platform has its own TTL. Within it a read is a plain hit. After it,
+callers that can live with slightly old numbers (the UI) get the cached
+result immediately while a background thread refreshes it
+(stale-while-revalidate, for up to SCRAPE_STALE_MAX seconds); callers that
+can't pass max_age/allow_stale=False and wait for a live scrape, falling back
+to the last known result only if that scrape fails. Resolution also passes
+stale_fallback=False: it would rather retry later than settle on old numbers.
+
+Refreshes first ask the post page whether it changed: when the upstream sent
+an ETag or Last-Modified, a conditional HEAD that answers 304 just extends
+the entry instead of re-scraping.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+
+from db import get_db, transaction
+from http_pool import get_session, request_with_retry
+
+try:
+    from web_scraper import WebScraper
+except ImportError:
+    WebScraper = None
+
+logger = logging.getLogger(__name__)
+
+SCRAPE_TTLS = {
+    'instagram': float(os.getenv('SCRAPE_TTL_INSTAGRAM', '900')),
+    'twitter': float(os.getenv('SCRAPE_TTL_TWITTER', '300')),
+    'linkedin': float(os.getenv('SCRAPE_TTL_LINKEDIN', '1800')),
+}
+SCRAPE_TTL_DEFAULT = float(os.getenv('SCRAPE_TTL_DEFAULT', '600'))
+SCRAPE_STALE_MAX = float(os.getenv('SCRAPE_STALE_MAX', '86400'))
+# Oldest result prediction resolution will settle on
+SCRAPE_RESOLVE_MAX_AGE = float(os.getenv('SCRAPE_RESOLVE_MAX_AGE', '60'))
+SCRAPE_REVALIDATE_WORKERS = int(os.getenv('SCRAPE_REVALIDATE_WORKERS', '4'))
+SCRAPE_PROBE_TIMEOUT = float(os.getenv('SCRAPE_PROBE_TIMEOUT', '5'))
+# Upper bound a caller waits on another thread's scrape of the same URL
+SCRAPE_WAIT_TIMEOUT = float(os.getenv('SCRAPE_WAIT_TIMEOUT', '30'))
+# Bulk scrapes: total concurrency and per-platform caps (one platform can't take every slot)
+SCRAPE_BULK_WORKERS = int(os.getenv('SCRAPE_BULK_WORKERS', '12'))
+SCRAPE_BULK_CONCURRENCY = {
+    'instagram': int(os.getenv('SCRAPE_BULK_CONCURRENCY_INSTAGRAM', '4')),
+    'twitter': int(os.getenv('SCRAPE_BULK_CONCURRENCY_TWITTER', '6')),
+    'linkedin': int(os.getenv('SCRAPE_BULK_CONCURRENCY_LINKEDIN', '4')),
+}
+
+# Query parameters that only identify who shared a link, never the post itself
+TRACKING_PARAMS = frozenset({
+    'fbclid', 'gclid', 'igshid', 'igsh', 'ref', 'ref_src', 'ref_url', 'ref_source', 's', 't', 'si',
+    'src', 'trk', 'trackingid', 'lipi', 'rcm', 'mibextid', 'utm_source', 'utm_medium',
+    'utm_campaign', 'utm_term', 'utm_content', 'feature',
+})
+
+_HOST_ALIASES = {
+    'x.com': 'twitter.com',
+    'mobile.twitter.com': 'twitter.com',
+    'mobile.x.com': 'twitter.com',
+    'm.twitter.com': 'twitter.com',
+    'instagr.am': 'instagram.com',
+    'm.instagram.com': 'instagram.com',
+    'm.linkedin.com': 'linkedin.com',
+}
+
+# Host each platform serves its canonical post URLs from
+_CANONICAL_HOSTS = {
+    'instagram.com': 'www.instagram.com',
+    'linkedin.com': 'www.linkedin.com',
+}
+
+_PLATFORM_ALIASES = {'x': 'twitter'}
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form of a post URL, used as the cache key and for scraping."""
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    host = _HOST_ALIASES.get(host, host)
+    query = [(name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+             if name.lower() not in TRACKING_PARAMS and not name.lower().startswith('utm_')]
+    path = parts.path.rstrip('/') or '/'
+    if host in _CANONICAL_HOSTS and path != '/':
+        # Their canonical post URLs end in a slash
+        path += '/'
+    return urlunsplit(('https', _CANONICAL_HOSTS.get(host, host), path, urlencode(sorted(query)), ''))
+
+
+def detect_platform(url: str) -> Optional[str]:
+    host = urlsplit(normalize_url(url)).hostname or ''
+    if host.endswith('instagram.com'):
+        return 'instagram'
+    if host.endswith('twitter.com'):
+        return 'twitter'
+    if host.endswith('linkedin.com'):
+        return 'linkedin'
+    return None
+
+
+def scrape_url(url: str, platform: str) -> Optional[Dict]:
+    """Live scrape through WebScraper (None if it found nothing)."""
+    if WebScraper is None:
+        raise RuntimeError("Web scraper not available (beautifulsoup4 not installed)")
+    if platform == 'instagram':
+        return WebScraper.scrape_instagram_reel(url)
+    if platform == 'twitter':
+        return WebScraper.scrape_twitter_tweet(url)
+    if platform == 'linkedin':
+        return WebScraper.scrape_linkedin_post(url)
+    raise ValueError(f"Unsupported platform: {platform}")
+
+
+def probe_url(url: str, etag: Optional[str], last_modified: Optional[str]) -> Tuple[int, Optional[str], Optional[str]]:
+    """(status, etag, last_modified) of a HEAD request, conditional when validators are given."""
+    headers = {}
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+    response = request_with_retry('HEAD', url, session=get_session('scrape'), retries=0, timeout=SCRAPE_PROBE_TIMEOUT,
+                                  circuit_breaker=True, headers=headers, allow_redirects=True)
+    return response.status_code, response.headers.get('ETag'), response.headers.get('Last-Modified')
+
+
+class _Entry:
+    __slots__ = ('result', 'fetched_at', 'etag', 'last_modified', 'probed')
+
+    def __init__(self, result: Dict, fetched_at: float, etag: Optional[str],
+                 last_modified: Optional[str], probed: bool):
+        self.result = result
+        self.fetched_at = fetched_at
+        self.etag = etag
+        self.last_modified = last_modified
+        self.probed = probed
+
+    def should_probe(self) -> bool:
+        # Probe once to learn whether the upstream sends validators; afterwards only if it does
+        return not self.probed or bool(self.etag or self.last_modified)
+
+
+class _InFlight:
+    __slots__ = ('done', 'result')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[Dict] = None
+
+
+class ScrapeCache:
+    """SQLite-backed scrape results with per-platform TTLs and stale-while-revalidate."""
+
+    def __init__(self, scrape: Callable[[str, str], Optional[Dict]] = scrape_url,
+                 probe: Callable[[str, Optional[str], Optional[str]], Tuple[int, Optional[str], Optional[str]]] = probe_url):
+        self.scrape = scrape
+        self.probe = probe
+        self._inflight: Dict[str, _InFlight] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_pid: Optional[int] = None
+        self._bulk_executor: Optional[ThreadPoolExecutor] = None
+        self._bulk_executor_pid: Optional[int] = None
+        self._stats = {'bulk_requests': 0, 'bulk_urls': 0, 'hits': 0, 'stale_hits': 0, 'misses': 0, 'shared': 0, 'revalidations': 0,
+                       'not_modified': 0, 'scrapes': 0, 'scrape_failures': 0, 'stale_fallbacks': 0}
+
+    @staticmethod
+    def ttl_for(platform: str) -> float:
+        return SCRAPE_TTLS.get(platform, SCRAPE_TTL_DEFAULT)
+
+    def get(self, url: str, platform: Optional[str] = None, max_age: Optional[float] = None,
+            allow_stale: bool = True, stale_fallback: bool = True) -> Optional[Dict]:
+        """Scraped result for the URL, from the cache when fresh enough.
+
+        `max_age` overrides the platform TTL. With `allow_stale` an expired
+        entry (up to SCRAPE_STALE_MAX past its TTL) is returned at once and
+        refreshed in the background; without it the caller waits for a live
+        scrape. If that scrape fails the expired entry is returned, unless
+        `stale_fallback` is False. Returns None if the post could not be
+        scraped and nothing usable is cached.
+        """
+        key = normalize_url(url)
+        platform = _PLATFORM_ALIASES.get(platform, platform) or detect_platform(key)
+        if platform is None:
+            raise ValueError(f"Unsupported URL: {url}")
+        ttl = self.ttl_for(platform) if max_age is None else max_age
+
+        entry = self._load(key)
+        if entry is not None:
+            age = time.time() - entry.fetched_at
+            if age <= ttl:
+                self._count('hits')
+                return entry.result
+            if allow_stale and age <= ttl + SCRAPE_STALE_MAX:
+                self._count('stale_hits')
+                self._revalidate_in_background(key, platform)
+                return entry.result
+        else:
+            self._count('misses')
+
+        result = self._refresh_shared(key, platform, entry)
+        if result is None and entry is not None and stale_fallback:
+            self._count('stale_fallbacks')
+            logger.warning(f"⚠️ Live scrape of {key} failed - using result from {time.time() - entry.fetched_at:.0f}s ago")
+            return entry.result
+        return result
+
+    def _refresh_shared(self, key: str, platform: str, entry: Optional[_Entry]) -> Optional[Dict]:
+        """Refresh the entry, or wait for the refresh another thread already started."""
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _InFlight()
+            else:
+                self._stats['shared'] += 1
+
+        if not leader:
+            flight.done.wait(SCRAPE_WAIT_TIMEOUT)
+            return flight.result
+
+        try:
+            flight.result = self._refresh(key, platform, entry)
+            return flight.result
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight.done.set()
+
+    def _refresh(self, key: str, platform: str, entry: Optional[_Entry]) -> Optional[Dict]:
+        etag = last_modified = None
+        probed = entry is not None and entry.probed
+        if entry is not None and entry.should_probe():
+            try:
+                status, etag, last_modified = self.probe(key, entry.etag, entry.last_modified)
+                probed = True
+                if status == 304:
+                    self._count('not_modified')
+                    self._touch(key)
+                    return entry.result
+            except requests.exceptions.RequestException as e:
+                logger.warning(f"⚠️ Revalidation probe for {key} failed: {e}")
+
+        self._count('scrapes')
+        try:
+            result = self.scrape(key, platform)
+        except Exception as e:
+            logger.warning(f"⚠️ Scrape of {key} failed: {e}")
+            result = None
+        if not result:
+            self._count('scrape_failures')
+            return None
+        self._store(key, platform, result, etag, last_modified, probed)
+        return result
+
+    def _revalidate_in_background(self, key: str, platform: str):
+        with self._lock:
+            if key in self._inflight:
+                return
+            self._stats['revalidations'] += 1
+        # Re-read in the worker: another process may have refreshed it meanwhile
+        self._get_executor().submit(self._revalidate, key, platform)
+
+    def _revalidate(self, key: str, platform: str):
+        entry = self._load(key)
+        if entry is not None and time.time() - entry.fetched_at <= self.ttl_for(platform):
+            return
+        self._refresh_shared(key, platform, entry)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Threads don't survive a fork; build the pool in the process that uses it
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=SCRAPE_REVALIDATE_WORKERS,
+                                                    thread_name_prefix='scrape-revalidate')
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def _load(self, key: str) -> Optional[_Entry]:
+        conn = get_db()
+        try:
+            row = conn.execute('''
+                SELECT result, fetched_at, etag, last_modified, probed
+                FROM scrape_cache WHERE url_key = ?
+            ''', (key,)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        try:
+            result = json.loads(row[0])
+        except (TypeError, ValueError):
+            return None
+        return _Entry(result, row[1], row[2], row[3], bool(row[4]))
+
+    def _store(self, key: str, platform: str, result: Dict, etag: Optional[str],
+               last_modified: Optional[str], probed: bool):
+        with transaction() as conn:
+            conn.execute('''
+                INSERT INTO scrape_cache (url_key, platform, result, fetched_at, etag, last_modified, probed)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url_key) DO UPDATE SET
+                    platform = excluded.platform, result = excluded.result, fetched_at = excluded.fetched_at,
+                    etag = excluded.etag, last_modified = excluded.last_modified, probed = excluded.probed
+            ''', (key, platform, json.dumps(result), time.time(), etag, last_modified, int(probed)))
+
+    def _touch(self, key: str):
+        with transaction() as conn:
+            conn.execute('UPDATE scrape_cache SET fetched_at = ? WHERE url_key = ?', (time.time(), key))
+
+    def get_many(self, items: Iterable[Tuple[str, Optional[str]]], max_age: Optional[float] = None,
+                 allow_stale: bool = True) -> Iterator[Dict]:
+        """Scrape many (url, platform) pairs, yielding each result as it finishes.
+
+        URLs are deduplicated by normalized key; each yielded dict has
+        'url' (the key), 'platform', 'inputs' (the original URLs) and either
+        'content' or 'error'. Unsupported URLs are yielded first. At most
+        SCRAPE_BULK_WORKERS scrapes of this call run at once, and no more than the
+        platform's SCRAPE_BULK_CONCURRENCY of any one platform; `max_age` and
+        `allow_stale` are as for get(). Closing the iterator early cancels
+        the scrapes that haven't started.
+        """
+        unique: 'OrderedDict[str, Dict]' = OrderedDict()
+        for url, platform in items:
+            key = normalize_url(url)
+            platform = _PLATFORM_ALIASES.get(platform, platform) or detect_platform(key)
+            job = unique.get(key)
+            if job is None:
+                job = unique[key] = {'url': key, 'platform': platform, 'inputs': []}
+            job['inputs'].append(url)
+        with self._lock:
+            self._stats['bulk_requests'] += 1
+            self._stats['bulk_urls'] += len(unique)
+
+        queues: 'OrderedDict[str, deque]' = OrderedDict()
+        for job in unique.values():
+            if job['platform'] not in SCRAPE_BULK_CONCURRENCY:
+                yield dict(job, error=f"Unsupported platform: {job['platform'] or job['url']}")
+                continue
+            queues.setdefault(job['platform'], deque()).append(job)
+
+        def scrape(job):
+            try:
+                result = self.get(job['url'], job['platform'], max_age=max_age, allow_stale=allow_stale)
+            except Exception as e:
+                return dict(job, error=str(e))
+            if not result:
+                return dict(job, error='Could not scrape content')
+            return dict(job, content=result)
+
+        executor = self._get_bulk_executor()
+        running: Dict = {}
+        per_platform = {platform: 0 for platform in queues}
+        try:
+            while queues or running:
+                # Fill free slots round-robin across platforms, within each platform's cap
+                submitted = True
+                while submitted and len(running) < SCRAPE_BULK_WORKERS:
+                    submitted = False
+                    for platform in list(queues):
+                        if len(running) >= SCRAPE_BULK_WORKERS:
+                            break
+                        if per_platform[platform] >= SCRAPE_BULK_CONCURRENCY[platform]:
+                            continue
+                        job = queues[platform].popleft()
+                        if not queues[platform]:
+                            del queues[platform]
+                        running[executor.submit(scrape, job)] = platform
+                        per_platform[platform] += 1
+                        submitted = True
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    per_platform[running.pop(future)] -= 1
+                    yield future.result()
+        finally:
+            for future in running:
+                future.cancel()
+
+    def _get_bulk_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._bulk_executor is None or self._bulk_executor_pid != os.getpid():
+                self._bulk_executor = ThreadPoolExecutor(max_workers=SCRAPE_BULK_WORKERS,
+                                                         thread_name_prefix='scrape-bulk')
+                self._bulk_executor_pid = os.getpid()
+            return self._bulk_executor
+
+    def invalidate(self, url: str):
+        with transaction() as conn:
+            conn.execute('DELETE FROM scrape_cache WHERE url_key = ?', (normalize_url(url),))
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = len(self._inflight)
+        stats['ttls'] = dict(SCRAPE_TTLS, default=SCRAPE_TTL_DEFAULT)
+        return stats
+
+
+scrape_cache = ScrapeCache()
@@ -0,0 +1,430 @@
+"""
+Persistent Shelby upload job queue.
+
+`shelby upload` can take up to two minutes, and the upload endpoint used to
+run it (plus up to three follow-up CLI calls) inside the request, holding a
+gunicorn worker the whole time. Uploads are now spooled to disk and recorded
+in the shelby_upload_jobs table; the endpoint returns a job id right away and
+clients poll the job for progress.
+
+Each worker process runs SHELBY_UPLOAD_WORKERS background threads. They
+claim jobs with a conditional UPDATE, so across all workers a job is run
+once, and hold a lease while running: a job whose worker died is picked up
+again after its lease lapses. Failed attempts are retried with backoff up to
+SHELBY_UPLOAD_MAX_ATTEMPTS. Once Shelby has accepted the bytes the job is
+marked upload_committed, and retries only redo the bookkeeping - a retry
+after an attempt that may have reached Shelby asks the CLI whether the blob
+already exists before uploading it again.
+
+Jobs record the SHA-256 of their file (hashed while it was spooled, see
+upload_ingest.py). Submitting bytes that an earlier, not-failed job already
+has returns that job instead of uploading the same content twice.
+"""
+
+import os
+import re
+import time
+import uuid
+import json
+import socket
+import sqlite3
+import logging
+import tempfile
+import threading
+import subprocess
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from db import get_db, transaction
+from shelby_status import shelby_status
+from upload_ingest import HashingSpoolFile, spool_stream
+
+logger = logging.getLogger(__name__)
+
+SHELBY_UPLOAD_WORKERS = int(os.getenv('SHELBY_UPLOAD_WORKERS', '2'))
+SHELBY_UPLOAD_MAX_ATTEMPTS = int(os.getenv('SHELBY_UPLOAD_MAX_ATTEMPTS', '3'))
+SHELBY_UPLOAD_TIMEOUT = float(os.getenv('SHELBY_UPLOAD_TIMEOUT', '120'))
+# Must outlast one CLI upload, or a slow upload would be claimed twice
+SHELBY_UPLOAD_LEASE = max(float(os.getenv('SHELBY_UPLOAD_LEASE', '300')), SHELBY_UPLOAD_TIMEOUT + 60)
+SHELBY_UPLOAD_POLL_INTERVAL = float(os.getenv('SHELBY_UPLOAD_POLL_INTERVAL', '2'))
+SHELBY_UPLOAD_SPOOL_DIR = os.getenv('SHELBY_UPLOAD_SPOOL_DIR',
+                                    os.path.join(tempfile.gettempdir(), 'creatorvault-upload-spool'))
+
+SHELBY_API_BLOBS_URL = 'https://api.shelbynet.shelby.xyz/shelby/v1/blobs'
+SHELBY_EXPLORER_URL = 'https://explorer.shelbynet.shelby.xyz'
+
+# Job states; 'running' jobs also carry a stage
+QUEUED, RUNNING, SUCCEEDED, FAILED = 'queued', 'running', 'succeeded', 'failed'
+
+# Coarse progress per stage - the CLI doesn't report byte progress
+STAGE_PROGRESS = {'queued': 0, 'uploading': 10, 'committed': 70, 'finalizing': 85, 'done': 100}
+
+_ADDRESS_RE = re.compile(r'(0x[a-f0-9]{64})')
+
+
+class UploadError(Exception):
+    """A failed upload attempt; `permanent` ones are not retried."""
+
+    def __init__(self, message: str, permanent: bool = False):
+        super().__init__(message)
+        self.permanent = permanent
+
+
+def _retry_delay(attempts: int) -> float:
+    return min(300.0, 5.0 * 2 ** (attempts - 1))
+
+
+def parse_transaction_hash(output: str) -> Optional[str]:
+    """Transaction hash from the CLI's Aptos explorer link, else any 64-hex string."""
+    match = re.search(r'explorer\.aptoslabs\.com/txn/(0x[a-f0-9]{64})', output)
+    if match is None:
+        match = _ADDRESS_RE.search(output)
+    return match.group(1) if match else None
+
+
+def account_address_from_output(output: str) -> Optional[str]:
+    """Uploading account from the CLI's Shelby explorer link, if present."""
+    match = re.search(r'explorer\.shelby\.xyz/shelbynet/account/(0x[a-f0-9]{64})', output)
+    return match.group(1) if match else None
+
+
+def _blob_exists(blob_name: str) -> bool:
+    try:
+        result = subprocess.run(['shelby', 'blob', 'info', blob_name], capture_output=True, text=True, timeout=10)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not check blob {blob_name}: {e}")
+        return False
+    return result.returncode == 0
+
+
+def upload_result(blob_name: str, expiration: Optional[str], account_address: Optional[str],
+                  transaction_hash: Optional[str], output: str) -> Dict:
+    """The response shape the synchronous upload endpoint used to return."""
+    if account_address:
+        blob_url = f"{SHELBY_API_BLOBS_URL}/{account_address}/{blob_name}"
+        explorer_url = f"{SHELBY_EXPLORER_URL}/account/{account_address}/blobs?name={blob_name}"
+    else:
+        blob_url = f"shelby://{blob_name}"
+        explorer_url = f"{SHELBY_EXPLORER_URL}/blob/{blob_name}"
+
+    expiration_date = datetime.now() + timedelta(days=365)
+    if expiration:
+        try:
+            expiration_date = datetime.fromisoformat(expiration.replace('Z', '+00:00'))
+        except ValueError:
+            pass
+
+    return {
+        "blobUrl": blob_url,
+        "blobId": blob_name,
+        "blobName": blob_name,
+        "accountAddress": account_address,
+        "transactionHash": transaction_hash,
+        "expirationDate": expiration_date.isoformat(),
+        "explorerUrl": explorer_url,
+        "aptosExplorerUrl": f"https://explorer.aptoslabs.com/txn/{transaction_hash}?network=shelbynet" if transaction_hash else None,
+        "rawOutput": output[:200]
+    }
+
+
+class UploadJobQueue:
+    """Background workers over the shelby_upload_jobs table."""
+
+    def __init__(self, workers: int = SHELBY_UPLOAD_WORKERS, spool_dir: str = SHELBY_UPLOAD_SPOOL_DIR):
+        self.workers = workers
+        self.spool_dir = spool_dir
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._threads: List[threading.Thread] = []
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._stats = {'submitted': 0, 'deduplicated': 0, 'claimed': 0, 'recovered': 0, 'succeeded': 0,
+                       'retried': 0, 'failed': 0, 'reupload_skipped': 0}
+
+    def start(self):
+        """Start this process's workers (they also pick up jobs left by dead workers)."""
+        with self._lock:
+            # Threads don't survive a fork
+            if os.getpid() != int(self.worker_id.rsplit(':', 1)[1]):
+                self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+                self._threads = []
+            self._threads = [t for t in self._threads if t.is_alive()]
+            for i in range(len(self._threads), self.workers):
+                thread = threading.Thread(target=self._worker_loop, name=f'shelby-upload-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, file_storage, blob_name: str, expiration: Optional[str] = None) -> Tuple[str, bool]:
+        """Queue an uploaded file (werkzeug FileStorage). Returns (job_id, deduplicated)."""
+        spooled = file_storage.stream
+        if not isinstance(spooled, HashingSpoolFile):
+            # Not parsed by upload_ingest.SpoolingRequest: copy it into the spool
+            spooled = spool_stream(file_storage.stream, self.spool_dir)
+        return self.submit_spooled(spooled, file_storage.filename, blob_name, expiration)
+
+    def submit_spooled(self, spooled: HashingSpoolFile, filename: Optional[str], blob_name: str,
+                       expiration: Optional[str] = None) -> Tuple[str, bool]:
+        """Queue a spooled upload, or return the job that already has the same bytes.
+
+        Returns (job_id, deduplicated). A deduplicated upload's spool file is
+        discarded; the existing job may still be queued or running.
+        """
+        existing = self._job_for_hash(spooled.sha256)
+        if existing is not None:
+            return self._deduplicated(spooled, existing)
+
+        job_id = uuid.uuid4().hex
+        file_path = os.path.join(self.spool_dir, job_id + os.path.splitext(filename or '')[1])
+        spooled.claim(file_path)
+        try:
+            with transaction() as conn:
+                conn.execute('''
+                    INSERT INTO shelby_upload_jobs
+                        (id, status, stage, progress, blob_name, expiration, file_path, file_name,
+                         file_size, content_hash, max_attempts, next_attempt_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (job_id, QUEUED, 'queued', STAGE_PROGRESS['queued'], blob_name, expiration, file_path,
+                      filename, spooled.size, spooled.sha256, SHELBY_UPLOAD_MAX_ATTEMPTS, time.time()))
+        except sqlite3.IntegrityError:
+            # An identical upload was queued between the lookup and the insert
+            existing = self._job_for_hash(spooled.sha256)
+            if existing is None:
+                os.unlink(file_path)
+                raise
+            return self._deduplicated(spooled, existing)
+        except Exception:
+            os.unlink(file_path)
+            raise
+        with self._lock:
+            self._stats['submitted'] += 1
+        logger.info(f"📤 Queued Shelby upload {job_id} for blob {blob_name} "
+                    f"({spooled.size} bytes, {spooled.sha256[:12]})")
+        self.start()
+        self._wakeup.set()
+        return job_id, False
+
+    def _deduplicated(self, spooled: HashingSpoolFile, job_id: str) -> Tuple[str, bool]:
+        if spooled.claimed:
+            os.unlink(spooled.path)
+        else:
+            spooled.discard()
+        with self._lock:
+            self._stats['deduplicated'] += 1
+        logger.info(f"♻️ Upload {spooled.sha256[:12]} matches Shelby upload job {job_id} - not uploading again")
+        return job_id, True
+
+    def _job_for_hash(self, content_hash: str) -> Optional[str]:
+        conn = get_db()
+        try:
+            row = conn.execute('''
+                SELECT id FROM shelby_upload_jobs
+                WHERE content_hash = ? AND status != ?
+                ORDER BY created_at LIMIT 1
+            ''', (content_hash, FAILED)).fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else None
+
+    def status(self, job_id: str) -> Optional[Dict]:
+        conn = get_db()
+        try:
+            row = conn.execute('''
+                SELECT id, status, stage, progress, blob_name, file_size, attempts, max_attempts,
+                       upload_committed, result, error, created_at, updated_at, content_hash
+                FROM shelby_upload_jobs WHERE id = ?
+            ''', (job_id,)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        job = {
+            "jobId": row[0],
+            "status": row[1],
+            "stage": row[2],
+            "progress": row[3],
+            "blobName": row[4],
+            "fileSize": row[5],
+            "contentHash": row[13],
+            "attempts": row[6],
+            "maxAttempts": row[7],
+            "uploadCommitted": bool(row[8]),
+            "error": row[10],
+            "createdAt": row[11],
+            "updatedAt": row[12]
+        }
+        if row[9]:
+            job["result"] = json.loads(row[9])
+        return job
+
+    def _claim(self) -> Optional[Dict]:
+        """Atomically take the oldest runnable job: queued and due, or running with a lapsed lease."""
+        now = time.time()
+        with transaction() as conn:
+            row = conn.execute('''
+                SELECT id, status FROM shelby_upload_jobs
+                WHERE (status = ? AND next_attempt_at <= ?) OR (status = ? AND lease_expires_at < ?)
+                ORDER BY created_at LIMIT 1
+            ''', (QUEUED, now, RUNNING, now)).fetchone()
+            if row is None:
+                return None
+            job_id, previous_status = row
+            # Another worker may have claimed it since the SELECT
+            claimed = conn.execute('''
+                UPDATE shelby_upload_jobs
+                SET status = ?, stage = CASE WHEN upload_committed THEN 'committed' ELSE 'uploading' END,
+                    attempts = attempts + 1, claimed_by = ?, lease_expires_at = ?,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = ? AND ((status = ? AND next_attempt_at <= ?) OR (status = ? AND lease_expires_at < ?))
+            ''', (RUNNING, self.worker_id, now + SHELBY_UPLOAD_LEASE,
+                  job_id, QUEUED, now, RUNNING, now)).rowcount
+            if not claimed:
+                return None
+            job = conn.execute('''
+                SELECT id, blob_name, expiration, file_path, attempts, max_attempts, upload_committed,
+                       transaction_hash, account_address, cli_output
+                FROM shelby_upload_jobs WHERE id = ?
+            ''', (job_id,)).fetchone()
+
+        with self._lock:
+            self._stats['claimed'] += 1
+            if previous_status == RUNNING:
+                self._stats['recovered'] += 1
+        if previous_status == RUNNING:
+            logger.warning(f"♻️ Recovered Shelby upload {job_id} after its lease expired")
+        keys = ('id', 'blob_name', 'expiration', 'file_path', 'attempts', 'max_attempts', 'upload_committed',
+                'transaction_hash', 'account_address', 'cli_output')
+        return dict(zip(keys, job))
+
+    def _update(self, job_id: str, **fields):
+        assignments = ', '.join(f'{column} = ?' for column in fields)
+        with transaction() as conn:
+            conn.execute(f'''
+                UPDATE shelby_upload_jobs SET {assignments}, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ? AND claimed_by = ?
+            ''', tuple(fields.values()) + (job_id, self.worker_id))
+
+    def _set_stage(self, job_id: str, stage: str, **fields):
+        # Every stage change also renews the lease
+        self._update(job_id, stage=stage, progress=STAGE_PROGRESS[stage],
+                     lease_expires_at=time.time() + SHELBY_UPLOAD_LEASE, **fields)
+
+    def _worker_loop(self):
+        while True:
+            try:
+                job = self._claim()
+            except Exception as e:
+                logger.error(f"❌ Could not claim Shelby upload job: {e}")
+                job = None
+            if job is None:
+                self._wakeup.wait(SHELBY_UPLOAD_POLL_INTERVAL)
+                self._wakeup.clear()
+                continue
+            try:
+                self._run(job)
+            except UploadError as e:
+                self._failed_attempt(job, str(e), e.permanent)
+            except Exception as e:
+                logger.error(f"❌ Shelby upload {job['id']} crashed: {e}")
+                self._failed_attempt(job, str(e), False)
+
+    def _upload(self, job: Dict) -> str:
+        """Run `shelby upload` for the job's spooled file; returns the CLI output."""
+        if not job['file_path'] or not os.path.exists(job['file_path']):
+            raise UploadError("Spooled upload file is missing", permanent=True)
+        cmd = ['shelby', 'upload', job['file_path'], job['blob_name'],
+               '-e', job['expiration'] or 'in 365 days', '--assume-yes']
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=SHELBY_UPLOAD_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            raise UploadError(f"shelby upload timed out after {SHELBY_UPLOAD_TIMEOUT:g}s")
+        except OSError as e:
+            raise UploadError(f"shelby CLI not available: {e}", permanent=True)
+
+        output = result.stdout + result.stderr
+        if result.returncode != 0:
+            logger.error(f"Shelby CLI upload failed: {result.stderr}")
+            if "No configuration file found" in result.stderr or "shelby init" in result.stderr:
+                raise UploadError("Shelby CLI not configured. Please run 'shelby init' to set up Shelby Protocol.",
+                                  permanent=True)
+            if 'already exists' in output.lower():
+                logger.info(f"📦 Blob {job['blob_name']} already on Shelby - not re-uploading")
+                return output
+            raise UploadError(f"Shelby upload failed: {result.stderr[:200]}")
+        return output
+
+    def _run(self, job: Dict):
+        job_id = job['id']
+        output = job['cli_output'] or ''
+        transaction_hash = job['transaction_hash']
+
+        if not job['upload_committed']:
+            # An earlier attempt may have reached Shelby before its worker died or timed out
+            if job['attempts'] > 1 and _blob_exists(job['blob_name']):
+                logger.info(f"📦 Blob {job['blob_name']} was already accepted - skipping re-upload")
+                with self._lock:
+                    self._stats['reupload_skipped'] += 1
+            else:
+                output = self._upload(job)
+                transaction_hash = parse_transaction_hash(output)
+            self._set_stage(job_id, 'committed', upload_committed=1, transaction_hash=transaction_hash,
+                            cli_output=output[:4000])
+        else:
+            with self._lock:
+                self._stats['reupload_skipped'] += 1
+
+        self._set_stage(job_id, 'finalizing')
+        account_address = (job['account_address'] or account_address_from_output(output)
+                           or shelby_status.account_address())
+        result = upload_result(job['blob_name'], job['expiration'], account_address, transaction_hash, output)
+        self._update(job_id, status=SUCCEEDED, stage='done', progress=STAGE_PROGRESS['done'],
+                     account_address=account_address, result=json.dumps(result), error=None,
+                     lease_expires_at=None)
+        self._discard_spool(job)
+        # List the new blob now instead of after SHELBY_BLOBS_TTL (this worker's cache only)
+        shelby_status.expire('blobs')
+        with self._lock:
+            self._stats['succeeded'] += 1
+        logger.info(f"✅ Upload complete! Job {job_id}, blob: {job['blob_name']}, account: {account_address}")
+
+    def _failed_attempt(self, job: Dict, error: str, permanent: bool):
+        job_id = job['id']
+        try:
+            if permanent or job['attempts'] >= job['max_attempts']:
+                self._update(job_id, status=FAILED, error=error, lease_expires_at=None)
+                self._discard_spool(job)
+                with self._lock:
+                    self._stats['failed'] += 1
+                logger.error(f"❌ Shelby upload {job_id} failed after {job['attempts']} attempt(s): {error}")
+            else:
+                delay = _retry_delay(job['attempts'])
+                self._update(job_id, status=QUEUED, error=error, lease_expires_at=None,
+                             next_attempt_at=time.time() + delay)
+                with self._lock:
+                    self._stats['retried'] += 1
+                logger.warning(f"⚠️ Shelby upload {job_id} attempt {job['attempts']} failed, retrying in {delay:g}s: {error}")
+        except Exception as e:
+            # The lease lapses and another worker picks the job up
+            logger.error(f"❌ Could not record failure for Shelby upload {job_id}: {e}")
+
+    @staticmethod
+    def _discard_spool(job: Dict):
+        try:
+            if job['file_path']:
+                os.unlink(job['file_path'])
+        except FileNotFoundError:
+            pass
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['workers'] = sum(1 for t in self._threads if t.is_alive())
+        conn = get_db()
+        try:
+            stats['jobs'] = dict(conn.execute(
+                'SELECT status, COUNT(*) FROM shelby_upload_jobs GROUP BY status'
+            ).fetchall())
+        finally:
+            conn.close()
+        return stats
+
+
+upload_jobs = UploadJobQueue()
@@ -0,0 +1,322 @@
+"""
+Cached Shelby account status (address, balances, blob listing).
+
+/api/shelby/account-balance and /api/shelby/metadata used to spawn the
+`shelby` CLI on every call - and the balance endpoint a second time to find
+the account address - each with a 10-30 s timeout. Those values change
+slowly, so a background thread per worker now runs the CLI, parses its
+output and keeps the results in memory; request handlers only read them.
+
+Each value has a TTL and is refreshed once it expires, as long as something
+read it within SHELBY_STATUS_IDLE seconds (idle workers stop spawning the
+CLI). Readers get the last good value even while it is being refreshed or
+after a failed refresh, with its age. Only a read before the first refresh
+has finished waits - on the refresher, up to SHELBY_STATUS_COLD_WAIT seconds.
+
+A value known to be out of date (a blob uploaded since the last listing) is
+expired early: expire() wakes the refresher, and get_refreshed() also waits
+for that refresh, at most once per SHELBY_STATUS_MIN_REFRESH seconds.
+"""
+
+import os
+import re
+import time
+import logging
+import threading
+import subprocess
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SHELBY_ACCOUNT_TTL = float(os.getenv('SHELBY_ACCOUNT_TTL', '3600'))
+SHELBY_BALANCE_TTL = float(os.getenv('SHELBY_BALANCE_TTL', '30'))
+SHELBY_BLOBS_TTL = float(os.getenv('SHELBY_BLOBS_TTL', '60'))
+SHELBY_STATUS_IDLE = float(os.getenv('SHELBY_STATUS_IDLE', '600'))
+SHELBY_STATUS_COLD_WAIT = float(os.getenv('SHELBY_STATUS_COLD_WAIT', '10'))
+SHELBY_STATUS_MIN_REFRESH = float(os.getenv('SHELBY_STATUS_MIN_REFRESH', '5'))
+SHELBY_CLI_TIMEOUT = float(os.getenv('SHELBY_CLI_TIMEOUT', '30'))
+
+_ADDRESS_RE = re.compile(r'(0x[a-f0-9]{64})')
+
+
+class ShelbyStatusUnavailable(Exception):
+    """No value has been loaded yet (the CLI failed or is still running)."""
+
+
+def run_shelby(*args: str, timeout: float = SHELBY_CLI_TIMEOUT) -> str:
+    """stdout of `shelby <args>`; raises RuntimeError on a non-zero exit."""
+    result = subprocess.run(['shelby', *args], capture_output=True, text=True, timeout=timeout)
+    if result.returncode != 0:
+        raise RuntimeError(f"shelby {' '.join(args)} failed: {(result.stderr or result.stdout).strip()[:300]}")
+    return result.stdout
+
+
+def parse_account_address(output: str) -> Optional[str]:
+    """Default account from `shelby account list` (or an `Address:` line)."""
+    # Format: │ default │ 0x<address> │ ...
+    match = (re.search(r'default.*?│\s*(0x[a-f0-9]{64})', output)
+             or re.search(r'Address:\s+(0x[a-f0-9]{64})', output)
+             or _ADDRESS_RE.search(output))
+    return match.group(1) if match else None
+
+
+def parse_balance_output(output: str) -> Dict[str, Any]:
+    """APT and ShelbyUSD balances from the `shelby account balance` table."""
+    apt_balance = 0.0
+    shelbyusd_balance = 0.0
+    # APT row: │ APT     │ ... │ 29.989454 APT    │
+    apt_re = re.compile(r'│\s+APT\s+│[^│]+│\s+([\d.]+)\s+APT', re.IGNORECASE)
+    # ShelbyUSD wraps over two rows: │ ShelbyU │ ... │ 29.79001344      │
+    usd_re = re.compile(r'│\s+ShelbyU[^│]+│[^│]+│\s+([\d.]+)\s+│', re.IGNORECASE)
+
+    # Whole output first, then line by line for tables that wrap differently
+    for text in [output] + output.split('\n'):
+        if not apt_balance:
+            match = apt_re.search(text)
+            if match:
+                try:
+                    apt_balance = float(match.group(1))
+                except ValueError:
+                    pass
+        if not shelbyusd_balance:
+            match = usd_re.search(text)
+            if match:
+                try:
+                    shelbyusd_balance = float(match.group(1))
+                except ValueError:
+                    pass
+        if apt_balance and shelbyusd_balance:
+            break
+
+    address_match = re.search(r'Address:\s+(0x[a-f0-9]{64})', output)
+    return {
+        "apt_balance": apt_balance,
+        "shelbyusd_balance": shelbyusd_balance,
+        "account_address": address_match.group(1) if address_match else None,
+        "raw_output": output[:500]
+    }
+
+
+def parse_blob_table(output: str) -> List[Dict[str, str]]:
+    """Rows of the `shelby account blobs` table as {column: value} dicts.
+
+    The first row with a "name" column is the header. The CLI wraps long
+    cells onto a second line whose other cells are blank; such a row (blank
+    wherever the row above has a value) is joined into the row above.
+    """
+    header: Optional[List[str]] = None
+    rows: List[Dict[str, str]] = []
+    for line in output.split('\n'):
+        if '│' not in line:
+            continue
+        cells = [cell.strip() for cell in line.strip().strip('│').split('│')]
+        if header is None:
+            if any('name' in cell.lower() for cell in cells):
+                header = [cell.lower().replace(' ', '_') for cell in cells]
+            continue
+        if len(cells) != len(header):
+            continue
+        if rows and any(not cell and rows[-1].get(column) for column, cell in zip(header, cells)):
+            for column, cell in zip(header, cells):
+                if cell:
+                    rows[-1][column] = (rows[-1].get(column, '') + cell).strip()
+            continue
+        rows.append(dict(zip(header, cells)))
+    return rows
+
+
+def _load_account() -> Optional[str]:
+    address = parse_account_address(run_shelby('account', 'list', timeout=10))
+    if address is None:
+        raise RuntimeError("no account address in 'shelby account list' output")
+    return address
+
+
+def _load_balance() -> Dict[str, Any]:
+    return parse_balance_output(run_shelby('account', 'balance', timeout=10))
+
+
+def _load_blobs() -> List[Dict[str, str]]:
+    return parse_blob_table(run_shelby('account', 'blobs'))
+
+
+class _Entry:
+    __slots__ = ('loader', 'ttl', 'value', 'loaded', 'fetched_at', 'attempted_at', 'retry_at', 'expired',
+                 'error', 'last_read', 'ready')
+
+    def __init__(self, loader: Callable[[], Any], ttl: float):
+        self.loader = loader
+        self.ttl = ttl
+        self.value = None
+        self.loaded = False
+        self.fetched_at = 0.0
+        # When the last refresh (successful or not) finished
+        self.attempted_at = 0.0
+        # After a failed refresh: when to try again (0 = on TTL expiry)
+        self.retry_at = 0.0
+        # Load on the refresher's first pass
+        self.expired = True
+        self.error: Optional[str] = None
+        # Read once "at start" so the first refresh warms every entry
+        self.last_read = time.monotonic()
+        self.ready = threading.Event()
+
+
+class ShelbyStatus:
+    """TTL cache of CLI-derived values, refreshed off the request path."""
+
+    def __init__(self, loaders: Dict[str, Tuple[Callable[[], Any], float]]):
+        self._entries = {name: _Entry(loader, ttl) for name, (loader, ttl) in loaders.items()}
+        self._lock = threading.Lock()
+        self._refreshed = threading.Condition(self._lock)
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {'reads': 0, 'stale_reads': 0, 'cold_waits': 0, 'refreshes': 0, 'refresh_failures': 0,
+                       'early_refreshes': 0}
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._refresh_loop, name='shelby-status', daemon=True)
+                self._thread.start()
+
+    def get(self, name: str, wait: float = SHELBY_STATUS_COLD_WAIT) -> Tuple[Any, float]:
+        """(value, age_seconds) from memory.
+
+        Raises ShelbyStatusUnavailable if nothing has loaded within `wait`
+        seconds (only possible before the first successful refresh).
+        """
+        entry = self._entries[name]
+        with self._lock:
+            entry.last_read = time.monotonic()
+            self._stats['reads'] += 1
+            stale = entry.loaded and entry.last_read - entry.fetched_at > entry.ttl
+            if stale:
+                self._stats['stale_reads'] += 1
+            loaded = entry.loaded
+            if not loaded:
+                self._stats['cold_waits'] += 1
+        if stale:
+            # The refresher may be sleeping because nobody read this for a while
+            self._wakeup.set()
+        if not loaded:
+            self.start()
+            self._wakeup.set()
+            entry.ready.wait(wait)
+        with self._lock:
+            if not entry.loaded:
+                raise ShelbyStatusUnavailable(entry.error or f"Shelby {name} not loaded yet")
+            return entry.value, time.monotonic() - entry.fetched_at
+
+    def expire(self, name: str):
+        """Mark a value out of date so the refresher reloads it now."""
+        entry = self._entries[name]
+        with self._lock:
+            entry.expired = True
+            entry.last_read = time.monotonic()
+        self.start()
+        self._wakeup.set()
+
+    def get_refreshed(self, name: str, wait: float = SHELBY_STATUS_COLD_WAIT) -> Tuple[Any, float]:
+        """Like get(), but first reload a value that missed something just created.
+
+        Waits up to `wait` seconds for a refresh started after this call, then
+        returns whatever is loaded. Skips the refresh if one finished within
+        SHELBY_STATUS_MIN_REFRESH seconds, so repeated misses don't hammer the CLI.
+        """
+        entry = self._entries[name]
+        requested = time.monotonic()
+        with self._lock:
+            recent = requested - entry.attempted_at < SHELBY_STATUS_MIN_REFRESH
+            if not recent:
+                self._stats['early_refreshes'] += 1
+        if not recent:
+            self.expire(name)
+            give_up_at = requested + wait
+            with self._lock:
+                while entry.attempted_at < requested:
+                    remaining = give_up_at - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._refreshed.wait(remaining)
+        return self.get(name, wait=max(0.0, requested + wait - time.monotonic()))
+
+    def refresh(self, name: str) -> bool:
+        """Run the loader now (refresher thread); keeps the old value on failure."""
+        entry = self._entries[name]
+        try:
+            value = entry.loader()
+        except Exception as e:
+            with self._lock:
+                entry.error = str(e)
+                entry.attempted_at = time.monotonic()
+                # Retry failures sooner than a full TTL, but don't hammer the CLI;
+                # fetched_at stays the time of the last good value
+                entry.retry_at = entry.attempted_at + min(entry.ttl, 15)
+                entry.expired = False
+                self._stats['refresh_failures'] += 1
+                self._refreshed.notify_all()
+            logger.warning(f"⚠️ Shelby {name} refresh failed: {e}")
+            entry.ready.set()
+            return False
+        with self._lock:
+            entry.value = value
+            entry.loaded = True
+            entry.fetched_at = time.monotonic()
+            entry.attempted_at = entry.fetched_at
+            entry.retry_at = 0.0
+            entry.expired = False
+            entry.error = None
+            self._stats['refreshes'] += 1
+            self._refreshed.notify_all()
+        entry.ready.set()
+        return True
+
+    def _refresh_loop(self):
+        while True:
+            now = time.monotonic()
+            due = []
+            next_due = now + 60
+            with self._lock:
+                for name, entry in self._entries.items():
+                    if now - entry.last_read > SHELBY_STATUS_IDLE:
+                        continue
+                    expires_at = entry.retry_at or entry.fetched_at + entry.ttl
+                    if entry.expired or expires_at <= now:
+                        due.append(name)
+                    else:
+                        next_due = min(next_due, expires_at)
+            for name in due:
+                self.refresh(name)
+            if not due:
+                self._wakeup.wait(max(0.1, next_due - time.monotonic()))
+                self._wakeup.clear()
+
+    def account_address(self) -> Optional[str]:
+        try:
+            return self.get('account')[0]
+        except ShelbyStatusUnavailable:
+            return None
+
+    def stats(self) -> Dict:
+        now = time.monotonic()
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = {
+                name: {
+                    'loaded': entry.loaded,
+                    'age_seconds': round(now - entry.fetched_at, 1) if entry.loaded else None,
+                    'ttl': entry.ttl,
+                    'error': entry.error,
+                    'retry_in_seconds': round(max(0.0, entry.retry_at - now), 1) if entry.retry_at else None,
+                }
+                for name, entry in self._entries.items()
+            }
+        return stats
+
+
+shelby_status = ShelbyStatus({
+    'account': (_load_account, SHELBY_ACCOUNT_TTL),
+    'balance': (_load_balance, SHELBY_BALANCE_TTL),
+    'blobs': (_load_blobs, SHELBY_BLOBS_TTL),
+})
@@ -0,0 +1,91 @@
+"""
+OHLCV candles for token price charts.
+
+Charts used to fetch up to `limit` raw trades from /api/trades/<token> and
+build candles in the browser, so a busy token shipped thousands of rows per
+chart load. Trades are now also rolled up into token_candles at 1m, 5m, 1h
+and 1d - by a trigger on trades, so every insert path (trade_token, the
+bonding curve buy/sell endpoints, sync_contract_trade) keeps them current in
+the same transaction.
+
+load_candles() reads the finest stored resolution that covers the requested
+range in at most `max_points` candles and, if even that is too many, merges
+neighbouring candles up to a wider interval. Candles are returned as
+parallel arrays (t/o/h/l/c/v/...) rather than one object per candle.
+"""
+
+import os
+import math
+from typing import Any, Dict, List, Optional, Sequence
+
+# Must match the resolutions maintained by migration 13
+CANDLE_RESOLUTIONS = {'1m': 60, '5m': 300, '1h': 3600, '1d': 86400}
+CANDLE_MAX_POINTS = int(os.getenv('CANDLE_MAX_POINTS', '500'))
+
+# Columns: bucket_start, open, high, low, close, volume, quote_volume, trade_count, open_at, close_at
+_T, _O, _H, _L, _C, _V, _QV, _N, _OPEN_AT, _CLOSE_AT = range(10)
+
+
+def pick_resolution(span: float, max_points: int, minimum: int = 60) -> int:
+    """Finest stored resolution (not below `minimum`) that covers `span` seconds in max_points candles."""
+    for seconds in sorted(CANDLE_RESOLUTIONS.values()):
+        if seconds >= minimum and span / seconds <= max_points:
+            return seconds
+    return max(CANDLE_RESOLUTIONS.values())
+
+
+def _merge(rows: Sequence[tuple], interval: int) -> List[list]:
+    """Combine candles (sorted by bucket_start) into buckets of `interval` seconds."""
+    merged: List[list] = []
+    for row in rows:
+        start = row[_T] // interval * interval
+        if merged and merged[-1][_T] == start:
+            candle = merged[-1]
+            if row[_OPEN_AT] < candle[_OPEN_AT]:
+                candle[_O], candle[_OPEN_AT] = row[_O], row[_OPEN_AT]
+            if row[_CLOSE_AT] >= candle[_CLOSE_AT]:
+                candle[_C], candle[_CLOSE_AT] = row[_C], row[_CLOSE_AT]
+            candle[_H] = max(candle[_H], row[_H])
+            candle[_L] = min(candle[_L], row[_L])
+            candle[_V] += row[_V]
+            candle[_QV] += row[_QV]
+            candle[_N] += row[_N]
+        else:
+            merged.append([start] + list(row[1:]))
+    return merged
+
+
+def load_candles(conn, asa_ids: Sequence[str], start: float, end: float,
+                 resolution: Optional[str] = None, max_points: int = CANDLE_MAX_POINTS) -> Dict[str, Any]:
+    """Candles of the trades in [start, end] (epoch seconds) for any of `asa_ids`, as parallel arrays.
+
+    `resolution` ('1m'/'5m'/'1h'/'1d') is a lower bound: a wider range is
+    served from a coarser table and, past 1d, merged to keep <= max_points.
+    """
+    max_points = max(1, min(max_points, CANDLE_MAX_POINTS))
+    span = max(end - start, 1)
+    base = pick_resolution(span, max_points, CANDLE_RESOLUTIONS.get(resolution, 60))
+    interval = base * max(1, math.ceil(span / base / max_points))
+
+    placeholders = ','.join('?' * len(asa_ids))
+    rows = conn.execute(f'''
+        SELECT bucket_start, open, high, low, close, volume, quote_volume, trade_count, open_at, close_at
+        FROM token_candles
+        WHERE asa_id IN ({placeholders}) AND resolution = ? AND bucket_start >= ? AND bucket_start <= ?
+        ORDER BY bucket_start, open_at
+    ''', (*asa_ids, base, int(start) // base * base, int(end))).fetchall()
+    # Several ids of one token share buckets; wide ranges merge neighbours
+    candles = _merge(rows, interval)
+
+    return {
+        "resolution": next(label for label, seconds in CANDLE_RESOLUTIONS.items() if seconds == base),
+        "interval": interval,
+        "t": [candle[_T] for candle in candles],
+        "o": [candle[_O] for candle in candles],
+        "h": [candle[_H] for candle in candles],
+        "l": [candle[_L] for candle in candles],
+        "c": [candle[_C] for candle in candles],
+        "v": [candle[_V] for candle in candles],
+        "qv": [candle[_QV] for candle in candles],
+        "n": [candle[_N] for candle in candles],
+    }
@@ -0,0 +1,102 @@
+"""
+Token -> creator_token module address resolution cache.
+
+Legacy tokens only exist under OLD_MODULE_ADDRESS, so a lookup that doesn't
+know where a token lives has to ask both modules. Once a view call finds the
+token, the module is remembered in memory and on the token's row
+(tokens.contract_module_address), so later lookups - in this worker, other
+workers and after restarts - go straight to the right module.
+"""
+
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+from db import get_db, transaction
+
+logger = logging.getLogger(__name__)
+
+
+def _key(creator_address: str, token_id) -> Tuple[str, str]:
+    if isinstance(token_id, (int, float)):
+        token_id = str(int(token_id))
+    return (creator_address or '').lower(), str(token_id)
+
+
+class TokenModuleCache:
+    """In-memory layer over tokens.contract_module_address."""
+
+    def __init__(self):
+        self._modules: Dict[Tuple[str, str], str] = {}
+        self._lock = threading.Lock()
+        self._stats = {'memory_hits': 0, 'db_hits': 0, 'misses': 0, 'remembered': 0, 'forgotten': 0}
+
+    def get(self, creator_address: str, token_id) -> Optional[str]:
+        key = _key(creator_address, token_id)
+        with self._lock:
+            module = self._modules.get(key)
+            if module is not None:
+                self._stats['memory_hits'] += 1
+                return module
+
+        conn = get_db()
+        try:
+            row = conn.execute('''
+                SELECT contract_module_address FROM tokens
+                WHERE contract_module_address IS NOT NULL
+                  AND ((creator = ? AND content_id = ?) OR token_id = ?)
+                LIMIT 1
+            ''', (creator_address, key[1], key[1])).fetchone()
+        finally:
+            conn.close()
+
+        with self._lock:
+            if row is None:
+                self._stats['misses'] += 1
+                return None
+            self._stats['db_hits'] += 1
+            self._modules[key] = row[0]
+        return row[0]
+
+    def remember(self, creator_address: str, token_id, module_address: str):
+        """Record where a token was found (no-op if already known)."""
+        key = _key(creator_address, token_id)
+        with self._lock:
+            if self._modules.get(key) == module_address:
+                return
+            self._modules[key] = module_address
+            self._stats['remembered'] += 1
+        try:
+            with transaction() as conn:
+                conn.execute('''
+                    UPDATE tokens SET contract_module_address = ?
+                    WHERE ((creator = ? AND content_id = ?) OR token_id = ?)
+                      AND contract_module_address IS NOT ?
+                ''', (module_address, creator_address, key[1], key[1], module_address))
+        except Exception as e:
+            # Memory still has it; the row is filled on the next discovery
+            logger.warning(f"⚠️ Could not persist contract module for token {key[1][:50]}: {e}")
+
+    def forget(self, creator_address: str, token_id):
+        """Drop a resolution the node no longer confirms."""
+        key = _key(creator_address, token_id)
+        with self._lock:
+            self._modules.pop(key, None)
+            self._stats['forgotten'] += 1
+        try:
+            with transaction() as conn:
+                conn.execute('''
+                    UPDATE tokens SET contract_module_address = NULL
+                    WHERE (creator = ? AND content_id = ?) OR token_id = ?
+                ''', (creator_address, key[1], key[1]))
+        except Exception as e:
+            logger.warning(f"⚠️ Could not clear contract module for token {key[1][:50]}: {e}")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._modules)
+        return stats
+
+
+token_module_cache = TokenModuleCache()
@@ -0,0 +1,116 @@
+"""
+Single-pass ingestion of upload bodies into the Shelby upload spool.
+
+By default Werkzeug parses a multipart upload into an anonymous temp file,
+and the upload endpoint then copied it into the spool with file.save() -
+every byte was written to disk twice, and read back a third time to hash it.
+Here the upload is written straight into the spool directory as it is
+parsed (or, for raw-body uploads, as it is read off the socket), with its
+SHA-256 computed on the way, so the job queue can hand the same file to the
+Shelby CLI and dedupe identical uploads by content hash.
+
+Views opt in by setting `request.spool_uploads = True` before touching
+request.files; spool files that no job claims are deleted when the request
+closes.
+"""
+
+import os
+import hashlib
+import logging
+import tempfile
+from typing import IO, List, Optional
+
+from flask import Request
+
+logger = logging.getLogger(__name__)
+
+SHELBY_UPLOAD_MAX_BYTES = int(os.getenv('SHELBY_UPLOAD_MAX_BYTES', str(2 * 1024 ** 3)))
+
+_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLarge(Exception):
+    """The upload body exceeded SHELBY_UPLOAD_MAX_BYTES."""
+
+
+class HashingSpoolFile:
+    """Writable spool file that hashes and counts what is written to it."""
+
+    def __init__(self, spool_dir: str, max_bytes: int = SHELBY_UPLOAD_MAX_BYTES):
+        os.makedirs(spool_dir, exist_ok=True)
+        self._file = tempfile.NamedTemporaryFile(dir=spool_dir, prefix='ingest-', delete=False)
+        self.path = self._file.name
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._digest = hashlib.sha256()
+        self.claimed = False
+
+    def write(self, data) -> int:
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            raise UploadTooLarge(f"upload exceeds {self.max_bytes} bytes")
+        self._digest.update(data)
+        return self._file.write(data)
+
+    @property
+    def sha256(self) -> str:
+        return self._digest.hexdigest()
+
+    def claim(self, path: str):
+        """Move the spooled bytes to `path`; the request no longer owns them."""
+        self._file.close()
+        os.replace(self.path, path)
+        self.path = path
+        self.claimed = True
+
+    def discard(self):
+        self._file.close()
+        if not self.claimed:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+    def __getattr__(self, name):
+        # read/seek/flush/... for Werkzeug's FileStorage
+        return getattr(self._file, name)
+
+
+def spool_stream(stream: IO[bytes], spool_dir: str, max_bytes: int = SHELBY_UPLOAD_MAX_BYTES) -> HashingSpoolFile:
+    """Copy a raw request body into the spool in chunks, hashing as it goes."""
+    spooled = HashingSpoolFile(spool_dir, max_bytes)
+    try:
+        for chunk in iter(lambda: stream.read(_CHUNK_SIZE), b''):
+            spooled.write(chunk)
+        spooled.flush()
+    except BaseException:
+        spooled.discard()
+        raise
+    return spooled
+
+
+class SpoolingRequest(Request):
+    """Request that parses opted-in multipart file parts into HashingSpoolFiles."""
+
+    spool_uploads = False
+    spool_dir: Optional[str] = None
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if not self.spool_uploads or not self.spool_dir:
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        if total_content_length is not None and total_content_length > SHELBY_UPLOAD_MAX_BYTES:
+            raise UploadTooLarge(f"upload exceeds {SHELBY_UPLOAD_MAX_BYTES} bytes")
+        spooled = HashingSpoolFile(self.spool_dir)
+        self._spooled_files().append(spooled)
+        return spooled
+
+    def _spooled_files(self) -> List[HashingSpoolFile]:
+        spooled = self.__dict__.get('_spooled')
+        if spooled is None:
+            spooled = self.__dict__['_spooled'] = []
+        return spooled
+
+    def close(self):
+        super().close()
+        for spooled in self.__dict__.get('_spooled', ()):
+            spooled.discard()
@@ -242,21 +242,22 @@ const TradingMarketplace: React.FC = () => {
       // For Aptos tokens, use token_id (string) instead of asa_id (number)
       // Convert to string if it's a number to avoid scientific notation
       const id = typeof tokenId === 'string' ? tokenId : tokenId.toString()
-      const trades = await TradingService.getTradeHistory(id, '24h', 200)
+      // Chart from server-side candles; only the recent trades list needs raw rows
+      const [candles, trades] = await Promise.all([
+        TradingService.getCandles(id, '24h'),
+        TradingService.getTradeHistory(id, '24h', 20)
+      ])
       
-      // Convert trades to chart data
-      const chartDataPoints: ChartDataPoint[] = trades.map((trade: any) => {
-        const date = new Date(trade.timestamp)
+      // Convert candles to chart data (closing price per bucket, already in time order)
+      const chartDataPoints: ChartDataPoint[] = (candles?.t || []).map((bucketStart, i) => {
+        const date = new Date(bucketStart * 1000)
         return {
           time: `${date.getHours()}:${date.getMinutes().toString().padStart(2, '0')}`,
-          price: trade.price,
-          timestamp: new Date(trade.timestamp).getTime()
+          price: candles!.c[i],
+          timestamp: bucketStart * 1000
         }
       })
       
-      // Sort by timestamp
-      chartDataPoints.sort((a, b) => a.timestamp - b.timestamp)
-      
       // If no trades, create initial point from current price
       if (chartDataPoints.length === 0 && tokenData) {
         chartDataPoints.push({
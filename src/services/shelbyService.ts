@@ -13,18 +13,64 @@ const SHELBY_NETWORK = import.meta.env.VITE_SHELBY_NETWORK || 'shelbynet'
 // For now, we'll use REST API directly since SDK has dependency conflicts
 // In production, you can use the Shelby CLI or SDK with proper setup
 
+// Upload jobs are polled until they finish (uploads can take a couple of minutes)
+const UPLOAD_POLL_INTERVAL_MS = 1500
+const UPLOAD_POLL_TIMEOUT_MS = 10 * 60 * 1000
+
+export interface UploadProgress {
+  status: 'queued' | 'running' | 'succeeded' | 'failed'
+  stage?: string
+  progress: number
+  attempts?: number
+}
+
+const sleep = (ms: number) => new Promise(resolve => setTimeout(resolve, ms))
+
+/**
+ * Poll a backend upload job until it succeeds or fails
+ * @param jobId - Job id returned by POST /api/shelby/upload
+ * @param onProgress - Optional callback for status/progress updates
+ * @returns The finished job's result
+ */
+async function waitForUploadJob(jobId: string, onProgress?: (progress: UploadProgress) => void): Promise<any> {
+  const deadline = Date.now() + UPLOAD_POLL_TIMEOUT_MS
+
+  while (Date.now() < deadline) {
+    const response = await fetch(`${BACKEND_URL}/api/shelby/upload/${jobId}`)
+    if (!response.ok) {
+      const error = await response.json().catch(() => ({}))
+      throw new Error(error.error || 'Failed to get upload status')
+    }
+
+    const job = await response.json()
+    onProgress?.({ status: job.status, stage: job.stage, progress: job.progress, attempts: job.attempts })
+
+    if (job.status === 'succeeded') {
+      return job.result
+    }
+    if (job.status === 'failed') {
+      throw new Error(job.error || 'Shelby upload failed')
+    }
+    await sleep(UPLOAD_POLL_INTERVAL_MS)
+  }
+
+  throw new Error('Timed out waiting for Shelby upload')
+}
+
 /**
  * Upload premium content to Shelby via backend
- * The backend will handle the actual Shelby upload using the CLI
+ * The backend queues the upload (using the CLI) and this polls the job until it finishes
  * @param file - File to upload (File object or Blob)
  * @param blobName - Name/path for the blob in Shelby
  * @param expirationDays - Number of days until expiration (default: 365)
+ * @param onProgress - Optional callback for upload status/progress
  * @returns Blob URL and metadata
  */
 export async function uploadPremiumContent(
   file: File | Blob,
   blobName: string,
-  expirationDays: number = 365
+  expirationDays: number = 365,
+  onProgress?: (progress: UploadProgress) => void
 ): Promise<{ 
   blobUrl: string; 
   blobId: string; 
@@ -46,7 +92,7 @@ export async function uploadPremiumContent(
     formData.append('blobName', blobName)
     formData.append('expiration', expirationDate.toISOString())
 
-    // Upload via backend API
+    // Queue the upload via backend API
     const response = await fetch(`${BACKEND_URL}/api/shelby/upload`, {
       method: 'POST',
       body: formData,
@@ -57,7 +103,8 @@ export async function uploadPremiumContent(
       throw new Error(error.error || 'Failed to upload premium content')
     }
 
-    const result = await response.json()
+    const { jobId } = await response.json()
+    const result = await waitForUploadJob(jobId, onProgress)
     return {
       blobUrl: result.blobUrl || result.blobId,
       blobId: result.blobId || result.blobName,
@@ -34,6 +34,21 @@ export interface ScrapeResult {
   error?: string
 }
 
+export interface BulkScrapeResult {
+  url: string
+  platform: string | null
+  inputs: string[]
+  success: boolean
+  content?: SocialMediaContent
+  error?: string
+}
+
+export interface BulkScrapeSummary {
+  succeeded: number
+  failed: number
+  elapsedMs: number
+}
+
 class SocialMediaService {
   /**
    * Scrape content from URL (Instagram, Twitter, LinkedIn)
@@ -153,6 +168,58 @@ class SocialMediaService {
     }
   }
 
+  /**
+   * Scrape many Instagram / Twitter / LinkedIn URLs in one request.
+   * Results stream back as each URL finishes; onResult is called for every
+   * distinct URL (duplicates are scraped once and listed in `inputs`).
+   */
+  async scrapeContentBulk(
+    urls: Array<string | { url: string; platform?: string }>,
+    onResult: (result: BulkScrapeResult) => void,
+    options: { maxAge?: number; allowStale?: boolean } = {}
+  ): Promise<BulkScrapeSummary> {
+    const response = await fetch(`${API_BASE_URL}/api/scrape/bulk`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json'
+      },
+      credentials: 'include',
+      body: JSON.stringify({ urls, ...options })
+    })
+
+    if (!response.ok || !response.body) {
+      const data = await response.json().catch(() => ({}))
+      throw new Error(data.error || `Bulk scrape failed (${response.status})`)
+    }
+
+    const reader = response.body.getReader()
+    const decoder = new TextDecoder()
+    let buffered = ''
+    let summary: BulkScrapeSummary = { succeeded: 0, failed: 0, elapsedMs: 0 }
+
+    const handleLine = (line: string) => {
+      if (!line.trim()) return
+      const message = JSON.parse(line)
+      if (message.done) {
+        summary = { succeeded: message.succeeded, failed: message.failed, elapsedMs: message.elapsedMs }
+      } else {
+        onResult(message as BulkScrapeResult)
+      }
+    }
+
+    while (true) {
+      const { done, value } = await reader.read()
+      if (done) break
+      buffered += decoder.decode(value, { stream: true })
+      const lines = buffered.split('\n')
+      buffered = lines.pop() || ''
+      lines.forEach(handleLine)
+    }
+    handleLine(buffered + decoder.decode())
+
+    return summary
+  }
+
   /**
    * Verify content ownership through bio verification (strongest) or URL pattern matching
    * Bio verification: User adds a unique code to their profile bio to prove ownership
@@ -22,6 +22,20 @@ export interface TradeResult {
   error?: string
 }
 
+/** OHLCV candles as parallel arrays, one entry per bucket (t = bucket start, epoch seconds) */
+export interface TokenCandles {
+  resolution: '1m' | '5m' | '1h' | '1d'
+  interval: number
+  t: number[]
+  o: number[]
+  h: number[]
+  l: number[]
+  c: number[]
+  v: number[]
+  qv: number[]
+  n: number[]
+}
+
 export class TradingService {
   /**
    * Estimate buy trade using bonding curve
@@ -239,6 +253,31 @@ export class TradingService {
     }
   }
 
+  /**
+   * Get OHLCV price candles for a token, aggregated on the server
+   * Wide timeframes come back at a coarser interval (at most maxPoints candles)
+   */
+  static async getCandles(
+    tokenId: number | string,
+    timeframe: '1h' | '24h' | '7d' | '30d' = '24h',
+    maxPoints: number = 300
+  ): Promise<TokenCandles | null> {
+    try {
+      const id = typeof tokenId === 'string' ? tokenId : tokenId.toString()
+      const response = await fetch(
+        `${BACKEND_URL}/api/trades/${id}/candles?timeframe=${timeframe}&max_points=${maxPoints}`
+      )
+      if (!response.ok) {
+        throw new Error(`HTTP ${response.status}`)
+      }
+      const result = await response.json()
+      return result.success ? result : null
+    } catch (error) {
+      console.error('Error fetching candles:', error)
+      return null
+    }
+  }
+
   /**
    * Sync a contract trade to the backend database
    * Called after successful buy/sell via contract to update database state